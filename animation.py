@@ -0,0 +1,82 @@
+"""Time based animations for the Memory Puzzle Game.
+
+Animations are advanced by the time elapsed, not by frames drawn, so a slow
+frame skips animation steps instead of slowing the game down. Any number of
+animations can run at the same time, driven by the game loop through a
+Scheduler.
+"""
+
+
+class Animation(object):
+    """An animation running for duration milliseconds from start.
+
+    step is called with the progress of the animation, from 0.0 to 1.0, on
+    every update while it runs and done, if given, once it finished. Both
+    may return the dirty rects they drew to.
+    """
+
+    def __init__(self, start, duration, step, done=None):
+        self.start = start
+        self.duration = duration
+        self.step = step
+        self.done = done
+
+    @property
+    def end(self):
+        """Time the animation finishes."""
+        return self.start + self.duration
+
+    def progress(self, now):
+        """Progress of the animation at time now, from 0.0 to 1.0."""
+        if now >= self.end:
+            return 1.0
+        return float(now - self.start) / self.duration
+
+
+def end_time(animations, default=0):
+    """Time the last of the animations finishes."""
+    return max([animation.end for animation in animations] or [default])
+
+
+class Scheduler(object):
+    """Runs the animations added to it as time passes."""
+
+    def __init__(self):
+        self.animations = []
+
+    def add(self, *animations):
+        """Add animations to be run."""
+        self.animations.extend(animations)
+
+    def clear(self):
+        """Drop all the animations."""
+        del self.animations[:]
+
+    def update(self, now):
+        """Step the animations running at time now.
+
+        Finished animations are removed after their last step. Returns the
+        dirty rects the animations drew to.
+        """
+        dirty_rects = []
+        for animation in list(self.animations):
+            if now < animation.start:
+                continue
+            progress = animation.progress(now)
+            dirty_rects.extend(animation.step(progress) or ())
+            if progress == 1.0:
+                self.animations.remove(animation)
+                if animation.done is not None:
+                    dirty_rects.extend(animation.done() or ())
+        return dirty_rects
+
+    def time_to_next(self, now):
+        """Milliseconds until an animation needs to be stepped.
+
+        Returns 0 while an animation is running and None when there is
+        nothing to animate.
+        """
+        if not self.animations:
+            return None
+        return max(0, min([animation.start for animation in self.animations])
+                   - now)
@@ -0,0 +1,143 @@
+"""Sound of the Memory Puzzle Game.
+
+The sound effects of revealing and covering boxes, of a match, a mismatch
+and a win are decoded once into pygame Sounds, either from NAME.ogg or
+NAME.wav files of a sound directory or synthesized as short tones, and
+played on a fixed pool of mixer channels taken in turn, so that playing one
+only hands a sound to a channel without searching for a free one. Music is
+streamed from its file by pygame.mixer.music rather than loaded whole.
+
+The mixer is started and the effects are made by a background thread, so
+the game window shows without waiting for the audio device. Effects played
+before they are ready are skipped, and without an audio device the game is
+silent.
+"""
+import math
+import os
+import sys
+import threading
+from array import array
+
+import pygame
+
+# Effects synthesized when no sound file is given, as (frequency in Hz,
+# milliseconds) notes played one after another.
+EFFECTS = {
+    'reveal': ((660, 50),),
+    'cover': ((440, 50),),
+    'match': ((660, 70), (880, 110)),
+    'mismatch': ((233, 90), (196, 160)),
+    'win': ((523, 110), (659, 110), (784, 110), (1047, 300)),
+}
+
+# Extensions of the sound files looked for, in order, see load_sound.
+SOUND_EXTENSIONS = ('.ogg', '.wav')
+
+# Mixer format: samples per second and per buffer, a small buffer so that
+# sounds start within a few milliseconds of being played.
+MIXER_FREQUENCY = 44100
+MIXER_BUFFER = 512
+
+# Mixer channels playing the effects, taken in turn.
+CHANNELS = 8
+
+# Peak amplitude of the synthesized effects, out of 32767.
+EFFECT_AMPLITUDE = 6000
+
+MUSIC_VOLUME = 0.5
+
+
+def synthesize(notes, frequency, channels):
+    """Sound of the notes in the signed 16 bit format of the mixer.
+
+    Every note is a sine wave fading out, so that notes do not click.
+    """
+    samples = array('h')
+    for note_frequency, milliseconds in notes:
+        count = frequency * milliseconds // 1000
+        step = 2 * math.pi * note_frequency / frequency
+        for index in range(count):
+            value = int(EFFECT_AMPLITUDE * (1 - float(index) / count) *
+                        math.sin(step * index))
+            samples.extend([value] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+def load_sound(name, sound_dir=None):
+    """The sound effect of name, from sound_dir or synthesized."""
+    if sound_dir:
+        for extension in SOUND_EXTENSIONS:
+            path = os.path.join(sound_dir, name + extension)
+            if os.path.isfile(path):
+                return pygame.mixer.Sound(path)
+    frequency, _, channels = pygame.mixer.get_init()
+    return synthesize(EFFECTS[name], frequency, channels)
+
+
+class Audio(object):
+    """Sound effects from sound_dir and music streamed from a file.
+
+    Nothing is played until started, see start.
+    """
+
+    def __init__(self, sound_dir=None, music=None):
+        self.sound_dir = sound_dir
+        self.music = music
+        self.sounds = {}
+        self.channels = []
+        self.next_channel = 0
+        self.loader = None
+
+    def start(self):
+        """Start the mixer and load the effects in the background."""
+        self.loader = threading.Thread(target=self.load, name='audio loader')
+        self.loader.daemon = True
+        self.loader.start()
+
+    def load(self):
+        """Start the mixer, load the effects and start the music."""
+        try:
+            pygame.mixer.init(MIXER_FREQUENCY, -16, 2, MIXER_BUFFER,
+                              allowedchanges=0)
+            pygame.mixer.set_num_channels(CHANNELS)
+            channels = [pygame.mixer.Channel(index)
+                        for index in range(CHANNELS)]
+            sounds = dict((name, load_sound(name, self.sound_dir))
+                          for name in EFFECTS)
+        except pygame.error as error:
+            sys.stderr.write("audio: no sound: %s\n" % error)
+            return
+        pygame.register_quit(self.drop)
+        self.channels = channels
+        self.sounds = sounds
+        if self.music:
+            try:
+                pygame.mixer.music.load(self.music)
+                pygame.mixer.music.set_volume(MUSIC_VOLUME)
+                pygame.mixer.music.play(-1)
+            except pygame.error as error:
+                sys.stderr.write("audio: no music: %s\n" % error)
+
+    def play(self, name):
+        """Play the effect of name on the next channel of the pool.
+
+        Skipped while the effects are loading.
+        """
+        sound = self.sounds.get(name)
+        if sound is not None:
+            channel = self.channels[self.next_channel]
+            self.next_channel = (self.next_channel + 1) % CHANNELS
+            channel.play(sound)
+
+    def drop(self):
+        """Drop the sounds and channels, which crash once pygame quit."""
+        self.sounds = {}
+        self.channels = []
+
+    def close(self):
+        """Stop the music and the mixer."""
+        if self.loader is not None:
+            self.loader.join()
+        if self.sounds:
+            self.drop()
+            pygame.mixer.quit()
@@ -0,0 +1,367 @@
+"""Headless benchmarks of the Memory Puzzle Game.
+
+Times the drawing, hit testing and board generation functions, whole frames
+drawn by every render backend and whole game_loop sessions driven by
+synthetic events, for every game level and a larger grid, under SDL's dummy
+video driver, where the texture backend runs on SDL's software renderer.
+The results can be saved as a JSON baseline and later runs compared against
+it, failing when a benchmark got slower than the tolerance allows.
+
+    python benchmark.py --save baseline.json
+    python benchmark.py --compare baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import timeit
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+from pygame.constants import MOUSEBUTTONUP, MOUSEMOTION, QUIT  # noqa: E402
+
+import boards  # noqa: E402
+import game_state  # noqa: E402
+import icons  # noqa: E402
+import memorypuzzle  # noqa: E402
+import render_backends  # noqa: E402
+from viewport import ZOOM_LEVELS  # noqa: E402
+from colors import BGCOLOR  # noqa: E402
+from constants import (  # noqa: E402
+    BOXSIZE,
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    EASY_RECT,
+    FPS,
+    HARD_GAME_COLS,
+    HARD_GAME_ROWS,
+    HARD_RECT,
+    MEDIUM_GAME_COLS,
+    MEDIUM_GAME_ROWS,
+    MEDIUM_RECT,
+    PIECE_CLOSE_WAIT,
+    REVEAL_DURATION,
+    WINDOWHEIGHT,
+    WINDOWWIDTH)
+
+LEVELS = (
+    ('easy', (EASY_GAME_ROWS, EASY_GAME_COLS), EASY_RECT),
+    ('medium', (MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS), MEDIUM_RECT),
+    ('hard', (HARD_GAME_ROWS, HARD_GAME_COLS), HARD_RECT))
+
+# The largest grid still fitting the window, used for the drawing, hit
+# testing and frame benchmarks but not for sessions, as it has more boxes
+# than there are icon pairs.
+LARGE_GRID = ('large', (9, 12))
+
+# A board far larger than the window, of which the viewport only draws and
+# hit tests the boxes in view, so its benchmarks should match the others.
+HUGE_GRID = ('huge', (200, 200))
+
+# A large board zoomed out as far as it goes, showing the most boxes the
+# window holds, used for the draw_board benchmarks only.
+ZOOMED_OUT_GRID = ('zoomed_out', (100, 100))
+
+# Seconds a cold start of the game may take until its first frame is shown,
+# see time_startup.
+STARTUP_BUDGET = 0.75
+
+# Milliseconds a frame takes on the virtual clock of the sessions.
+FRAME_TIME = 1000 // FPS
+
+# Frames between two clicks of a session, long enough for a mismatch to be
+# covered again.
+FRAMES_PER_CLICK = (2 * REVEAL_DURATION + PIECE_CLOSE_WAIT) // FRAME_TIME + 2
+
+
+def tiled_board(game_grid):
+    """A board of the grid repeating the icons, which may not be playable."""
+    game_rows, game_cols = game_grid
+    return [[icons.ICONS[(x_value * game_rows + y_value) % len(icons.ICONS)]
+             for y_value in range(game_rows)]
+            for x_value in range(game_cols)]
+
+
+def init_display():
+    """Initialize pygame as the game does and return the surface backend."""
+    pygame.display.init()
+    pygame.font.init()
+    return render_backends.SurfaceBackend(
+        pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT)))
+
+
+class VirtualClock(object):
+    """Stands in for pygame.time.Clock in a scripted game_loop session.
+
+    Every tick advances the virtual time by FRAME_TIME and posts the events
+    scripted for the frame, or a mouse motion on frames without any so that
+    waiting for input never blocks. The motion is not posted after scripted
+    events, as the game takes the mouse position from the last event.
+    """
+
+    def __init__(self, script):
+        self.now = 0
+        self.frame = 0
+        self.script = script
+
+    def get_ticks(self):
+        """Virtual time in milliseconds."""
+        return self.now
+
+    def tick(self, framerate=0):
+        """Advance to the next frame."""
+        self.now += FRAME_TIME
+        self.frame += 1
+        events = self.script.get(self.frame) or [pygame.event.Event(
+            MOUSEMOTION, pos=(0, 0), rel=(0, 0), buttons=(0, 0, 0))]
+        for event in events:
+            pygame.event.post(event)
+        return FRAME_TIME
+
+
+def session_script(game_grid):
+    """Events clicking every box of the grid in turn and then quitting."""
+    game_rows, game_cols = game_grid
+    groups = (game_rows * game_cols + 7) // 8
+    frame = groups * 2 * REVEAL_DURATION // FRAME_TIME + 2
+    script = {}
+    for x_value in range(game_cols):
+        for y_value in range(game_rows):
+            left, top = memorypuzzle.left_top_coords_of_box(
+                (x_value, y_value),
+                game_grid)
+            script[frame] = [pygame.event.Event(
+                MOUSEBUTTONUP, pos=(left + 1, top + 1), button=1)]
+            frame += FRAMES_PER_CLICK
+    script[frame] = [pygame.event.Event(QUIT)]
+    return script
+
+
+def run_session(game_grid, level_rect):
+    """Run game_loop on a scripted session and return the frames it took."""
+    backend = init_display()
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(
+        MOUSEBUTTONUP, pos=pygame.Rect(level_rect).center, button=1))
+    clock = VirtualClock(session_script(game_grid))
+    random.seed(0)
+    try:
+        memorypuzzle.game_loop(backend, clock, clock.get_ticks)
+    except SystemExit:
+        pass
+    return clock.frame
+
+
+def time_startup(repeat=3):
+    """Best seconds from starting the game to its first frame.
+
+    Runs memorypuzzle.py --first-frame in a new interpreter under the dummy
+    video driver, so that every import and initialization is timed.
+    """
+    command = [sys.executable, os.path.abspath(memorypuzzle.__file__),
+               '--first-frame']
+    environment = dict(os.environ, SDL_VIDEODRIVER='dummy')
+    timings = []
+    for _ in range(repeat):
+        start = timeit.default_timer()
+        subprocess.check_call(command, env=environment,
+                              stdout=subprocess.DEVNULL)
+        timings.append(timeit.default_timer() - start)
+    return min(timings)
+
+
+def time_call(function, number, repeat):
+    """Best time in seconds of a single call to function."""
+    return min(timeit.Timer(function).repeat(repeat, number)) / number
+
+
+def drawing_benchmarks(backend, name, game_grid, board):
+    """Benchmarks of the drawing and hit testing functions on a grid."""
+    covered = game_state.revealed_lookup(
+        game_state.generate_revealed_boxes_data(False, game_grid))
+    revealed = game_state.revealed_lookup(
+        game_state.generate_revealed_boxes_data(True, game_grid))
+    boxes = [(x_value, y_value)
+             for x_value in range(game_grid[1])
+             for y_value in range(game_grid[0])]
+    pointers = [(x_value, y_value)
+                for x_value in range(0, WINDOWWIDTH, 7)
+                for y_value in range(0, WINDOWHEIGHT, 7)]
+
+    def hit_test():
+        for pointer in pointers:
+            memorypuzzle.get_box_under_mouse(pointer, game_grid)
+
+    return [
+        ('draw_board.covered.' + name,
+         lambda: memorypuzzle.draw_board(
+             backend, board, covered, game_grid)),
+        ('draw_board.revealed.' + name,
+         lambda: memorypuzzle.draw_board(
+             backend, board, revealed, game_grid)),
+        ('draw_board_surfarray.covered.' + name,
+         lambda: memorypuzzle.draw_board_surfarray(
+             backend, board, covered, game_grid)),
+        ('draw_board_surfarray.revealed.' + name,
+         lambda: memorypuzzle.draw_board_surfarray(
+             backend, board, revealed, game_grid)),
+        ('draw_box_covers.' + name,
+         lambda: memorypuzzle.draw_box_covers(
+             backend, board, boxes, BOXSIZE // 2, game_grid)),
+        ('get_box_under_mouse.%s.x%d' % (name, len(pointers)), hit_test)]
+
+
+def frame_benchmarks(backend, name, game_grid, board):
+    """Benchmarks of a whole frame of the revealed board drawn by backend,
+    and of a frame redrawing a box and a highlight as game_loop does."""
+    revealed = game_state.revealed_lookup(
+        game_state.generate_revealed_boxes_data(True, game_grid))
+
+    def frame():
+        backend.fill(BGCOLOR)
+        memorypuzzle.draw_board(backend, board, revealed, game_grid)
+        backend.present()
+
+    def dirty_frame():
+        dirty_rect = memorypuzzle.redraw_box(backend, board, revealed, (0, 0),
+                                             game_grid)
+        memorypuzzle.draw_highlight_box(backend, (1, 0), game_grid)
+        backend.present([dirty_rect,
+                         memorypuzzle.highlight_rect((1, 0), game_grid)])
+
+    return [('frame.%s.%s' % (backend.name, name), frame),
+            ('frame.dirty.%s.%s' % (backend.name, name), dirty_frame)]
+
+
+def benchmarks(backend):
+    """All the (name, function) benchmarks apart from the sessions."""
+    result = []
+    for shape in icons.ALLSHAPES:
+        result.append((
+            'draw_icon.' + shape,
+            lambda shape=shape: memorypuzzle.draw_icon(
+                backend, shape, icons.ALLCOLORS[0], (0, 0),
+                (EASY_GAME_ROWS, EASY_GAME_COLS))))
+    for name, game_grid, _ in LEVELS:
+        result.extend(drawing_benchmarks(
+            backend, name, game_grid, tiled_board(game_grid)))
+        result.append((
+            'get_randomized_board.' + name,
+            lambda game_grid=game_grid: game_state.get_randomized_board(
+                game_grid)))
+        result.append((
+            'generate_board_codes.%s.x1000' % name,
+            lambda game_grid=game_grid: boards.generate_board_codes(
+                game_grid, 1000, seed=0)))
+    name, game_grid = LARGE_GRID
+    result.extend(drawing_benchmarks(
+        backend, name, game_grid, tiled_board(game_grid)))
+    frame_backends = (
+        backend,
+        render_backends.TextureBackend.open(
+            (WINDOWWIDTH, WINDOWHEIGHT), "benchmark"),
+        render_backends.NullBackend((WINDOWWIDTH, WINDOWHEIGHT)))
+    for name, game_grid in [level[:2] for level in LEVELS] + [LARGE_GRID]:
+        for frame_backend in frame_backends:
+            result.extend(frame_benchmarks(
+                frame_backend, name, game_grid, tiled_board(game_grid)))
+    name, game_grid = HUGE_GRID
+    result.extend(
+        (benchmark_name, function)
+        for benchmark_name, function in drawing_benchmarks(
+            backend, name, game_grid, tiled_board(game_grid))
+        if not benchmark_name.startswith('draw_box_covers.'))
+    name, game_grid = ZOOMED_OUT_GRID
+    memorypuzzle.get_viewport(game_grid).zoom_at(
+        -len(ZOOM_LEVELS), (WINDOWWIDTH // 2, WINDOWHEIGHT // 2))
+    result.extend(
+        (benchmark_name, function)
+        for benchmark_name, function in drawing_benchmarks(
+            backend, name, game_grid, tiled_board(game_grid))
+        if benchmark_name.startswith('draw_board'))
+    return result
+
+
+def run_benchmarks(number=20, repeat=5, sessions=True, names=None):
+    """Run the benchmarks, returning seconds per call keyed by name.
+
+    A session is reported as seconds per frame and the startup, run with
+    the sessions, as seconds to the first frame. names, if given, limits the
+    benchmarks run to those whose name starts with one of them.
+    """
+    def wanted(name):
+        return names is None or any(name.startswith(prefix)
+                                    for prefix in names)
+
+    results = {}
+    for name, function in benchmarks(init_display()):
+        if wanted(name):
+            results[name] = time_call(function, number, repeat)
+    if sessions:
+        if wanted('startup.first_frame'):
+            results['startup.first_frame'] = time_startup(repeat)
+        for name, game_grid, level_rect in LEVELS:
+            name = 'game_loop.session.' + name
+            if wanted(name):
+                start = timeit.default_timer()
+                frames = run_session(game_grid, level_rect)
+                results[name] = (timeit.default_timer() - start) / frames
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Names of the benchmarks slower than baseline by more than tolerance.
+
+    Returns (name, baseline seconds, seconds) tuples.
+    """
+    return [(name, baseline[name], seconds)
+            for name, seconds in sorted(results.items())
+            if name in baseline and seconds > baseline[name] * (1 + tolerance)]
+
+
+def main(argv=()):
+    """Run the benchmarks and print, save or compare their results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--save', metavar='FILE',
+                        help="save the results as a JSON baseline")
+    parser.add_argument('--compare', metavar='FILE',
+                        help="compare the results with a JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown against the baseline, "
+                             "0.25 being 25%% (default)")
+    parser.add_argument('--number', type=int, default=20,
+                        help="calls per timing (default 20)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="timings per benchmark, the best is kept "
+                             "(default 5)")
+    parser.add_argument('--no-sessions', dest='sessions',
+                        action='store_false',
+                        help="skip the game_loop sessions")
+    parser.add_argument('names', nargs='*',
+                        help="only run benchmarks starting with these names")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.number, args.repeat, args.sessions,
+                             args.names or None)
+    for name, seconds in sorted(results.items()):
+        print("%-45s %12.2f us" % (name, seconds * 1e6))
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.tolerance)
+        for name, baseline_seconds, seconds in regressions:
+            print("REGRESSION %s: %.2f us -> %.2f us" %
+                  (name, baseline_seconds * 1e6, seconds * 1e6))
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
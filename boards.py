@@ -0,0 +1,47 @@
+"""Bulk board generation for the Memory Puzzle Game.
+
+Boards are generated from an explicit seed as NumPy arrays of integer icon
+codes, an icon code being an index into icons.ALL_ICONS. Many boards are
+generated at once with a single set of vectorized permutations.
+"""
+import numpy
+
+from icons import ALL_ICONS, icon_pool
+
+
+def generate_board_codes(game_grid, count=1, seed=None):
+    """Generate count boards of icon codes.
+
+    Returns an array of shape (count, cols, rows), indexed like the list of
+    lists boards, which is the same for the same seed.
+    """
+    game_rows, game_cols = game_grid
+    num_icons_used = int(game_rows * game_cols / 2)
+    if num_icons_used * 2 != game_rows * game_cols:
+        raise ValueError("Board needs to have even number of boxes.")
+    # The icon pool is a prefix of ALL_ICONS, so its indexes are icon codes.
+    pool_size = len(icon_pool(num_icons_used))
+    rng = numpy.random.default_rng(seed)
+    # The first num_icons_used icons of a random permutation of the icon pool
+    # are used in pairs, and the pairs are shuffled across the board.
+    icons = numpy.argsort(rng.random((count, pool_size)), axis=1)
+    icons = icons[:, :num_icons_used].astype(
+        numpy.min_scalar_type(pool_size - 1))
+    boards = rng.permuted(numpy.concatenate((icons, icons), axis=1), axis=1)
+    return boards.reshape(count, game_cols, game_rows)
+
+
+def decode_board(board_codes):
+    """Convert a board of icon codes to a list of lists of (shape, color)."""
+    return [[ALL_ICONS[code] for code in column]
+            for column in board_codes.tolist()]
+
+
+def generate_boards(game_grid, count=1, seed=None):
+    """Generate count list of lists boards.
+
+    GameState takes the codes of a board directly as
+    board_codes=board_codes.ravel().tolist().
+    """
+    return [decode_board(board_codes)
+            for board_codes in generate_board_codes(game_grid, count, seed)]
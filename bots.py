@@ -0,0 +1,274 @@
+"""Automated players of the Memory Puzzle Game and a harness evaluating them.
+
+A Bot plays a GameState without a display. It remembers the icons of the
+boxes it saw, up to a number of boxes, and plays a known pair whenever it
+has one, turning unknown boxes otherwise. Remembering every box is a
+perfect-memory player, remembering none a random one.
+
+The harness plays bots on many seeded boards of every level in a process
+pool and reports the distribution of the moves it took to win and the
+games played per second.
+
+    python bots.py --games 100000 perfect limited:6 random
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter, OrderedDict
+
+from constants import (
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    HARD_GAME_COLS,
+    HARD_GAME_ROWS,
+    MEDIUM_GAME_COLS,
+    MEDIUM_GAME_ROWS)
+from game_state import MATCH, MISMATCH, WON, GameState, get_randomized_board
+
+LEVELS = (
+    ('easy', (EASY_GAME_ROWS, EASY_GAME_COLS)),
+    ('medium', (MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS)),
+    ('hard', (HARD_GAME_ROWS, HARD_GAME_COLS)))
+
+# Games a worker plays per task of the process pool.
+CHUNK_SIZE = 1000
+
+# Percentiles of the moves to win reported by the harness.
+PERCENTILES = (10, 50, 90, 99)
+
+
+class Bot(object):
+    """A player remembering the icons of up to memory boxes.
+
+    memory None remembers every box seen, older boxes are forgotten first
+    otherwise.
+    """
+
+    def __init__(self, memory=None):
+        self.memory = memory
+
+    def new_game(self, game, rng):
+        """Prepare to play game, choosing boxes at random with rng."""
+        self.game = game
+        self.rng = rng
+        game_rows, game_cols = game.game_grid
+        self.boxes = [(x_value, y_value)
+                      for x_value in range(game_cols)
+                      for y_value in range(game_rows)]
+        # Covered box indexes, in a list to pick from at random and with
+        # their position in it to remove them from it in constant time.
+        self.covered = list(range(len(self.boxes)))
+        self.covered_positions = dict(
+            (index, index) for index in self.covered)
+        # Box indexes remembered, oldest first, mapped to their icon code,
+        # and the remembered box indexes of every icon code.
+        self.known = OrderedDict()
+        self.known_codes = {}
+
+    def remember(self, index):
+        """Remember the icon of a revealed box."""
+        if self.memory == 0:
+            return
+        code = self.game.board_codes[index]
+        if index in self.known:
+            self.known.move_to_end(index)
+            return
+        self.known[index] = code
+        self.known_codes.setdefault(code, []).append(index)
+        if self.memory is not None and len(self.known) > self.memory:
+            self.forget(next(iter(self.known)))
+
+    def forget(self, index):
+        """Forget a box."""
+        code = self.known.pop(index, None)
+        if code is not None:
+            self.known_codes[code].remove(index)
+
+    def cover(self, index):
+        """Note a box as covered."""
+        self.covered_positions[index] = len(self.covered)
+        self.covered.append(index)
+
+    def uncover(self, index):
+        """Note a box as revealed."""
+        position = self.covered_positions.pop(index)
+        last = self.covered.pop()
+        if last != index:
+            self.covered[position] = last
+            self.covered_positions[last] = position
+
+    def unknown(self, exclude=None):
+        """A random covered box not remembered, or any covered one.
+
+        Tries a few random covered boxes first, which mostly succeeds, before
+        collecting the candidates.
+        """
+        for _ in range(8):
+            index = self.rng.choice(self.covered)
+            if index not in self.known and index != exclude:
+                return index
+        candidates = [index for index in self.covered
+                      if index not in self.known and index != exclude]
+        if not candidates:
+            candidates = [index for index in self.covered if index != exclude]
+        return self.rng.choice(candidates)
+
+    def choose_first(self):
+        """Index of the first box of a move."""
+        for indexes in self.known_codes.values():
+            if len(indexes) == 2:
+                return indexes[0]
+        return self.unknown()
+
+    def choose_second(self, first):
+        """Index of the second box of a move after first was revealed."""
+        for index in self.known_codes.get(self.game.board_codes[first], ()):
+            if index != first:
+                return index
+        return self.unknown(first)
+
+    def select(self, index):
+        """Select a box of the game, returning the outcome."""
+        outcome = self.game.select(self.boxes[index])
+        self.remember(index)
+        return outcome
+
+    def play(self):
+        """Play the game to the end, returning the moves it took."""
+        while not self.game.has_won():
+            first = self.choose_first()
+            self.select(first)
+            self.uncover(first)
+            second = self.choose_second(first)
+            outcome = self.select(second)
+            if outcome in (MATCH, WON):
+                self.uncover(second)
+                self.forget(first)
+                self.forget(second)
+            elif outcome == MISMATCH:
+                self.cover(first)
+        return self.game.moves
+
+
+def make_bot(spec):
+    """Make a bot from its name: perfect, random or limited:MEMORY."""
+    name, _, memory = spec.partition(':')
+    if name == 'perfect' and not memory:
+        return Bot()
+    if name == 'random' and not memory:
+        return Bot(memory=0)
+    if name == 'limited' and memory.isdigit():
+        return Bot(memory=int(memory))
+    raise ValueError("unknown bot %r, expected perfect, random or "
+                     "limited:MEMORY" % spec)
+
+
+def play_games(task):
+    """Play games of a (bot spec, game grid, seeds) task.
+
+    Every board and bot choice comes from random.Random(seed), so a game
+    plays the same wherever it runs. Returns a Counter of the moves to win.
+    """
+    spec, game_grid, seeds = task
+    bot = make_bot(spec)
+    moves = Counter()
+    for seed in seeds:
+        rng = random.Random(seed)
+        game = GameState(game_grid, get_randomized_board(game_grid, rng))
+        bot.new_game(game, rng)
+        moves[bot.play()] += 1
+    return moves
+
+
+def percentile(moves, percent):
+    """The moves at a percentile of a Counter of moves to win."""
+    rank = sum(moves.values()) * percent / 100.0
+    count = 0
+    for value in sorted(moves):
+        count += moves[value]
+        if count >= rank:
+            return value
+    return 0
+
+
+def evaluate(specs, levels=LEVELS, games=10000, processes=None, seed=0):
+    """Play games of every bot on every level in a process pool.
+
+    Returns {(spec, level name): (Counter of moves to win, seconds)} in the
+    order played. The same seeds are used for every bot, so that they play
+    the same boards.
+    """
+    results = {}
+    pool = multiprocessing.Pool(processes)
+    try:
+        for spec in specs:
+            make_bot(spec)
+            for name, game_grid in levels:
+                tasks = [(spec, game_grid,
+                          range(start, min(start + CHUNK_SIZE, seed + games)))
+                         for start in range(seed, seed + games, CHUNK_SIZE)]
+                started = time.time()
+                moves = Counter()
+                for chunk_moves in pool.imap_unordered(play_games, tasks):
+                    moves.update(chunk_moves)
+                results[(spec, name)] = (moves, time.time() - started)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def report(results):
+    """Lines describing the results of evaluate."""
+    lines = ["%-12s %-7s %9s %6s %s %10s" % (
+        'bot', 'level', 'games', 'mean',
+        ' '.join('%5s' % ('p%d' % percent) for percent in PERCENTILES),
+        'games/s')]
+    for (spec, name), (moves, seconds) in results.items():
+        games = sum(moves.values())
+        mean = float(sum(value * count for value, count in moves.items()))
+        lines.append("%-12s %-7s %9d %6.1f %s %10.0f" % (
+            spec, name, games, mean / games,
+            ' '.join('%5d' % percentile(moves, percent)
+                     for percent in PERCENTILES),
+            games / seconds if seconds else 0))
+    return lines
+
+
+def main(argv=()):
+    """Evaluate bots and print the moves they took to win."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=10000,
+                        help="games per bot and level (default 10000)")
+    parser.add_argument('--processes', type=int,
+                        help="worker processes (default one per core)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first game (default 0)")
+    parser.add_argument('--level', action='append',
+                        choices=[name for name, _ in LEVELS],
+                        help="only play this level, may be repeated")
+    parser.add_argument('bots', nargs='*',
+                        default=['perfect', 'limited:6', 'random'],
+                        help="bots to evaluate: perfect, random or "
+                             "limited:MEMORY (default all three, "
+                             "limited:6)")
+    args = parser.parse_args(argv)
+    try:
+        for spec in args.bots:
+            make_bot(spec)
+    except ValueError as error:
+        parser.error(str(error))
+
+    levels = [(name, game_grid) for name, game_grid in LEVELS
+              if not args.level or name in args.level]
+    results = evaluate(args.bots, levels, args.games, args.processes,
+                       args.seed)
+    for line in report(results):
+        print(line)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -17,15 +17,24 @@ BOXSIZE = 40
 QUARTER_BOXSIZE = int(BOXSIZE * 0.25)
 HALF_BOXSIZE = int(BOXSIZE * 0.5)
 
-# Frames per second, the general speed of the program.
+# Frames per second, the general speed of the program and the default frame
+# cap, see memorypuzzle.RENDER_SETTINGS.
 FPS = 20
 
+# Milliseconds the game time advances by per step, independent of the frame
+# rate and finer than a frame at 144 Hz, see timing.
+SIMULATION_STEP = 5
+
 # size of gap between boxes in pixels
 GAPSIZE = 10
 
 # speed boxes sliding reveals and covers
 REVEALSPEED = 8
 
+# duration of a box reveal or cover animation in milliseconds, the time its
+# REVEALSPEED steps take at FPS
+REVEAL_DURATION = int(1000 * (BOXSIZE // REVEALSPEED + 1) / FPS)
+
 # size of windows height in pixels
 WINDOWHEIGHT = 480
 
@@ -62,3 +71,13 @@ GAME_END_WAIT = 2000
 GAME_WON_FLASH_WAIT = 300
 
 PIECE_CLOSE_WAIT = 1000
+
+# Scoring of a won game: points per pair, less a penalty per move beyond a
+# perfect game, a move per pair, and per second played, see
+# game_state.score.
+PAIR_SCORE = 100
+EXTRA_MOVE_PENALTY = 10
+SECOND_PENALTY = 2
+
+# Where the results of won games are kept, see leaderboard.
+LEADERBOARD_PATH = '~/.memorypuzzle_leaderboard.db'
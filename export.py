@@ -0,0 +1,234 @@
+"""Headless export of Memory Puzzle Game boards as images.
+
+Renders boards generated from seeds offscreen with the drawing code of the
+game under SDL's dummy video driver: a PNG thumbnail of every revealed board
+and optionally the frames revealing its pairs one by one, as PNG files or an
+animated GIF. Boards are rendered by a process pool and every image is
+written to disk as soon as it is rendered.
+
+    python export.py --grid 4x5 --count 5000 --out thumbnails
+    python export.py --grid 6x6 --count 10 --frames gif --out replays
+    python export.py --theme night.theme --out night
+"""
+import argparse
+import importlib
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+
+import memorypuzzle  # noqa: E402
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS  # noqa: E402
+from game_state import (  # noqa: E402
+    generate_revealed_boxes_data, get_randomized_board, revealed_lookup)
+from render_backends import SurfaceBackend  # noqa: E402
+from viewport import ZOOM_LEVELS, Viewport  # noqa: E402
+
+# Most boards a worker renders per task of the process pool.
+CHUNK_SIZE = 100
+
+# Tasks per worker process, smaller tasks keeping every worker busy until
+# the export ends.
+TASKS_PER_PROCESS = 4
+
+# How the reveal frames are written, see export_board.
+FRAME_FORMATS = ('png', 'gif')
+
+# Milliseconds a frame of an animated GIF is shown.
+GIF_FRAME_MS = 400
+
+
+def board_viewport(game_grid, zoom=1.0):
+    """A viewport of the size of the whole board at zoom, gap around it."""
+    viewport = Viewport(game_grid)
+    viewport.zoom_index = ZOOM_LEVELS.index(zoom)
+    viewport.update()
+    game_rows, game_cols = game_grid
+    viewport.size = (game_cols * viewport.pitch + viewport.gap_size,
+                     game_rows * viewport.pitch + viewport.gap_size)
+    # Centering leaves half a gap before the first box and one and a half
+    # after the last, since the pitch counts the gap after every box.
+    centered_x, centered_y = viewport.centered_margins()
+    viewport.offset = (viewport.gap_size - centered_x,
+                       viewport.gap_size - centered_y)
+    viewport.update()
+    return viewport
+
+
+def reveal_order(board):
+    """Pairs of boxes of the board, ordered by their first box."""
+    pairs = {}
+    for x_value, column in enumerate(board):
+        for y_value, icon in enumerate(column):
+            pairs.setdefault(icon, []).append((x_value, y_value))
+    return sorted(pairs.values())
+
+
+def scale_to_width(surface, width):
+    """The surface scaled down to width, unless width is 0 or larger."""
+    surface_width, surface_height = surface.get_size()
+    if not width or width >= surface_width:
+        return surface
+    return pygame.transform.smoothscale(
+        surface, (width, max(1, surface_height * width // surface_width)))
+
+
+def render_board(surface, board, revealed, game_grid, width):
+    """Draw the board on surface and return it scaled to width."""
+    surface.fill(memorypuzzle.THEME_COLORS['background'])
+    memorypuzzle.draw_board(SurfaceBackend(surface), board,
+                            revealed_lookup(revealed), game_grid)
+    return scale_to_width(surface, width)
+
+
+def save_gif(path, frames):
+    """Write surfaces as the frames of a looping animated GIF with Pillow."""
+    from PIL import Image
+
+    images = [Image.frombytes('RGB', frame.get_size(),
+                              pygame.image.tostring(frame, 'RGB')).convert(
+                                  'P', palette=Image.ADAPTIVE)
+              for frame in frames]
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   duration=GIF_FRAME_MS, loop=0)
+
+
+def export_board(out, game_grid, seed, zoom=1.0, width=0, frames=None):
+    """Render the board of a seed into out and return the files written.
+
+    Writes board-ROWSxCOLS-SEED.png of the revealed board and with frames,
+    png or gif, the board covered and then revealing a pair per frame, as
+    PNG files in a board-ROWSxCOLS-SEED directory or an animated GIF.
+    """
+    game_rows, game_cols = game_grid
+    name = os.path.join(out, 'board-%dx%d-%d' % (game_rows, game_cols, seed))
+    board = get_randomized_board(game_grid, random.Random(seed))
+    viewport = board_viewport(game_grid, zoom)
+    memorypuzzle.set_viewport(game_grid, viewport)
+    surface = pygame.Surface(viewport.size)
+    revealed = generate_revealed_boxes_data(True, game_grid)
+    pygame.image.save(
+        render_board(surface, board, revealed, game_grid, width),
+        name + '.png')
+    if frames is None:
+        return 1
+    if frames == 'png' and not os.path.isdir(name):
+        os.mkdir(name)
+    revealed = generate_revealed_boxes_data(False, game_grid)
+    gif_frames = []
+    pairs = reveal_order(board)
+    for count in range(len(pairs) + 1):
+        if count:
+            for x_value, y_value in pairs[count - 1]:
+                revealed[x_value][y_value] = True
+        frame = render_board(surface, board, revealed, game_grid, width)
+        if frames == 'png':
+            pygame.image.save(
+                frame, os.path.join(name, 'frame-%04d.png' % count))
+        else:
+            gif_frames.append(frame.copy())
+    if frames == 'gif':
+        save_gif(name + '.gif', gif_frames)
+        return 2
+    return len(pairs) + 2
+
+
+def init_worker(theme=None):
+    """Initialize the display of a worker, needed to convert surfaces, and
+    load the theme file, whose pages the workers share, see themes."""
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    if theme:
+        from themes import load_theme
+
+        memorypuzzle.set_theme(load_theme(theme))
+
+
+def export_boards(task):
+    """Export the boards of an (out, game grid, seeds, zoom, width, frames)
+    task, returning the number of files written."""
+    out, game_grid, seeds, zoom, width, frames = task
+    return sum(export_board(out, game_grid, seed, zoom, width, frames)
+               for seed in seeds)
+
+
+def chunk_size(count, processes):
+    """Boards per task when exporting count boards over processes workers."""
+    return max(1, min(CHUNK_SIZE,
+                      -(-count // (processes * TASKS_PER_PROCESS))))
+
+
+def export(out, game_grid, count, seed=0, zoom=1.0, width=0, frames=None,
+           processes=None, theme=None):
+    """Export the boards of count seeds from seed in a process pool, drawn
+    with the theme file if given.
+
+    Returns the number of files written.
+    """
+    if not os.path.isdir(out):
+        os.makedirs(out)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    size = chunk_size(count, processes)
+    tasks = [(out, game_grid, range(start, min(start + size, seed + count)),
+              zoom, width, frames)
+             for start in range(seed, seed + count, size)]
+    pool = multiprocessing.Pool(processes, init_worker, (theme,))
+    try:
+        return sum(pool.imap_unordered(export_boards, tasks))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(argv=()):
+    """Export boards and print the files written per minute."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid', metavar='ROWSxCOLS',
+                        type=memorypuzzle.parse_grid,
+                        default=(EASY_GAME_ROWS, EASY_GAME_COLS),
+                        help="size of the boards (default %dx%d)"
+                             % (EASY_GAME_ROWS, EASY_GAME_COLS))
+    parser.add_argument('--count', type=int, default=100,
+                        help="boards to export (default 100)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first board (default 0)")
+    parser.add_argument('--out', default='boards',
+                        help="directory written to (default boards)")
+    parser.add_argument('--width', type=int, default=160,
+                        help="scale the images down to this width, 0 for "
+                             "the full size (default 160)")
+    parser.add_argument('--zoom', type=float, default=1.0,
+                        choices=ZOOM_LEVELS,
+                        help="zoom level the boards are drawn at (default "
+                             "1.0), smaller for boards of many boxes")
+    parser.add_argument('--frames', choices=FRAME_FORMATS,
+                        help="also export the frames revealing the pairs, "
+                             "as PNG files or an animated GIF")
+    parser.add_argument('--processes', type=int,
+                        help="worker processes (default one per core)")
+    parser.add_argument('--theme', metavar='FILE',
+                        help="draw with a theme compiled by themes.py")
+    args = parser.parse_args(argv)
+    if args.frames == 'gif':
+        try:
+            importlib.import_module('PIL')
+        except ImportError:
+            parser.error("--frames gif needs Pillow")
+
+    started = time.time()
+    files = export(args.out, args.grid, args.count, args.seed, args.zoom,
+                   args.width, args.frames, args.processes, args.theme)
+    seconds = time.time() - started
+    print("%d files in %.1f s: %.0f per minute"
+          % (files, seconds, files * 60 / seconds if seconds else 0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,184 @@
+"""Game state of the Memory Puzzle Game.
+
+The rules of the game, kept free of pygame so that games can be played and
+simulated without a display.
+"""
+import random
+from array import array
+
+from constants import EXTRA_MOVE_PENALTY, PAIR_SCORE, SECOND_PENALTY
+from icons import ALL_ICONS, ICON_CODES, icon_pool
+
+# Outcomes of GameState.select
+IGNORED = 'ignored'
+FIRST_SELECTION = 'first_selection'
+MATCH = 'match'
+MISMATCH = 'mismatch'
+WON = 'won'
+
+
+def get_randomized_board(game_grid, rng=random):
+    """Get the Randomized Board.
+
+    Gets the list of every possible shape in every possible color, adding
+    the procedural icons when the board has more pairs than there are
+    classic icons, and then creates a board, a list of lists, with randomly
+    placed icons. Pass a seeded random.Random as rng for a reproducible
+    board.
+    """
+    game_rows, game_cols = game_grid
+    num_icons_used = int(game_rows * game_cols / 2)
+    icons = list(icon_pool(num_icons_used))
+    rng.shuffle(icons)
+    icons = icons[:num_icons_used] * 2
+    rng.shuffle(icons)
+
+    game_board = [icons[x_value * game_rows:(x_value + 1) * game_rows]
+                  for x_value in range(game_cols)]
+    return game_board
+
+
+def generate_revealed_boxes_data(val, game_grid):
+    """Generate Revealed Boxes Data."""
+    game_rows, game_cols = game_grid
+    revealed_boxes = [[val for _ in range(game_rows)] for _ in range(game_cols)]
+    return revealed_boxes
+
+
+def revealed_lookup(revealed):
+    """Revealed status function of a box of list of lists revealed data.
+
+    The drawing functions take the revealed status of the boxes as such a
+    function, or as GameState.is_box_revealed, which does not decode the
+    whole board.
+    """
+    return lambda box: revealed[box[0]][box[1]]
+
+
+def encode_board(board):
+    """Convert a list of lists board to a flat array of icon codes.
+
+    The codes are stored column by column, box (x, y) at x * rows + y.
+    """
+    return array('H', [ICON_CODES[icon]
+                       for column in board for icon in column])
+
+
+def decode_board(board_codes, game_grid):
+    """Convert a flat array of icon codes to a list of lists board."""
+    game_rows, game_cols = game_grid
+    return [[ALL_ICONS[code]
+             for code in board_codes[x_value * game_rows:
+                                     (x_value + 1) * game_rows]]
+            for x_value in range(game_cols)]
+
+
+def score(game_grid, moves, milliseconds):
+    """Score of a game won in moves taking milliseconds, at least 0."""
+    game_rows, game_cols = game_grid
+    pairs = game_rows * game_cols // 2
+    return max(0, pairs * PAIR_SCORE - (moves - pairs) * EXTRA_MOVE_PENALTY -
+               milliseconds // 1000 * SECOND_PENALTY)
+
+
+def get_shape_and_color(board, box):
+    """Get the Shape and Color."""
+    x_value, y_value = box
+    return board[x_value][y_value][0], board[x_value][y_value][1]
+
+
+class GameState(object):
+    """State of a single game.
+
+    Holds the board as an array of icon codes, the revealed status of every
+    box as a bitmask, the pending first selection of a pair, the number of
+    matched pairs and the number of moves, a move being one pair of
+    selections. The board is given either as a list of lists board or as
+    flat board_codes, see encode_board.
+    """
+
+    __slots__ = ('game_grid', 'board_codes', 'revealed_mask', 'matched_pairs',
+                 'first_selection', 'mismatched', 'moves')
+
+    def __init__(self, game_grid, board=None, board_codes=None):
+        self.game_grid = game_grid
+        if board_codes is None:
+            if board is None:
+                board = get_randomized_board(game_grid)
+            board_codes = encode_board(board)
+        self.board_codes = array('H', board_codes)
+        self.revealed_mask = 0
+        self.matched_pairs = 0
+        self.first_selection = None
+        self.mismatched = ()
+        self.moves = 0
+
+    @property
+    def board(self):
+        """The board as a list of lists of (shape, color)."""
+        return decode_board(self.board_codes, self.game_grid)
+
+    @property
+    def revealed(self):
+        """The revealed status of the boxes as a list of lists of bools."""
+        game_rows, game_cols = self.game_grid
+        return [[bool(self.revealed_mask >>
+                      (x_value * game_rows + y_value) & 1)
+                 for y_value in range(game_rows)]
+                for x_value in range(game_cols)]
+
+    def box_index(self, box):
+        """Index of a box in board_codes and bit of it in revealed_mask."""
+        box_x, box_y = box
+        return box_x * self.game_grid[0] + box_y
+
+    def is_box_revealed(self, box):
+        """Returns the status of the box."""
+        return bool(self.revealed_mask >> self.box_index(box) & 1)
+
+    def set_box_revealed(self, box, status):
+        """Sets the revealed status of the box."""
+        if status:
+            self.revealed_mask |= 1 << self.box_index(box)
+        else:
+            self.revealed_mask &= ~(1 << self.box_index(box))
+
+    def has_won(self):
+        """Game is won when all pairs are matched."""
+        return self.matched_pairs * 2 == len(self.board_codes)
+
+    def cover_mismatched(self):
+        """Cover the boxes of the last mismatched pair and return them."""
+        mismatched = self.mismatched
+        for box in mismatched:
+            self.set_box_revealed(box, False)
+        self.mismatched = ()
+        return mismatched
+
+    def select(self, box):
+        """Select a box and return the outcome of the selection.
+
+        Selecting a revealed box is IGNORED. The first box of a pair is
+        revealed and FIRST_SELECTION returned. The second box of a pair is
+        compared with the first one: on a MISMATCH both stay revealed until
+        cover_mismatched or the next selection covers them, on a MATCH they
+        stay revealed and WON is returned instead if the board is complete.
+        """
+        self.cover_mismatched()
+        if self.is_box_revealed(box):
+            return IGNORED
+        self.set_box_revealed(box, True)
+        if self.first_selection is None:
+            self.first_selection = box
+            return FIRST_SELECTION
+
+        first_selection, self.first_selection = self.first_selection, None
+        self.moves += 1
+        if (self.board_codes[self.box_index(first_selection)] !=
+                self.board_codes[self.box_index(box)]):
+            self.mismatched = (first_selection, box)
+            return MISMATCH
+        self.matched_pairs += 1
+        if self.has_won():
+            return WON
+        return MATCH
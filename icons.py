@@ -0,0 +1,114 @@
+"""Icons of the Memory Puzzle Game.
+
+An icon is a (shape, color) pair. The classic icons are every shape of
+ALLSHAPES in every color of ALLCOLORS. For boards with more pairs than there
+are classic icons, procedural icon families follow them: regular polygons
+and stars with a number of corners, a rotation and a fill, in the colors of
+a generated palette. Their shape is a string describing those parameters,
+see parse_shape.
+
+Every icon has an icon code, its index into ALL_ICONS, the classic icons
+coming first.
+"""
+import colorsys
+
+from colors import (
+    BLUE,
+    CYAN,
+    GREEN,
+    ORANGE,
+    PURPLE,
+    RED,
+    YELLOW)
+from shapes import (
+    DIAMOND,
+    DONUT,
+    LINES,
+    OVAL,
+    SQUARE)
+
+
+ALLCOLORS = (RED, GREEN, BLUE, YELLOW, ORANGE, PURPLE, CYAN)
+ALLSHAPES = (DONUT, SQUARE, DIAMOND, LINES, OVAL)
+
+# Every classic (shape, color) icon.
+ICONS = tuple((shape, color) for shape in ALLSHAPES for color in ALLCOLORS)
+
+# Procedural shape families and fills
+POLYGON = 'polygon'
+STAR = 'star'
+FILLED = 'filled'
+OUTLINE = 'outline'
+
+POLYGON_SIDES = (3, 4, 5, 6, 8)
+STAR_POINTS = (4, 5, 6, 8)
+
+# The palette has PALETTE_HUES evenly spaced hues, offset by half a step so
+# that they differ from the pure classic colors, in each of PALETTE_VALUES.
+PALETTE_HUES = 24
+PALETTE_VALUES = (1.0, 0.6)
+
+
+def procedural_shape(family, corners, rotation, fill):
+    """Shape string of a procedural shape."""
+    return '%s:%d:%g:%s' % (family, corners, rotation, fill)
+
+
+def parse_shape(shape):
+    """Split a procedural shape into (family, corners, rotation, fill).
+
+    Returns None for the classic shapes.
+    """
+    if ':' not in shape:
+        return None
+    family, corners, rotation, fill = shape.split(':')
+    return family, int(corners), float(rotation), fill
+
+
+def generate_procedural_shapes():
+    """Every procedural shape.
+
+    A shape is drawn upright and rotated by half its symmetry angle, which
+    for a polygon of 4 sides is a square and a diamond.
+    """
+    return tuple(
+        procedural_shape(family, corners, rotation, fill)
+        for family, corner_counts in ((POLYGON, POLYGON_SIDES),
+                                      (STAR, STAR_POINTS))
+        for corners in corner_counts
+        for rotation in (0, 180.0 / corners)
+        for fill in (FILLED, OUTLINE))
+
+
+def generate_palette():
+    """The generated palette of RGB colors."""
+    return tuple(
+        tuple(int(round(channel * 255))
+              for channel in colorsys.hsv_to_rgb(
+                  (hue + 0.5) / PALETTE_HUES, 1.0, value))
+        for value in PALETTE_VALUES
+        for hue in range(PALETTE_HUES))
+
+
+PROCEDURAL_SHAPES = generate_procedural_shapes()
+PALETTE = generate_palette()
+
+# Every icon, indexed by icon code.
+ALL_ICONS = ICONS + tuple((shape, color)
+                          for shape in PROCEDURAL_SHAPES
+                          for color in PALETTE)
+ICON_CODES = dict((icon, code) for code, icon in enumerate(ALL_ICONS))
+
+
+def icon_pool(num_icons):
+    """Icons to pick num_icons different icons from.
+
+    The classic icons as long as there are enough of them, every icon
+    otherwise.
+    """
+    if num_icons <= len(ICONS):
+        return ICONS
+    if num_icons > len(ALL_ICONS):
+        raise ValueError(
+            "Board is too big for the number of shapes/colors defined.")
+    return ALL_ICONS
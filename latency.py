@@ -0,0 +1,187 @@
+"""Input to display latency of the Memory Puzzle Game.
+
+Plays a game under SDL's dummy video driver on real time, with a thread
+injecting mouse motions and clicks through pygame.event.post as a player
+would: hovering every box and then clicking it, pair after pair. Every
+injected event carries the time.perf_counter time it was posted at, from
+which the frame profiler traces the milliseconds until the frame showing
+its effect was presented, see profiler. Reports the percentiles of the
+click and hover latencies and fails when their p95 is over budget.
+
+    python latency.py --grid 4x4
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+from pygame.constants import MOUSEBUTTONUP, MOUSEMOTION, QUIT  # noqa: E402
+
+import game_state  # noqa: E402
+import memorypuzzle  # noqa: E402
+from constants import (  # noqa: E402
+    BOXSIZE,
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    FPS,
+    REVEAL_DURATION)
+from profiler import LATENCY  # noqa: E402
+from recording import PygameInput  # noqa: E402
+
+# Milliseconds the p95 latency of each kind of input may take: a frame at
+# the default frame cap, which the input may wait for, and the frame
+# showing it.
+LATENCY_BUDGETS = OrderedDict([('hover', 2 * 1000 // FPS),
+                               ('click', 2 * 1000 // FPS)])
+
+# Milliseconds between an injected motion onto a box and the click on it,
+# and between the click and the motion onto the next box.
+INPUT_GAP = 100
+
+# Milliseconds after the opening animation before the first injected input.
+START_MARGIN = 500
+
+
+class InjectedInput(PygameInput):
+    """Input read from pygame, where the events are injected.
+
+    pygame.mouse.set_pos does not move the pointer of the dummy video
+    driver, so the mouse position is the last injected motion's instead.
+    """
+
+    def __init__(self):
+        self.pos = (0, 0)
+
+    def track(self, events):
+        """Follow the injected motions in events."""
+        for event in events:
+            if event.type == MOUSEMOTION:
+                self.pos = event.pos
+        return events
+
+    def get(self):
+        """Get the pending events."""
+        return self.track(PygameInput.get(self))
+
+    def wait(self, timeout):
+        """Wait for an event, see pygame.event.wait."""
+        return self.track([PygameInput.wait(self, timeout)])[0]
+
+    def get_pos(self):
+        """Get the position of the last injected motion."""
+        return self.pos
+
+
+def input_script(board, game_grid):
+    """Events hovering and clicking every pair of the board, then quitting.
+
+    Returns (milliseconds since the game started, event) pairs, starting
+    once the opening animation revealed every group of boxes.
+    """
+    game_rows, game_cols = game_grid
+    boxes = {}
+    for x_value in range(game_cols):
+        for y_value in range(game_rows):
+            boxes.setdefault(board[x_value][y_value], []).append(
+                (x_value, y_value))
+    groups = -(-game_rows * game_cols // 8)
+    start = groups * 2 * REVEAL_DURATION + START_MARGIN
+    script = []
+    for pair in boxes.values():
+        for box in pair:
+            left, top = memorypuzzle.left_top_coords_of_box(box, game_grid)
+            pos = (left + BOXSIZE // 2, top + BOXSIZE // 2)
+            script.append((start, pygame.event.Event(
+                MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))))
+            script.append((start + INPUT_GAP, pygame.event.Event(
+                MOUSEBUTTONUP, pos=pos, button=1)))
+            start += 2 * INPUT_GAP
+    # The win is shown before quitting.
+    script.append((start + 2 * REVEAL_DURATION, pygame.event.Event(QUIT)))
+    return script
+
+
+def inject(script, start):
+    """Post the events of script on time, from start in perf_counter time.
+
+    Every event is posted with the time it was posted at.
+    """
+    for milliseconds, event in script:
+        delay = start + milliseconds / 1000.0 - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        attributes = dict(event.dict, posted=time.perf_counter())
+        pygame.event.post(pygame.event.Event(event.type, attributes))
+
+
+def measure(game_grid=(EASY_GAME_ROWS, EASY_GAME_COLS), seed=0,
+            frame_cap=FPS):
+    """Play a game of injected input and return its latency percentiles.
+
+    Returns the PERCENTILES of memorypuzzle.PROFILER keyed by the kind of
+    input, which it enables and clears.
+    """
+    fps_clock, backend = memorypuzzle.get_game_clock_backend()
+    pygame.event.clear()
+    random.seed(seed)
+    script = input_script(game_state.get_randomized_board(game_grid),
+                          game_grid)
+    random.seed(seed)
+    profiler = memorypuzzle.PROFILER
+    profiler.samples.clear()
+    profiler.enable()
+    frame_cap, memorypuzzle.RENDER_SETTINGS['frame_cap'] = (
+        memorypuzzle.RENDER_SETTINGS['frame_cap'], frame_cap)
+    injector = threading.Thread(target=inject, name='input injector',
+                                args=(script, time.perf_counter()))
+    injector.daemon = True
+    injector.start()
+    try:
+        memorypuzzle.game_loop(backend, fps_clock, game_grid=game_grid,
+                               input_source=InjectedInput())
+    except SystemExit:
+        pass
+    finally:
+        memorypuzzle.RENDER_SETTINGS['frame_cap'] = frame_cap
+        injector.join()
+    return OrderedDict((kind, profiler.percentiles(LATENCY + kind))
+                       for kind in LATENCY_BUDGETS)
+
+
+def over_budget(latencies):
+    """Kinds of input whose p95 latency is over its budget."""
+    return [kind for kind, budget in LATENCY_BUDGETS.items()
+            if latencies[kind]['p95'] > budget]
+
+
+def main(argv=()):
+    """Measure the input latency, failing when it is over budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--grid', metavar='ROWSxCOLS',
+                        type=memorypuzzle.parse_grid,
+                        default=(EASY_GAME_ROWS, EASY_GAME_COLS),
+                        help="board size played (default %(default)s)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the board (default %(default)s)")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="frame cap, 0 for none (default %(default)s)")
+    args = parser.parse_args(argv)
+    latencies = measure(args.grid, args.seed, args.fps)
+    for kind, values in latencies.items():
+        print("%-6s p50 %6.1f ms  p95 %6.1f ms  p99 %6.1f ms  (budget %d)"
+              % (kind, values['p50'], values['p95'], values['p99'],
+                 LATENCY_BUDGETS[kind]))
+    slow = over_budget(latencies)
+    for kind in slow:
+        sys.stderr.write("%s latency over budget\n" % kind)
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,189 @@
+"""Leaderboard of the Memory Puzzle Game.
+
+The results of won games are kept in a local SQLite database, with an index
+on the board size and the score, so that the best results of a board size
+are read straight from the index however many results are stored.
+
+Saving a result only queues it: a background thread owning its own
+connection writes the queued results in batches, one transaction per batch,
+so the game loop never waits for the disk. The database is in write-ahead
+logging mode, which lets the game read the leaderboard while results are
+written.
+
+    python leaderboard.py --top 10
+    python leaderboard.py --grid 6x6 --db scores.db
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+from constants import (
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    HARD_GAME_COLS,
+    HARD_GAME_ROWS,
+    LEADERBOARD_PATH,
+    MEDIUM_GAME_COLS,
+    MEDIUM_GAME_ROWS)
+from timing import format_duration
+
+LEVELS = (
+    ('easy', (EASY_GAME_ROWS, EASY_GAME_COLS)),
+    ('medium', (MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS)),
+    ('hard', (HARD_GAME_ROWS, HARD_GAME_COLS)))
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS results ("
+    "id INTEGER PRIMARY KEY, rows INTEGER NOT NULL, cols INTEGER NOT NULL, "
+    "score INTEGER NOT NULL, moves INTEGER NOT NULL, "
+    "milliseconds INTEGER NOT NULL, played_at REAL NOT NULL)",
+    # The best results of a board size first, faster ones first among equal
+    # scores, in the order top reads them.
+    "CREATE INDEX IF NOT EXISTS results_by_score "
+    "ON results (rows, cols, score DESC, milliseconds)")
+
+INSERT = ("INSERT INTO results (rows, cols, score, moves, milliseconds, "
+          "played_at) VALUES (?, ?, ?, ?, ?, ?)")
+
+TOP = ("SELECT score, moves, milliseconds, played_at FROM results "
+       "WHERE rows = ? AND cols = ? "
+       "ORDER BY score DESC, milliseconds LIMIT ?")
+
+BEST = "SELECT MAX(score) FROM results WHERE rows = ? AND cols = ?"
+
+# Most results the writer thread inserts in a single transaction.
+BATCH_SIZE = 1000
+
+# Results shown per board size by default.
+TOP_COUNT = 10
+
+
+def connect(path):
+    """Open the database at path, creating its table and index."""
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    with connection:
+        for statement in SCHEMA:
+            connection.execute(statement)
+    return connection
+
+
+class Leaderboard(object):
+    """Results of won games stored at path, written by a background thread.
+
+    Reads use a connection of the thread that opened the leaderboard.
+    Results saved are read back once written, see flush.
+    """
+
+    def __init__(self, path=LEADERBOARD_PATH, batch_size=BATCH_SIZE):
+        self.path = os.path.expanduser(path)
+        self.batch_size = batch_size
+        self.connection = connect(self.path)
+        self.results = queue.Queue()
+        self.writer = threading.Thread(
+            target=self.write_results, name='leaderboard writer')
+        self.writer.daemon = True
+        self.writer.start()
+
+    def save(self, game_grid, moves, milliseconds, score, played_at=None):
+        """Queue the result of a won game to be written, without waiting."""
+        game_rows, game_cols = game_grid
+        self.results.put((game_rows, game_cols, score, moves, milliseconds,
+                          time.time() if played_at is None else played_at))
+
+    def write_results(self):
+        """Write the queued results in batches until closed."""
+        connection = connect(self.path)
+        closed = False
+        while not closed:
+            batch = [self.results.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.results.get_nowait())
+                except queue.Empty:
+                    break
+            closed = None in batch
+            rows = [result for result in batch if result is not None]
+            try:
+                with connection:
+                    connection.executemany(INSERT, rows)
+            except sqlite3.Error as error:
+                sys.stderr.write("leaderboard: %d results lost: %s\n"
+                                 % (len(rows), error))
+            for _ in batch:
+                self.results.task_done()
+        connection.close()
+
+    def flush(self):
+        """Wait until every result saved so far is written."""
+        self.results.join()
+
+    def close(self):
+        """Write the queued results and close the leaderboard."""
+        self.results.put(None)
+        self.writer.join()
+        self.connection.close()
+
+    def top(self, game_grid, count=TOP_COUNT):
+        """The best count results on the board size.
+
+        Returns (score, moves, milliseconds, played at) tuples, the best
+        first.
+        """
+        return self.connection.execute(
+            TOP, tuple(game_grid) + (count,)).fetchall()
+
+    def best(self, game_grid):
+        """The best score on the board size, None before the first win."""
+        return self.connection.execute(BEST, tuple(game_grid)).fetchone()[0]
+
+
+def report(leaderboard, levels, count=TOP_COUNT):
+    """Lines listing the best results of every level."""
+    lines = []
+    for name, game_grid in levels:
+        lines.append("%s (%dx%d)" % ((name,) + tuple(game_grid)))
+        for rank, (score, moves, milliseconds, played_at) in enumerate(
+                leaderboard.top(game_grid, count), 1):
+            lines.append("%3d. %6d %5d moves %7s  %s" % (
+                rank, score, moves, format_duration(milliseconds),
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(played_at))))
+    return lines
+
+
+def main(argv=()):
+    """Print the best results of every level."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', metavar='FILE', default=LEADERBOARD_PATH,
+                        help="leaderboard database (default %s)"
+                             % LEADERBOARD_PATH)
+    parser.add_argument('--top', type=int, default=TOP_COUNT,
+                        help="results per level (default %d)" % TOP_COUNT)
+    parser.add_argument('--grid', metavar='ROWSxCOLS', action='append',
+                        help="only list this board size, may be repeated")
+    args = parser.parse_args(argv)
+    levels = LEVELS
+    if args.grid:
+        from memorypuzzle import parse_grid
+
+        try:
+            levels = [(text, parse_grid(text)) for text in args.grid]
+        except argparse.ArgumentTypeError as error:
+            parser.error(str(error))
+
+    leaderboard = Leaderboard(args.db)
+    try:
+        for line in report(leaderboard, levels, args.top):
+            print(line)
+    finally:
+        leaderboard.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -7,25 +7,30 @@ Adapted from the original game written by Al Sweigart al@inventwithpython.com
 
 @author: Senthil Kumaran <senthil@uthcode.com>
 """
+import argparse
+import math
+import os
 import random
 import sys
+import time
+from collections import OrderedDict
 
 import pygame
-from pygame.constants import K_ESCAPE, KEYUP, MOUSEBUTTONUP, MOUSEMOTION, QUIT
+from pygame.constants import (
+    K_DOWN, K_ESCAPE, K_LEFT, K_RIGHT, K_UP, K_t, KEYDOWN, KEYUP,
+    MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL, NOEVENT, QUIT)
 
+from animation import Animation, Scheduler, end_time
+from audio import Audio
 from colors import (
     BGCOLOR,
-    BLUE,
     BOXCOLOR,
     CYAN,
-    GREEN,
     HIGHLIGHTCOLOR,
     IVORY,
     LIGHTBGCOLOR,
     ORANGE,
-    PURPLE,
-    RED,
-    YELLOW)
+    PURPLE)
 from constants import (
     BOXSIZE,
     EASY_GAME_COLS,
@@ -34,234 +39,807 @@ from constants import (
     EASY_TEXT_POS,
     FPS,
     FONT_SIZE,
-    GAPSIZE,
     HARD_GAME_COLS,
     HARD_GAME_ROWS,
     HARD_RECT,
     HARD_TEXT_POS,
+    LEADERBOARD_PATH,
     MEDIUM_GAME_COLS,
     MEDIUM_GAME_ROWS,
     MEDIUM_RECT,
     MEDIUM_TEXT_POS,
+    REVEAL_DURATION,
     REVEALSPEED,
     WINDOWHEIGHT,
-    WINDOWWIDTH, GAME_WON_FLASH_WAIT, GAME_END_WAIT, PIECE_CLOSE_WAIT,
-    QUARTER_BOXSIZE, HALF_BOXSIZE)
+    WINDOWWIDTH, GAME_WON_FLASH_WAIT, GAME_END_WAIT, PIECE_CLOSE_WAIT)
+from game_state import (
+    MATCH,
+    MISMATCH,
+    WON,
+    GameState,
+    generate_revealed_boxes_data,
+    revealed_lookup,
+    get_shape_and_color,
+    score)
+from icons import (
+    ALL_ICONS, ALLCOLORS, ALLSHAPES, FILLED, ICON_CODES, STAR, icon_pool,
+    parse_shape)
+from profiler import BUSY, FRAME, PROFILER
+from recording import (
+    EndOfRecording, PygameInput, Recorder, ReplayDivergence, Replayer)
+from render_backends import (
+    BACKENDS, NullBackend, SurfaceBackend, TextureBackend)
 from shapes import (
     DIAMOND,
     DONUT,
     LINES,
     OVAL,
     SQUARE)
+from timing import FixedTimestep, format_duration
+from viewport import PAN_STEP, Viewport
+
+# Icon atlases keyed by box size, see get_icon_atlas, those of the theme
+# once one is set, see set_theme.
+_ICON_ATLAS = {}
+
+# Colors the game is drawn in, those of the theme once one is set.
+CLASSIC_COLORS = {'background': BGCOLOR, 'flash': LIGHTBGCOLOR,
+                  'box': BOXCOLOR, 'highlight': HIGHLIGHTCOLOR}
+THEME_COLORS = dict(CLASSIC_COLORS)
+
+# Themes THEME_KEY cycles through, None being the classic look, and the
+# index of the one drawn, see cycle_theme.
+THEME_SETTINGS = {'themes': (None,), 'current': 0}
+THEME_KEY = K_t
+
+# Least recently used surfaces of the icons missing from the atlas keyed by
+# (shape, color, box size), see get_icon_surface.
+_ICON_SURFACES = OrderedDict()
+ICON_CACHE_SIZE = 1024
+
+# Least recently used strips of the reveal and cover animation frames of the
+# icons keyed by (icon, box size), holding up to ANIMATION_STRIP_CACHE_BYTES
+# of pixels, see get_animation_strip.
+_ANIMATION_STRIPS = OrderedDict()
+ANIMATION_STRIP_CACHE_BYTES = 8 * 1024 * 1024
+
+# Frames of an animation strip, the REVEALSPEED steps of a box reveal or
+# cover scaled to the box size.
+ANIMATION_FRAMES = BOXSIZE // REVEALSPEED + 1
+
+# Viewports keyed by (rows, cols), see get_viewport.
+_VIEWPORTS = {}
+
+# Arrow keys panning the board by PAN_STEP.
+PAN_KEYS = {
+    K_LEFT: (PAN_STEP, 0),
+    K_RIGHT: (-PAN_STEP, 0),
+    K_UP: (0, PAN_STEP),
+    K_DOWN: (0, -PAN_STEP)}
+
+# Mouse buttons panning and zooming the viewport rather than clicking: the
+# right button and the wheel, which also reports as buttons 4 and 5.
+VIEWPORT_BUTTONS = (3, 4, 5)
+
+# How draw_board draws the board, one of BOARD_RENDERERS: a pygame call per
+# box or the whole board composed as a NumPy array, see surfarray_renderer.
+# The frames per second game_loop is capped at, 0 for uncapped, and whether
+# it runs as a benchmark, drawing the whole window every frame without ever
+# waiting for input.
+BOARD_RENDERERS = ('draw', 'surfarray')
+RENDER_SETTINGS = {'board_renderer': 'draw', 'frame_cap': FPS,
+                   'benchmark': False}
+
+# Frames drawn by game_loop, reported by the benchmark mode.
+FRAME_STATS = {'frames': 0}
+
+# Least recently used tile banks of the surfarray renderer keyed by (box
+# size, background color), holding up to BOARD_TILE_BANK_BYTES of tiles,
+# see get_tile_bank.
+_BOARD_TILES = OrderedDict()
+BOARD_TILE_BANKS = 4
+BOARD_TILE_BANK_BYTES = 16 * 1024 * 1024
+
+# Least recently used arrays of the icon codes of the boards drawn by the
+# surfarray renderer keyed by the id of the board, which they keep alive,
+# see get_board_codes.
+_BOARD_CODES = OrderedDict()
+BOARD_CODES_CACHE_SIZE = 4
+
+# Fonts keyed by size, see get_font.
+_FONTS = {}
+
+# Least recently used rendered text surfaces keyed by (text, size, color),
+# see render_text.
+_TEXT_SURFACES = OrderedDict()
+TEXT_CACHE_SIZE = 256
+
+# Welcome screens keyed by window size, see get_welcome_screen.
+_WELCOME_SCREENS = {}
+
+# Where and in which font size draw_profile_overlay draws.
+PROFILE_OVERLAY_RECT = (0, 0, WINDOWWIDTH, 20)
+PROFILE_OVERLAY_FONT_SIZE = 20
+
+# Where and in which font size draw_status draws the time and moves.
+STATUS_RECT = (0, WINDOWHEIGHT - 20, WINDOWWIDTH, 20)
+STATUS_FONT_SIZE = 20
+
+# Milliseconds spent blocked waiting for input, see get_mouse_click.
+IDLE_STATS = {'idle_ms': 0}
+
+# Where the game reads its input from unless recording or replaying.
+PYGAME_INPUT = PygameInput()
+
+
+def get_viewport(game_grid):
+    """Get the viewport of the grid, creating it on first use."""
+    if game_grid not in _VIEWPORTS:
+        _VIEWPORTS[game_grid] = Viewport(game_grid)
+    return _VIEWPORTS[game_grid]
+
+
+def set_viewport(game_grid, viewport):
+    """Draw the grid through viewport, as when drawing it offscreen."""
+    _VIEWPORTS[game_grid] = viewport
+
+
+def set_theme(theme=None):
+    """Draw with a theme loaded by themes.load_theme, None for the classic
+    look.
+
+    The theme brings its icon atlases and the surfaces drawn in the colors
+    of the previous theme are dropped, so nothing is drawn again until used.
+    """
+    for cache in (_ICON_ATLAS, _ANIMATION_STRIPS, _BOARD_TILES,
+                  _WELCOME_SCREENS):
+        cache.clear()
+    if theme is None:
+        THEME_COLORS.update(CLASSIC_COLORS)
+    else:
+        THEME_COLORS.update(theme.colors)
+        _ICON_ATLAS.update(theme.atlases)
 
 
-ALLCOLORS = (RED, GREEN, BLUE, YELLOW, ORANGE, PURPLE, CYAN)
-ALLSHAPES = (DONUT, SQUARE, DIAMOND, LINES, OVAL)
+def cycle_theme():
+    """Draw with the next theme of THEME_SETTINGS."""
+    themes = THEME_SETTINGS['themes']
+    THEME_SETTINGS['current'] = (THEME_SETTINGS['current'] + 1) % len(themes)
+    set_theme(themes[THEME_SETTINGS['current']])
 
 
 def left_top_coords_of_box(box, game_grid):
     """Top left coordinates of a box."""
+    return get_viewport(game_grid).left_top(box)
 
-    def get_xy_margins(grid):
-        """Calculate the x, y margins of the grid."""
-        game_rows, game_cols = grid
-        return (int((WINDOWWIDTH - (game_cols * (BOXSIZE + GAPSIZE))) / 2),
-                int((WINDOWHEIGHT - (game_rows * (BOXSIZE + GAPSIZE))) / 2))
 
-    xmargin, ymargin = get_xy_margins(game_grid)
-    x_value, y_value = box
-    left = xmargin + x_value * (BOXSIZE + GAPSIZE)
-    top = ymargin + y_value * (BOXSIZE + GAPSIZE)
-    return left, top
+def get_box_under_mouse(pointer, game_grid):
+    """Get the box at a pixel, see Viewport.box_at."""
+    return get_viewport(game_grid).box_at(pointer)
 
 
-def draw_box_covers(display_surface, fps_clock, board, boxes, coverage,
-                    game_grid):
+def draw_box_covers(backend, board, boxes, coverage, game_grid):
     """Draw boxes being covered/revealed.
 
     boxes is a list of two-item lists, which have the x & y spot of the box.
+    coverage is the width of the cover over the left of the icons, every
+    box is drawn with a single blit of the frame of its animation strip
+    covering them the most without exceeding it.
+    Returns the dirty rects of the boxes.
     """
+    box_size = get_viewport(game_grid).box_size
+    frame = pygame.Rect(
+        max(0, min(box_size, coverage)) * (ANIMATION_FRAMES - 1) //
+        box_size * box_size, 0, box_size, box_size)
+    dirty_rects = []
     for box in boxes:
         left, top = left_top_coords_of_box(box, game_grid)
-        pygame.draw.rect(
-            display_surface,
-            BGCOLOR,
-            (left, top, BOXSIZE, BOXSIZE))
-        shape, color = get_shape_and_color(board, box)
-        draw_icon(display_surface, shape, color, box, game_grid)
-        if coverage > 0:  # only draw the cover if there is an coverage
-            pygame.draw.rect(
-                display_surface,
-                BOXCOLOR,
-                (left, top, coverage, BOXSIZE))
-    pygame.display.update()
-    fps_clock.tick(FPS)
-
-
-def draw_icon(display_surface, shape, color, box, game_grid):
-    """Draw icon of the piece."""
-    left, top = left_top_coords_of_box(box, game_grid)
-
-    # Draw the shapes
-    if shape == DONUT:
+        dirty_rects.append((left, top, box_size, box_size))
+        backend.draw_tile(
+            get_animation_strip(get_shape_and_color(board, box), box_size),
+            (left, top),
+            frame)
+    return dirty_rects
+
+
+def lru_lookup(cache, key, max_size, build, size=None):
+    """Look key up in an OrderedDict least recently used cache.
+
+    Calls build() to make the value of a missing key, evicting the least
+    recently used entries once the cache holds more than max_size entries,
+    or more than max_size in total of size(value) if given.
+    """
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+    value = cache[key] = build()
+    if size is None:
+        if len(cache) > max_size:
+            cache.popitem(last=False)
+    else:
+        total = sum(size(entry) for entry in cache.values())
+        while total > max_size and len(cache) > 1:
+            total -= size(cache.popitem(last=False)[1])
+    return value
+
+
+def procedural_points(family, corners, rotation, left, top,
+                       box_size=BOXSIZE):
+    """Corner points of a procedural polygon or star shape.
+
+    The first corner points up before rotating clockwise by rotation
+    degrees. A star alternates its outer corners with inner ones. Points are
+    rounded relative to the box so that an icon looks the same wherever it
+    is drawn.
+    """
+    half = box_size // 2
+    outer = half - 2 * box_size // BOXSIZE
+    if family == STAR:
+        radii = (outer, outer * 0.45)
+    else:
+        radii = (outer,)
+    count = corners * len(radii)
+    points = []
+    for i in range(count):
+        angle = math.radians(rotation + 360.0 * i / count)
+        radius = radii[i % len(radii)]
+        points.append(
+            (left + half + int(round(radius * math.sin(angle))),
+             top + half - int(round(radius * math.cos(angle)))))
+    return points
+
+
+def render_icon(surface, shape, color, left, top, box_size=BOXSIZE,
+                background=BGCOLOR):
+    """Draw the primitives of an icon with its top left corner at left, top.
+
+    The icon is drawn to fit a box of box_size, the hole of a donut in the
+    background color.
+    """
+    half, quarter = box_size // 2, box_size // 4
+
+    def scale(length):
+        """A length of the icons of BOXSIZE in the icon of box_size."""
+        return max(1, length * box_size // BOXSIZE)
+
+    procedural = parse_shape(shape)
+    if procedural is not None:
+        family, corners, rotation, fill = procedural
+        pygame.draw.polygon(
+            surface,
+            color,
+            procedural_points(family, corners, rotation, left, top,
+                              box_size),
+            0 if fill == FILLED else scale(3))
+    elif shape == DONUT:
         pygame.draw.circle(
-            display_surface,
+            surface,
             color,
-            (left + HALF_BOXSIZE, top + HALF_BOXSIZE),
-            HALF_BOXSIZE - 5)
+            (left + half, top + half),
+            half - scale(5))
         pygame.draw.circle(
-            display_surface,
-            BGCOLOR,
-            (left + HALF_BOXSIZE, top + HALF_BOXSIZE),
-            QUARTER_BOXSIZE - 5)
+            surface,
+            background,
+            (left + half, top + half),
+            quarter - scale(5))
     elif shape == SQUARE:
         pygame.draw.rect(
-            display_surface,
+            surface,
             color,
-            (left + QUARTER_BOXSIZE,
-             top + QUARTER_BOXSIZE,
-             BOXSIZE - HALF_BOXSIZE,
-             BOXSIZE - HALF_BOXSIZE))
+            (left + quarter,
+             top + quarter,
+             box_size - half,
+             box_size - half))
     elif shape == DIAMOND:
         pygame.draw.polygon(
-            display_surface,
+            surface,
             color,
-            ((left + HALF_BOXSIZE, top),
-             (left + BOXSIZE - 1, top + HALF_BOXSIZE),
-             (left + HALF_BOXSIZE, top + BOXSIZE - 1),
-             (left, top + HALF_BOXSIZE)))
+            ((left + half, top),
+             (left + box_size - 1, top + half),
+             (left + half, top + box_size - 1),
+             (left, top + half)))
     elif shape == LINES:
-        for i in range(0, BOXSIZE, 4):
+        for i in range(0, box_size, scale(4)):
             pygame.draw.line(
-                display_surface,
+                surface,
                 color,
                 (left, top + i),
                 (left + i, top))
             pygame.draw.line(
-                display_surface,
+                surface,
                 color,
-                (left + i, top + BOXSIZE - 1),
-                (left + BOXSIZE - 1, top + i))
+                (left + i, top + box_size - 1),
+                (left + box_size - 1, top + i))
     elif shape == OVAL:
         pygame.draw.ellipse(
-            display_surface,
+            surface,
             color,
-            (left, top + QUARTER_BOXSIZE, BOXSIZE, HALF_BOXSIZE))
+            (left, top + quarter, box_size, half))
+
+
+def build_icon_atlas(box_size=BOXSIZE, shapes=ALLSHAPES, colors=ALLCOLORS,
+                     background=BGCOLOR):
+    """Bake every shape in every color into a single atlas surface.
+
+    Returns the atlas and a dict mapping (shape, color) to the sub-rect of the
+    atlas holding that icon. Pixels outside the icons are fully transparent so
+    the atlas can be blitted over any background color.
+
+    A theme draws the classic icons with its own shapes and colors, the
+    shapes and colors at the same index of ALLSHAPES and ALLCOLORS, at its
+    own box_size, see themes.
+    """
+    atlas = pygame.Surface(
+        (len(ALLSHAPES) * box_size, len(ALLCOLORS) * box_size),
+        pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    icon_rects = {}
+    for shape_index, shape in enumerate(ALLSHAPES):
+        for color_index, color in enumerate(ALLCOLORS):
+            left, top = shape_index * box_size, color_index * box_size
+            render_icon(atlas, shapes[shape_index], colors[color_index],
+                        left, top, box_size, background)
+            icon_rects[(shape, color)] = pygame.Rect(
+                left, top, box_size, box_size)
+    if pygame.display.get_init() and pygame.display.get_surface():
+        atlas = atlas.convert_alpha()
+    return atlas, icon_rects
+
+
+def scale_icons(surface, box_size):
+    """Scale a surface of icons drawn at BOXSIZE to icons of box_size."""
+    width, height = surface.get_size()
+    return pygame.transform.smoothscale(
+        surface,
+        (width * box_size // BOXSIZE, height * box_size // BOXSIZE))
+
+
+def get_icon_atlas(box_size=BOXSIZE):
+    """Get the icon atlas for a box size, building it on first use.
+
+    Atlases for other box sizes than BOXSIZE, used when zoomed, are scaled
+    from the BOXSIZE atlas.
+    """
+    if box_size not in _ICON_ATLAS:
+        if box_size == BOXSIZE:
+            _ICON_ATLAS[box_size] = build_icon_atlas()
+        else:
+            atlas, icon_rects = get_icon_atlas()
+            _ICON_ATLAS[box_size] = (
+                scale_icons(atlas, box_size),
+                dict((icon, pygame.Rect(rect.left * box_size // BOXSIZE,
+                                        rect.top * box_size // BOXSIZE,
+                                        box_size,
+                                        box_size))
+                     for icon, rect in icon_rects.items()))
+    return _ICON_ATLAS[box_size]
+
+
+def build_icon_surface(shape, color):
+    """Render a single icon onto a transparent surface of BOXSIZE."""
+    surface = pygame.Surface((BOXSIZE, BOXSIZE), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 0))
+    render_icon(surface, shape, color, 0, 0)
+    if pygame.display.get_init() and pygame.display.get_surface():
+        surface = surface.convert_alpha()
+    return surface
+
+
+def get_icon_surface(shape, color, box_size=BOXSIZE):
+    """Get the surface of an icon missing from the atlas.
+
+    Icons are rendered on first use and the ICON_CACHE_SIZE most recently
+    used are kept, so that boards with thousands of procedural icons do not
+    hold a surface for every one of them.
+    """
+    def build():
+        if box_size == BOXSIZE:
+            return build_icon_surface(shape, color)
+        return scale_icons(get_icon_surface(shape, color), box_size)
+    return lru_lookup(_ICON_SURFACES, (shape, color, box_size),
+                      ICON_CACHE_SIZE, build)
+
+
+def icon_source(shape, color, box_size=BOXSIZE):
+    """The surface and the area of it holding an icon of box_size.
+
+    That is the icon atlas, except for the procedural icons which are not in
+    the atlas and have their own cached surface instead.
+    """
+    atlas, icon_rects = get_icon_atlas(box_size)
+    icon_rect = icon_rects.get((shape, color))
+    if icon_rect is None:
+        return get_icon_surface(shape, color, box_size), None
+    return atlas, icon_rect
+
+
+def blit_icon(surface, shape, color, position, box_size=BOXSIZE):
+    """Blit an icon of box_size to position from the icon atlas."""
+    source, area = icon_source(shape, color, box_size)
+    surface.blit(source, position, area)
+
+
+def draw_icon(backend, shape, color, box, game_grid):
+    """Draw icon of the piece as a tile of the icon atlas."""
+    source, area = icon_source(shape, color,
+                               get_viewport(game_grid).box_size)
+    backend.draw_tile(source, left_top_coords_of_box(box, game_grid), area)
+
 
+def build_animation_strip(icon, box_size):
+    """Bake the reveal and cover animation frames of an icon into a strip.
 
-def game_won(display_surface, board, game_grid):
+    Frame i of the strip, i from 0 to ANIMATION_FRAMES - 1, is the icon over
+    the background covered on its left by i steps of box_size /
+    (ANIMATION_FRAMES - 1) pixels, side by side at i * box_size.
+    """
+    shape, color = icon
+    strip = pygame.Surface((ANIMATION_FRAMES * box_size, box_size))
+    if pygame.display.get_init() and pygame.display.get_surface():
+        strip = strip.convert()
+    strip.fill(THEME_COLORS['background'])
+    for frame in range(ANIMATION_FRAMES):
+        left = frame * box_size
+        blit_icon(strip, shape, color, (left, 0), box_size)
+        coverage = frame * box_size // (ANIMATION_FRAMES - 1)
+        if coverage > 0:
+            strip.fill(THEME_COLORS['box'], (left, 0, coverage, box_size))
+    return strip
+
+
+def surface_bytes(surface):
+    """Bytes of the pixels of a surface."""
+    return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+def get_animation_strip(icon, box_size=BOXSIZE):
+    """Get the animation strip of an icon, see build_animation_strip.
+
+    Strips are baked on first use and the most recently used are kept, up to
+    ANIMATION_STRIP_CACHE_BYTES.
+    """
+    return lru_lookup(_ANIMATION_STRIPS, (icon, box_size),
+                      ANIMATION_STRIP_CACHE_BYTES,
+                      lambda: build_animation_strip(icon, box_size),
+                      surface_bytes)
+
+
+def game_won(backend, board, game_grid, start):
     """Game is won by the place.
 
-    Flash the background color celebrating the players win."""
-    covered_boxes = generate_revealed_boxes_data(True, game_grid)
-    flash_colors = [LIGHTBGCOLOR, BGCOLOR]
-    for count in range(10):
-        display_surface.fill(flash_colors[count % 2])
-        draw_board(display_surface, board, covered_boxes, game_grid)
-        pygame.display.update()
-        pygame.time.wait(GAME_WON_FLASH_WAIT)
-    pygame.time.wait(GAME_END_WAIT)
-
-
-def cover_boxes_animation(display_surface, fps_clock, board, boxes_to_cover,
-                          game_grid):
-    """Do the box cover animation."""
-    for coverage in range(0, BOXSIZE + REVEALSPEED, REVEALSPEED):
-        draw_box_covers(
-            display_surface,
-            fps_clock,
+    Returns the animations flashing the background color celebrating the
+    players win from start, followed by a pause."""
+    revealed_boxes = revealed_lookup(
+        generate_revealed_boxes_data(True, game_grid))
+    flash_colors = [THEME_COLORS['flash'], THEME_COLORS['background']]
+
+    def flash(flash_color):
+        """Step drawing the board over the flash color."""
+        def step(progress):
+            backend.fill(flash_color)
+            draw_board(backend, board, revealed_boxes, game_grid,
+                       flash_color)
+            return [backend.get_rect()]
+        return step
+
+    animations = [
+        Animation(
+            start + count * GAME_WON_FLASH_WAIT,
+            0,
+            flash(flash_colors[count % 2]))
+        for count in range(10)]
+    animations.append(Animation(
+        start + 10 * GAME_WON_FLASH_WAIT,
+        GAME_END_WAIT,
+        lambda progress: None))
+    return animations
+
+
+def sound_cue(audio, name, start):
+    """Animation playing the sound effect of name at start."""
+    return Animation(start, 0, lambda progress: audio.play(name))
+
+
+def cover_boxes_animation(backend, board, boxes_to_cover, game_grid,
+                          start, done=None):
+    """The box cover animation starting at start."""
+    def step(progress):
+        return draw_box_covers(
+            backend,
             board,
             boxes_to_cover,
-            coverage,
+            int(get_viewport(game_grid).box_size * progress),
             game_grid)
+    return Animation(start, REVEAL_DURATION, step, done)
 
 
-def get_shape_and_color(board, box):
-    """Get the Shape and Color."""
-    x_value, y_value = box
-    return board[x_value][y_value][0], board[x_value][y_value][1]
-
-
-def reveal_boxes_animation(display_surface, fps_clock, board, boxes_to_reveal,
-                           game_grid):
-    """Do the box reveal animation."""
-    for coverage in range(BOXSIZE, -1, -REVEALSPEED):
-        draw_box_covers(
-            display_surface,
-            fps_clock,
+def reveal_boxes_animation(backend, board, boxes_to_reveal, game_grid,
+                           start, done=None):
+    """The box reveal animation starting at start."""
+    def step(progress):
+        return draw_box_covers(
+            backend,
             board,
             boxes_to_reveal,
-            coverage,
+            int(get_viewport(game_grid).box_size * (1 - progress)),
             game_grid)
+    return Animation(start, REVEAL_DURATION, step, done)
 
 
-def draw_highlight_box(display_surface, box, game_grid):
+def highlight_rect(box, game_grid):
+    """Screen area of a box including the margin its highlight is drawn in."""
+    viewport = get_viewport(game_grid)
+    left, top = viewport.left_top(box)
+    margin = viewport.scale(5)
+    return (left - margin, top - margin,
+            viewport.box_size + 2 * margin, viewport.box_size + 2 * margin)
+
+
+def draw_highlight_box(backend, box, game_grid):
     """Draw the highlight box."""
-    left, top = left_top_coords_of_box(box, game_grid)
-    pygame.draw.rect(
-        display_surface,
-        HIGHLIGHTCOLOR,
-        (left - 5, top - 5, BOXSIZE + 10, BOXSIZE + 10),
-        4)
+    backend.draw_highlight(
+        highlight_rect(box, game_grid),
+        THEME_COLORS['highlight'],
+        get_viewport(game_grid).scale(4))
+
+
+def idle_ratio():
+    """Fraction of the time since pygame.init spent idle waiting for input."""
+    elapsed = pygame.time.get_ticks()
+    if not elapsed:
+        return 0.0
+    return min(1.0, float(IDLE_STATS['idle_ms']) / elapsed)
+
+
+def report_idle_stats():
+    """Print the idle vs active time if MEMORYPUZZLE_IDLE_STATS is set."""
+    if os.environ.get('MEMORYPUZZLE_IDLE_STATS'):
+        ratio = idle_ratio()
+        sys.stderr.write("idle: %.1f%% active: %.1f%%\n" %
+                         (ratio * 100, (1 - ratio) * 100))
 
 
-def get_mouse_click():
+def get_mouse_click(timeout=None, viewport=None, input_source=PYGAME_INPUT):
     """Gets the mouse click position.
 
-    Returns a tuple of if a mouse was clocked and the x, y coordinates."""
+    Returns a tuple of if a mouse was clocked and the x, y coordinates.
+    Without a timeout the pending events are polled. With a timeout in
+    milliseconds, when no event is pending, blocks until an event arrives or
+    the timeout expires, where a timeout of 0 waits for the next event.
+
+    With a viewport, the arrow keys and dragging with the right mouse button
+    pan it, the mouse wheel zooms it and THEME_KEY switches the theme.
+    Events are read from input_source, pygame by default, see recording."""
     mouse_clicked = False
     mouse_xpos = 0
     mouse_ypos = 0
-    for event in pygame.event.get():  # event handling loop
+    with PROFILER.phase('events'):
+        events = input_source.get()
+    arrived = PROFILER.events_read()
+    if not events and timeout is not None:
+        with PROFILER.idle('idle'):
+            wait_start = pygame.time.get_ticks()
+            event = input_source.wait(timeout)
+            IDLE_STATS['idle_ms'] += pygame.time.get_ticks() - wait_start
+        if event.type != NOEVENT:
+            arrived = PROFILER.events_read(waited=True)
+            with PROFILER.phase('events'):
+                events = [event] + input_source.get()
+    for event in events:  # event handling loop
         if (event.type == QUIT or
                 (event.type == KEYUP and event.key == K_ESCAPE)):
+            report_idle_stats()
             pygame.quit()
             sys.exit()
         elif event.type == MOUSEMOTION:
+            PROFILER.input('hover', event, arrived)
             mouse_xpos, mouse_ypos = event.pos
-        elif event.type == MOUSEBUTTONUP:
+            if viewport is not None and event.buttons[2]:
+                viewport.pan(*event.rel)
+        elif (event.type == MOUSEBUTTONUP and
+                event.button not in VIEWPORT_BUTTONS):
+            PROFILER.input('click', event, arrived)
             mouse_xpos, mouse_ypos = event.pos
             mouse_clicked = True
+        elif viewport is not None:
+            if event.type == KEYDOWN and event.key in PAN_KEYS:
+                viewport.pan(*PAN_KEYS[event.key])
+            elif event.type == KEYDOWN and event.key == THEME_KEY:
+                cycle_theme()
+                # The board is drawn again in the new theme.
+                viewport.update()
+            elif event.type == MOUSEWHEEL:
+                viewport.zoom_at(event.y, input_source.get_pos())
     return mouse_clicked, (mouse_xpos, mouse_ypos)
 
 
-def draw_board(display_surface, board, revealed, game_grid):
-    """Draw the Board."""
-    game_rows, game_cols = game_grid
-    for x_value in range(game_cols):
-        for y_value in range(game_rows):
-            box = (x_value, y_value)
-            left, top = left_top_coords_of_box(box, game_grid)
-            if not revealed[x_value][y_value]:
-                # Draw a covered Box
-                pygame.draw.rect(
-                    display_surface,
-                    BOXCOLOR,
-                    (left, top, BOXSIZE, BOXSIZE),
-                    3)
-            else:
-                shape, color = get_shape_and_color(board, box)
-                draw_icon(
-                    display_surface,
-                    shape,
-                    color,
-                    box,
+def draw_box(backend, board, is_revealed, box, game_grid):
+    """Draw a single box, covered or showing its icon.
+
+    is_revealed returns the revealed status of a box, see revealed_lookup.
+    """
+    if not is_revealed(box):
+        # Draw a covered Box
+        viewport = get_viewport(game_grid)
+        left, top = viewport.left_top(box)
+        backend.draw_cover(
+            (left, top, viewport.box_size, viewport.box_size),
+            THEME_COLORS['box'],
+            viewport.scale(3))
+    else:
+        shape, color = get_shape_and_color(board, box)
+        draw_icon(
+            backend,
+            shape,
+            color,
+            box,
+            game_grid)
+
+
+def redraw_box(backend, board, is_revealed, box, game_grid):
+    """Clear a box and its highlight margin and draw the box again.
+
+    Returns the dirty rect that has to be updated on the display.
+    """
+    dirty_rect = highlight_rect(box, game_grid)
+    backend.fill(THEME_COLORS['background'], dirty_rect)
+    draw_box(backend, board, is_revealed, box, game_grid)
+    return dirty_rect
+
+
+def get_tile_bank(box_size, background):
+    """Get the tile bank of the surfarray renderer for box_size.
+
+    Its tiles are baked over background, see surfarray_renderer.
+    """
+    import surfarray_renderer
+
+    return lru_lookup(
+        _BOARD_TILES, (box_size, tuple(background)), BOARD_TILE_BANKS,
+        lambda: surfarray_renderer.TileBank(
+            box_size, BOARD_TILE_BANK_BYTES // (4 * box_size * box_size)))
+
+
+def get_board_codes(board):
+    """Get the icon codes of a board as a (cols, rows) NumPy array."""
+    import numpy
+
+    def build():
+        return board, numpy.array(
+            [[ICON_CODES[icon] for icon in column] for column in board],
+            numpy.intp)
+    return lru_lookup(_BOARD_CODES, id(board), BOARD_CODES_CACHE_SIZE,
+                      build)[1]
+
+
+def build_board_tile(code, display_surface, game_grid, background):
+    """Bake the tile of the surfarray renderer of an icon code.
+
+    The tile shows the icon from the icon atlas or surfaces, or the cover,
+    drawn like draw_box does, at the current box size in the format of
+    display_surface over background.
+    """
+    import surfarray_renderer
+
+    viewport = get_viewport(game_grid)
+    box_size = viewport.box_size
+    if code == surfarray_renderer.COVER:
+        return surfarray_renderer.cover_tile(
+            box_size, THEME_COLORS['box'], viewport.scale(3),
+            display_surface, background)
+    icon = ALL_ICONS[code]
+    atlas, icon_rects = get_icon_atlas(box_size)
+    if icon in icon_rects:
+        return surfarray_renderer.surface_tile(
+            atlas, display_surface, background, icon_rects[icon])
+    return surfarray_renderer.surface_tile(
+        get_icon_surface(icon[0], icon[1], box_size), display_surface,
+        background)
+
+
+def draw_board_surfarray(backend, board, is_revealed, game_grid,
+                         background=None):
+    """Draw the boxes of the board inside the window in a single pass.
+
+    Draws the same pixels as drawing every box with draw_box over the
+    background color, the background of the theme by default, which the
+    window must already show, see surfarray_renderer. The boxes cut by the
+    window edges are drawn by draw_box, as pygame.draw clips their outlines
+    differently from a tile. NumPy is only needed by this renderer, so it
+    is imported on first use. The backend must draw on a surface, see
+    render_backends.
+    """
+    import numpy
+    import surfarray_renderer
+
+    if background is None:
+        background = THEME_COLORS['background']
+    viewport = get_viewport(game_grid)
+    x_range, y_range = viewport.visible_ranges()
+    x_inside, y_inside = viewport.inside_ranges()
+    if len(x_inside) and len(y_inside):
+        codes = get_board_codes(board)[
+            x_inside.start:x_inside.stop, y_inside.start:y_inside.stop].T
+        revealed = numpy.fromiter(
+            (is_revealed((x_value, y_value))
+             for y_value in y_inside for x_value in x_inside),
+            bool, codes.size).reshape(codes.shape)
+        bank = get_tile_bank(viewport.box_size, background)
+        slots = bank.lookup(
+            numpy.where(revealed, codes, surfarray_renderer.COVER),
+            lambda code: build_board_tile(code, backend.surface, game_grid,
+                                          background))
+        surfarray_renderer.compose_board(
+            backend.surface, viewport,
+            viewport.left_top((x_inside[0], y_inside[0])), slots,
+            bank.tiles)
+    for x_value in x_range:
+        for y_value in y_range:
+            if x_value not in x_inside or y_value not in y_inside:
+                draw_box(backend, board, is_revealed,
+                         (x_value, y_value), game_grid)
+
+
+def draw_board(backend, board, is_revealed, game_grid, background=None):
+    """Draw the boxes of the Board inside the window.
+
+    Draws box by box unless the surfarray renderer was chosen and the
+    backend draws on a surface of 32 bits per pixel, which the surfarray
+    renderer composes on. background is the color the window was filled
+    with, the background of the theme by default.
+    """
+    x_range, y_range = get_viewport(game_grid).visible_ranges()
+    with PROFILER.phase('draw_board'):
+        if (RENDER_SETTINGS['board_renderer'] == 'surfarray' and
+                backend.surface is not None and
+                backend.surface.get_bitsize() == 32):
+            draw_board_surfarray(backend, board, is_revealed, game_grid,
+                                 background)
+            return
+        for x_value in x_range:
+            for y_value in y_range:
+                draw_box(
+                    backend,
+                    board,
+                    is_revealed,
+                    (x_value, y_value),
                     game_grid)
 
 
-def generate_revealed_boxes_data(val, game_grid):
-    """Generate Revealed Boxes Data."""
-    game_rows, game_cols = game_grid
-    revealed_boxes = [[val for _ in range(game_rows)] for _ in range(game_cols)]
-    return revealed_boxes
+def draw_profile_overlay(backend):
+    """Draw the busy time percentiles of the frames of the profiler at the
+    top, with the p95 of the whole frames, idling included.
+
+    Returns the dirty rect of the overlay.
+    """
+    text = "busy p50 %(p50).1f p95 %(p95).1f p99 %(p99).1f ms" % (
+        PROFILER.percentiles(BUSY))
+    text += "   frame p95 %.1f ms" % PROFILER.percentiles(FRAME)['p95']
+    backend.fill(THEME_COLORS['background'], PROFILE_OVERLAY_RECT)
+    backend.draw_tile(
+        render_text(text, PROFILE_OVERLAY_FONT_SIZE, IVORY),
+        PROFILE_OVERLAY_RECT[:2])
+    return PROFILE_OVERLAY_RECT
+
+
+def draw_status(backend, text):
+    """Draw the status line of the game at the bottom.
+
+    Returns the dirty rect of the status line.
+    """
+    backend.fill(THEME_COLORS['background'], STATUS_RECT)
+    backend.draw_tile(render_text(text, STATUS_FONT_SIZE, IVORY),
+                      STATUS_RECT[:2])
+    return STATUS_RECT
 
 
-def start_game_animation(display_surface, fps_clock, board, game_grid):
+def start_game_animation(backend, board, game_grid, start):
     """Starts the Game opening animation.
 
-    Randomly reveals the boxes 8 box at a time.
+    Draws the covered board and returns the animations randomly revealing
+    the boxes inside the window 8 box at a time from start.
     """
-    game_rows, game_cols = game_grid
+    x_range, y_range = get_viewport(game_grid).visible_ranges()
 
     def split_into_groups_of(group_size, the_list):
         """Splits the list into the given group size."""
@@ -270,70 +848,134 @@ def start_game_animation(display_surface, fps_clock, board, game_grid):
             result.append(the_list[cut:cut + group_size])
         return result
 
-    covered_boxes = generate_revealed_boxes_data(False, game_grid)
+    def redraw_covered(box_group):
+        """Done callback drawing the boxes covered again."""
+        def done():
+            return [redraw_box(backend, board, covered_boxes, box,
+                               game_grid)
+                    for box in box_group]
+        return done
+
+    covered_boxes = revealed_lookup(
+        generate_revealed_boxes_data(False, game_grid))
     boxes = [(x_value, y_value)
-             for y_value in range(game_rows)
-             for x_value in range(game_cols)]
+             for y_value in y_range
+             for x_value in x_range]
     random.shuffle(boxes)
     box_groups = split_into_groups_of(8, boxes)
 
-    draw_board(display_surface, board, covered_boxes, game_grid)
-    for box_group in box_groups:
-        reveal_boxes_animation(
-            display_surface,
-            fps_clock,
+    draw_board(backend, board, covered_boxes, game_grid)
+    backend.present()
+    animations = []
+    for count, box_group in enumerate(box_groups):
+        group_start = start + count * 2 * REVEAL_DURATION
+        animations.append(reveal_boxes_animation(
+            backend,
             board,
             box_group,
-            game_grid)
-        cover_boxes_animation(
-            display_surface,
-            fps_clock,
+            game_grid,
+            group_start))
+        animations.append(cover_boxes_animation(
+            backend,
             board,
             box_group,
-            game_grid)
+            game_grid,
+            group_start + REVEAL_DURATION,
+            redraw_covered(box_group)))
+    return animations
 
 
-def get_game_level(display_surface, fps_clock):
-    """Get the game level desired by the user."""
+def get_font(size):
+    """Get the default font in the given size, loading it on first use.
+
+    A font cannot be used once pygame quit, so the fonts are dropped then.
+    """
+    if size not in _FONTS:
+        if not _FONTS:
+            pygame.register_quit(_FONTS.clear)
+        _FONTS[size] = pygame.font.Font(None, size)
+    return _FONTS[size]
+
 
-    def draw_welcome_screen():
-        """Display the welcome and the three game levels."""
-        font = pygame.font.Font(None, FONT_SIZE)
+def render_text(text, size, color):
+    """Render text in the default font, reusing previously rendered text.
 
-        easy_surf = font.render("Easy", True, IVORY)
-        medium_surf = font.render("Medium", True, IVORY)
-        hard_surf = font.render("Hard", True, IVORY)
-        pygame.draw.rect(display_surface, CYAN, EASY_RECT, 3)
+    Keeps the TEXT_CACHE_SIZE most recently used surfaces, so frequently
+    changing text such as a timer does not grow the cache without bound.
+    """
+    return lru_lookup(_TEXT_SURFACES, (text, size, color), TEXT_CACHE_SIZE,
+                      lambda: get_font(size).render(text, True, color))
 
-        display_surface.fill(CYAN, EASY_RECT)
-        display_surface.blit(easy_surf, EASY_TEXT_POS)
 
-        pygame.draw.rect(display_surface, ORANGE, MEDIUM_RECT, 3)
-        display_surface.fill(ORANGE, MEDIUM_RECT)
-        display_surface.blit(medium_surf, MEDIUM_TEXT_POS)
+def get_welcome_screen(size):
+    """Get the welcome screen with the three game levels.
 
-        pygame.draw.rect(display_surface, PURPLE, HARD_RECT, 3)
-        display_surface.fill(PURPLE, HARD_RECT)
-        display_surface.blit(hard_surf, HARD_TEXT_POS)
+    The screen is composed once per window size and reused afterwards.
+    """
+    if size not in _WELCOME_SCREENS:
+        welcome_screen = pygame.Surface(size)
+        welcome_screen.fill(THEME_COLORS['background'])
+        for text, color, rect, text_pos in (
+                ("Easy", CYAN, EASY_RECT, EASY_TEXT_POS),
+                ("Medium", ORANGE, MEDIUM_RECT, MEDIUM_TEXT_POS),
+                ("Hard", PURPLE, HARD_RECT, HARD_TEXT_POS)):
+            welcome_screen.fill(color, rect)
+            welcome_screen.blit(render_text(text, FONT_SIZE, IVORY), text_pos)
+        if pygame.display.get_init() and pygame.display.get_surface():
+            welcome_screen = welcome_screen.convert()
+        _WELCOME_SCREENS[size] = welcome_screen
+    return _WELCOME_SCREENS[size]
+
+
+def draw_welcome_screen(backend):
+    """Show the welcome screen, the first frame of the game."""
+    backend.draw_tile(get_welcome_screen(backend.get_size()), (0, 0))
+    backend.present()
+
+
+def get_game_level(backend, fps_clock, input_source=PYGAME_INPUT):
+    """Get the game level desired by the user."""
+    draw_welcome_screen(backend)
 
     while True:
-        mouse_clicked, mouse_pointer = get_mouse_click()
-        draw_welcome_screen()
+        # Nothing is animated on the welcome screen, so wait for input.
+        mouse_clicked, mouse_pointer = get_mouse_click(0, None, input_source)
 
         if mouse_clicked:
-            display_surface.fill(BGCOLOR)
             if pygame.Rect(EASY_RECT).collidepoint(mouse_pointer):
-                return EASY_GAME_ROWS, EASY_GAME_COLS
+                level = EASY_GAME_ROWS, EASY_GAME_COLS
             elif pygame.Rect(MEDIUM_RECT).collidepoint(mouse_pointer):
-                return MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS
+                level = MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS
             elif pygame.Rect(HARD_RECT).collidepoint(mouse_pointer):
-                return HARD_GAME_ROWS, HARD_GAME_COLS
+                level = HARD_GAME_ROWS, HARD_GAME_COLS
+            else:
+                level = None
+            if level is not None:
+                backend.fill(THEME_COLORS['background'])
+                return level
 
-        pygame.display.update()
-        fps_clock.tick(FPS)
+        fps_clock.tick(RENDER_SETTINGS['frame_cap'])
 
 
-def game_loop(display_surface, fps_clock):
+def game_result(leaderboard, game_grid, moves, milliseconds):
+    """Score a won game, save it to the leaderboard and describe it.
+
+    The best score is read before saving, as the leaderboard writes in the
+    background.
+    """
+    points = score(game_grid, moves, milliseconds)
+    text = "won in %s with %d moves, score %d" % (
+        format_duration(milliseconds), moves, points)
+    if leaderboard is not None:
+        best = leaderboard.best(game_grid)
+        leaderboard.save(game_grid, moves, milliseconds, points)
+        if best is not None:
+            text += ", best %d" % max(best, points)
+    return text
+
+
+def game_loop(backend, fps_clock, get_ticks=None, game_grid=None,
+              input_source=PYGAME_INPUT, leaderboard=None, audio=None):
     """Game loop encodes the logic of the game.
 
     During the game starts, prompts the player to choose the level and
@@ -341,130 +983,449 @@ def game_loop(display_surface, fps_clock):
     chosen by user are same, the boxes are left open, else they are closed.
     When all the chosen selections are open,  the game is won by the user and
     the game is reset.
-    """
 
-    def player_has_won(revealed):
-        """Game is won when all boxes are revealed."""
-        return all([all(boxes) for boxes in revealed])
-
-    def get_randomized_board(grid):
-        """Get the Randomized Board.
-
-        Gets the list of every possible shape in every possible color
-        and then creates a board, a list of lists, with randomly placed icons.
-        """
-        game_rows, game_cols = grid
-        icons = [(shape, color) for shape in ALLSHAPES for color in ALLCOLORS]
-        random.shuffle(icons)
-        num_icons_used = int(game_rows * game_cols / 2)
-        icons = icons[:num_icons_used] * 2
-        random.shuffle(icons)
-
-        game_board = [[icons.pop(0) for _ in range(game_rows)]
-                      for _ in range(game_cols)]
-        return game_board
-
-    def get_box_under_mouse(pointer, grid):
-        """Get the box at a pixel."""
-        game_rows, game_cols = grid
-        mouse_over = False
-        for boxx in range(game_cols):
-            for boxy in range(game_rows):
-                left, top = left_top_coords_of_box((boxx, boxy), grid)
-                box_rect = pygame.Rect(left, top, BOXSIZE, BOXSIZE)
-                if box_rect.collidepoint(pointer):
-                    mouse_over = True
-                    return mouse_over, (boxx, boxy)
-        return mouse_over, (None, None)
-
-    def is_box_revealed(revealed, selected_box):
-        """Returns the status of the box."""
-        box_x, box_y = selected_box
-        return revealed[box_x][box_y]
-
-    def set_box_revealed(revealed, selected_box, status):
-        """Sets the revealed status of the box."""
-        box_x, box_y = selected_box
-        revealed[box_x][box_y] = status
-        return revealed
-
-    game_started = False
-    first_selection = None
+    The game runs on a game time advancing in fixed steps towards get_ticks,
+    pygame.time.get_ticks by default, see timing, while frames are drawn at
+    up to the frame cap of RENDER_SETTINGS. Given a game_grid, every game is
+    played on it without asking for the level. Input is read from
+    input_source, see recording.
+
+    The time since the opening animation and the moves are shown in the
+    status line, and the score once the game is won, which is saved to the
+    leaderboard if given one. Sound effects are played by audio, see audio.
+    """
+    if get_ticks is None:
+        get_ticks = pygame.time.get_ticks
+    if audio is None:
+        audio = Audio()
+
+    benchmark = RENDER_SETTINGS['benchmark']
+    timestep = FixedTimestep(get_ticks())
+    scheduler = Scheduler()
+    fixed_grid = game_grid
+    game = None
+    highlighted_box = None
+    input_locked_until = 0
+    play_start = 0
+    result_text = None
 
     while True:
-        display_surface.fill(BGCOLOR)
-        if not game_started:
-            game_grid = get_game_level(display_surface, fps_clock)
-            board = get_randomized_board(game_grid)
-            start_game_animation(display_surface, fps_clock, board, game_grid)
-            revealed_boxes = generate_revealed_boxes_data(False, game_grid)
-            game_started = True
+        # Only the screen areas of boxes that changed state are redrawn and
+        # presented by the backend.
+        dirty_rects = []
+        if game is None:
+            scheduler.clear()
+            backend.fill(THEME_COLORS['background'])
+            game_grid = fixed_grid or get_game_level(
+                backend, fps_clock, input_source)
+            game = GameState(game_grid)
+            board = game.board
+            viewport = get_viewport(game_grid)
+            viewport.reset()
+            timestep.advance(get_ticks())
+            animations = start_game_animation(
+                backend,
+                board,
+                game_grid,
+                timestep.time)
+            scheduler.add(*animations)
+            input_locked_until = end_time(animations)
+            # The timer runs from the end of the opening animation.
+            play_start = input_locked_until
+            result_text = None
+            status_text = None
+            highlighted_box = None
+            viewport_version = viewport.version
+            continue
+
+        # Poll for input while animating, wait for it with a timeout when
+        # only delayed animations are pending and until it arrives otherwise.
+        # A benchmark always polls. While the timer runs, the wait ends when
+        # it shows the next second.
+        next_step = scheduler.time_to_next(timestep.time)
+        if result_text is None and timestep.time >= play_start:
+            next_second = 1000 - (timestep.time - play_start) % 1000
+            if next_step is None or next_step > next_second:
+                next_step = next_second
+        if benchmark:
+            timeout = None
+        elif next_step is None:
+            timeout = 0
+        elif next_step == 0:
+            timeout = None
         else:
-            draw_board(display_surface, board, revealed_boxes, game_grid)
-            mouse_clicked, mouse_pointer = get_mouse_click()
-            mouse_over_box, box = get_box_under_mouse(mouse_pointer, game_grid)
-            if mouse_over_box:
-                if not is_box_revealed(revealed_boxes, box):
-                    draw_highlight_box(display_surface, box, game_grid)
-                if not is_box_revealed(revealed_boxes, box) and mouse_clicked:
-                    reveal_boxes_animation(
-                        display_surface,
-                        fps_clock,
+            timeout = next_step
+        mouse_clicked, mouse_pointer = get_mouse_click(
+            timeout, viewport, input_source)
+        if not mouse_clicked:
+            mouse_pointer = input_source.get_pos()
+        timestep.advance(get_ticks())
+        now = timestep.time
+
+        if viewport.version != viewport_version or benchmark:
+            # Panned or zoomed, the running animations draw their boxes
+            # again on the next update.
+            with PROFILER.phase('draw'):
+                backend.fill(THEME_COLORS['background'])
+                draw_board(backend, board, game.is_box_revealed, game_grid)
+                dirty_rects.append(backend.get_rect())
+            highlighted_box = None
+            status_text = None
+            viewport_version = viewport.version
+
+        with PROFILER.phase('hit_test'):
+            hovered_box = None
+            if now >= input_locked_until:
+                mouse_over_box, box = get_box_under_mouse(
+                    mouse_pointer,
+                    game_grid)
+                if mouse_over_box and not game.is_box_revealed(box):
+                    hovered_box = box
+
+        with PROFILER.phase('draw'):
+            if hovered_box != highlighted_box:
+                if highlighted_box is not None:
+                    dirty_rects.append(redraw_box(
+                        backend,
                         board,
-                        [box],
-                        game_grid)
-                    revealed_boxes = set_box_revealed(revealed_boxes, box, True)
-                    if first_selection is None:
-                        first_selection = box
-                    else:
-                        first_piece = get_shape_and_color(
+                        game.is_box_revealed,
+                        highlighted_box,
+                        game_grid))
+                if hovered_box is not None:
+                    draw_highlight_box(backend, hovered_box, game_grid)
+                    dirty_rects.append(highlight_rect(hovered_box, game_grid))
+                    PROFILER.input_shown('hover')
+                highlighted_box = hovered_box
+
+        with PROFILER.phase('select'):
+            if hovered_box is not None and mouse_clicked:
+                # The reveal animation draws the box from now on.
+                dirty_rects.append(redraw_box(
+                    backend,
+                    board,
+                    game.is_box_revealed,
+                    hovered_box,
+                    game_grid))
+                highlighted_box = None
+                outcome = game.select(hovered_box)
+                audio.play('reveal')
+                PROFILER.input_shown('click')
+                scheduler.add(reveal_boxes_animation(
+                    backend,
+                    board,
+                    [hovered_box],
+                    game_grid,
+                    now))
+                if outcome == MATCH:
+                    scheduler.add(sound_cue(
+                        audio, 'match', now + REVEAL_DURATION))
+                elif outcome == MISMATCH:
+                    mismatched = list(game.mismatched)
+
+                    def cover_mismatched():
+                        """Cover the mismatched boxes and draw them as they
+                        are, a selection in this frame may have covered
+                        them already."""
+                        game.cover_mismatched()
+                        return [redraw_box(backend, board,
+                                           game.is_box_revealed, covered_box,
+                                           game_grid)
+                                for covered_box in mismatched]
+                    cover_start = now + REVEAL_DURATION + PIECE_CLOSE_WAIT
+                    scheduler.add(
+                        sound_cue(audio, 'mismatch', now + REVEAL_DURATION),
+                        sound_cue(audio, 'cover', cover_start),
+                        cover_boxes_animation(
+                            backend,
                             board,
-                            first_selection)
-                        second_piece = get_shape_and_color(board, box)
-                        if first_piece != second_piece:
-                            pygame.time.wait(PIECE_CLOSE_WAIT)
-                            cover_boxes_animation(
-                                display_surface,
-                                fps_clock,
-                                board,
-                                [first_selection, box],
-                                game_grid)
-                            revealed_boxes = set_box_revealed(
-                                revealed_boxes,
-                                first_selection,
-                                False)
-                            revealed_boxes = set_box_revealed(
-                                revealed_boxes,
-                                box,
-                                False)
-                        elif player_has_won(revealed_boxes):
-                            game_won(display_surface, board, game_grid)
-                            game_started = False
-                        first_selection = None
-
-        pygame.display.update()
-        fps_clock.tick(FPS)
-
-
-def get_game_clock_display():
+                            mismatched,
+                            game_grid,
+                            cover_start,
+                            cover_mismatched))
+                    input_locked_until = cover_start + REVEAL_DURATION
+                elif outcome == WON:
+                    result_text = game_result(leaderboard, game_grid,
+                                              game.moves, now - play_start)
+                    animations = game_won(
+                        backend,
+                        board,
+                        game_grid,
+                        now + REVEAL_DURATION)
+                    scheduler.add(
+                        sound_cue(audio, 'win', now + REVEAL_DURATION),
+                        *animations)
+                    input_locked_until = end_time(animations)
+
+        with PROFILER.phase('animation'):
+            dirty_rects.extend(scheduler.update(now))
+        text = result_text or "time %s   moves %d" % (
+            format_duration(max(0, now - play_start)), game.moves)
+        if (text != status_text or
+                pygame.Rect(STATUS_RECT).collidelist(dirty_rects) != -1):
+            dirty_rects.append(draw_status(backend, text))
+            status_text = text
+        if PROFILER.overlay:
+            dirty_rects.append(draw_profile_overlay(backend))
+        with PROFILER.phase('present'):
+            if dirty_rects:
+                backend.present(dirty_rects)
+        PROFILER.end_frame()
+        FRAME_STATS['frames'] += 1
+        if game.has_won() and now >= input_locked_until:
+            game = None
+        with PROFILER.idle('tick'):
+            fps_clock.tick(RENDER_SETTINGS['frame_cap'])
+
+
+def get_game_clock_display(vsync=False):
     """Initialize pygame and return clock and display.
 
+    Only the display and the font modules are initialized, rather than every
+    pygame module with pygame.init, as starting audio and joystick support
+    is slow and the other modules initialize themselves on first use.
+    With vsync the display is presented in step with the refresh of the
+    screen, when the video driver supports it.
     Return frames per second clock and Display Surface of the pygame.
     """
-    pygame.init()
+    pygame.display.init()
+    pygame.font.init()
     pygame.display.set_caption("Memory Game")
-    return (pygame.time.Clock(),
-            pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT)))
-
-
-def main():
+    display_surface = None
+    if vsync:
+        try:
+            display_surface = pygame.display.set_mode(
+                (WINDOWWIDTH, WINDOWHEIGHT), pygame.SCALED, vsync=1)
+        except pygame.error:
+            pass
+    if display_surface is None:
+        display_surface = pygame.display.set_mode((WINDOWWIDTH, WINDOWHEIGHT))
+    return pygame.time.Clock(), display_surface
+
+
+def get_game_clock_backend(name='surface', vsync=False):
+    """Initialize pygame and return clock and the render backend of name.
+
+    The surface backend draws on the display of get_game_clock_display, the
+    texture backend with a renderer in a window of its own, see
+    render_backends, and the null backend draws nothing without a window.
+    """
+    if name == 'surface':
+        fps_clock, display_surface = get_game_clock_display(vsync)
+        return fps_clock, SurfaceBackend(display_surface)
+    pygame.display.init()
+    pygame.font.init()
+    if name == 'texture':
+        backend = TextureBackend.open(
+            (WINDOWWIDTH, WINDOWHEIGHT), "Memory Game", vsync)
+    else:
+        backend = NullBackend((WINDOWWIDTH, WINDOWHEIGHT))
+    return pygame.time.Clock(), backend
+
+
+def replay_session(path, real_time=True, backend_name='surface'):
+    """Replay a recorded session, see recording.
+
+    In real time the session is shown in the game window like it was
+    played, drawn by the backend of backend_name. Otherwise it is replayed
+    as fast as possible with the null backend, so that drawing costs
+    nothing. Returns the replayer.
+    """
+    replayer = Replayer(path, real_time)
+    _, backend = get_game_clock_backend(
+        backend_name if real_time else 'null')
+    random.seed(replayer.seed)
+    try:
+        game_loop(backend, replayer, replayer.get_ticks,
+                  replayer.game_grid, replayer)
+    except (SystemExit, EndOfRecording):
+        pass
+    return replayer
+
+
+def parse_grid(text):
+    """Parse a ROWSxCOLS board size given on the command line."""
+    try:
+        game_grid = tuple(int(value) for value in text.lower().split('x'))
+        game_rows, game_cols = game_grid
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected ROWSxCOLS, got %r" % text)
+    if game_rows < 1 or game_cols < 1 or game_rows * game_cols % 2:
+        raise argparse.ArgumentTypeError(
+            "a board needs an even number of boxes, got %r" % text)
+    try:
+        icon_pool(game_rows * game_cols // 2)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+    return game_grid
+
+
+def main(argv=()):
     """Memory puzzle game.
 
-    Gets the clock and display surface and hands it over the game loop.
+    Gets the clock and display surface and hands it over the game loop,
+    playing the sound in the background, saving the won games to the
+    leaderboard and recording the session when asked to. Replays recorded
+    sessions instead when given some, returning 1 if any replay diverged
+    from its recording.
     """
-    fps_clock, display_surface = get_game_clock_display()
-    game_loop(display_surface, fps_clock)
+    parser = argparse.ArgumentParser(description="Memory puzzle game.")
+    parser.add_argument(
+        '--profile',
+        metavar='PATH_PREFIX',
+        default=os.environ.get('MEMORYPUZZLE_PROFILE'),
+        help="time the phases of every frame and write the statistics to "
+             "PATH_PREFIX.json and PATH_PREFIX.csv on exit")
+    parser.add_argument(
+        '--profile-overlay',
+        action='store_true',
+        default=bool(os.environ.get('MEMORYPUZZLE_PROFILE_OVERLAY')),
+        help="show the frame time percentiles on screen")
+    parser.add_argument(
+        '--grid',
+        metavar='ROWSxCOLS',
+        type=parse_grid,
+        help="play on a board of this size instead of choosing a level, "
+             "boards larger than the window are panned with the arrow keys "
+             "or the right mouse button and zoomed with the mouse wheel")
+    parser.add_argument(
+        '--record',
+        metavar='FILE',
+        help="record the seed and the input of the session to FILE")
+    parser.add_argument(
+        '--replay',
+        metavar='FILE',
+        nargs='+',
+        help="replay recorded sessions instead of playing")
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help="replay as fast as possible without showing the game")
+    parser.add_argument(
+        '--renderer',
+        choices=BOARD_RENDERERS,
+        default='draw',
+        help="draw the board box by box with pygame (default) or compose it "
+             "from pre-baked tiles with NumPy, faster when many boxes are "
+             "in view")
+    parser.add_argument(
+        '--backend',
+        choices=BACKENDS,
+        default='surface',
+        help="draw on the display surface (default), with an SDL renderer "
+             "keeping the icons as textures, or not at all")
+    parser.add_argument(
+        '--fps',
+        type=int,
+        default=FPS,
+        help="cap the frame rate, 0 for uncapped (default %d), the game "
+             "itself runs at the same speed at any frame rate" % FPS)
+    parser.add_argument(
+        '--vsync',
+        action='store_true',
+        help="present frames in step with the refresh of the screen")
+    parser.add_argument(
+        '--benchmark',
+        action='store_true',
+        help="draw the whole window every frame as fast as possible and "
+             "print the frame rate on exit")
+    parser.add_argument(
+        '--first-frame',
+        action='store_true',
+        help="exit once the welcome screen is shown, to time the startup")
+    parser.add_argument(
+        '--leaderboard',
+        metavar='FILE',
+        default=os.environ.get('MEMORYPUZZLE_LEADERBOARD', LEADERBOARD_PATH),
+        help="save the results of won games to the SQLite database FILE, "
+             "an empty FILE to not save them (default %s)" % LEADERBOARD_PATH)
+    parser.add_argument(
+        '--sounds',
+        metavar='DIR',
+        help="play the sound effects reveal, cover, match, mismatch and win "
+             "from .ogg or .wav files of DIR instead of synthesized tones")
+    parser.add_argument(
+        '--music',
+        metavar='FILE',
+        help="stream FILE as background music, in a loop")
+    parser.add_argument(
+        '--mute',
+        action='store_true',
+        help="play no sound")
+    parser.add_argument(
+        '--theme',
+        metavar='FILE',
+        action='append',
+        help="draw with a theme compiled by themes.py, may be repeated to "
+             "switch between the themes and the classic look with T")
+    args = parser.parse_args(argv)
+    RENDER_SETTINGS['board_renderer'] = args.renderer
+    RENDER_SETTINGS['frame_cap'] = 0 if args.benchmark else args.fps
+    RENDER_SETTINGS['benchmark'] = args.benchmark
+    if args.profile or args.profile_overlay:
+        PROFILER.enable()
+        PROFILER.overlay = args.profile_overlay
+    if args.theme:
+        from themes import load_theme
+
+        try:
+            themes = [load_theme(path) for path in args.theme]
+        except (IOError, ValueError) as error:
+            parser.error(str(error))
+        THEME_SETTINGS['themes'] = tuple(themes) + (None,)
+        THEME_SETTINGS['current'] = 0
+        set_theme(themes[0])
+
+    if args.replay:
+        if args.fast:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        diverged = False
+        for path in args.replay:
+            try:
+                replay_session(path, not args.fast, args.backend)
+            except ReplayDivergence as error:
+                sys.stderr.write("%s: %s\n" % (path, error))
+                diverged = True
+        return 1 if diverged else 0
+
+    fps_clock, backend = get_game_clock_backend(args.backend, args.vsync)
+    started, FRAME_STATS['frames'] = time.time(), 0
+    leaderboard = None
+    audio = Audio(args.sounds, args.music)
+    try:
+        if args.first_frame:
+            draw_welcome_screen(backend)
+            return
+        if not args.mute:
+            audio.start()
+        if args.leaderboard:
+            from leaderboard import Leaderboard
+
+            leaderboard = Leaderboard(args.leaderboard)
+        if args.record:
+            seed = random.SystemRandom().getrandbits(63)
+            random.seed(seed)
+            recorder = Recorder(args.record, seed, args.grid)
+            try:
+                game_loop(backend, fps_clock, recorder.get_ticks,
+                          args.grid, recorder, leaderboard=leaderboard,
+                          audio=audio)
+            finally:
+                recorder.close()
+        else:
+            game_loop(backend, fps_clock, game_grid=args.grid,
+                      leaderboard=leaderboard, audio=audio)
+    finally:
+        audio.close()
+        if leaderboard is not None:
+            leaderboard.close()
+        if args.benchmark:
+            seconds = time.time() - started
+            sys.stderr.write("%d frames in %.1f s: %.1f frames/s\n" % (
+                FRAME_STATS['frames'], seconds,
+                FRAME_STATS['frames'] / seconds if seconds else 0))
+        if args.profile:
+            PROFILER.dump(args.profile)
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,250 @@
+"""Per phase frame profiler for the Memory Puzzle Game.
+
+The profiler is disabled by default, in which case timing a phase costs a
+single method call. When enabled, the milliseconds spent in each phase of a
+frame are kept for the last FRAME_WINDOW frames, from which percentiles and
+histograms are reported and dumped as JSON and CSV. The json and csv modules
+are only imported when dumping, keeping them off the startup of the game.
+A frame includes the time the game sleeps or waits for input, timed as idle
+phases, the rest of the frame is recorded as the BUSY phase.
+
+The profiler also traces the latency of input, from the time an event
+arrived to the end of the frame presenting its effect. Synthetic events
+carry the time.perf_counter time they were posted at. For other events,
+pygame does not tell when they arrived. An event that a blocking wait
+returned arrived when the wait ended. An event that was polled arrived at
+the earliest when the events were read before, so its latency counts the
+longest it can have queued, such as through the sleep of the frame cap.
+The latencies of a kind of input are kept as the samples of the LATENCY
+phase of that kind, such as latency.click.
+"""
+import math
+import time
+from collections import deque
+
+# Number of most recent samples kept per phase.
+FRAME_WINDOW = 1000
+
+PERCENTILES = (50, 95, 99)
+
+# Upper bounds in milliseconds of the histogram buckets, the last bucket
+# holds the samples slower than the last bound.
+HISTOGRAM_BOUNDS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 50, 100)
+
+# Phase holding the time between two FrameProfiler.end_frame calls.
+FRAME = 'frame'
+
+# Phase holding the time of a frame outside of its idle phases, the time
+# the frame kept the game busy.
+BUSY = 'busy'
+
+# Prefix of the phases holding input latencies, see FrameProfiler.input.
+LATENCY = 'latency.'
+
+
+class _NullPhase(object):
+    """Context manager of a phase while the profiler is disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase(object):
+    """Context manager timing a phase into its samples."""
+
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.samples.append((time.perf_counter() - self.start) * 1000)
+        return False
+
+
+class _IdlePhase(_Phase):
+    """Context manager timing an idle phase, also adding it to the idle
+    time of the frame of its profiler."""
+
+    __slots__ = ('profiler',)
+
+    def __init__(self, samples, profiler):
+        _Phase.__init__(self, samples)
+        self.profiler = profiler
+
+    def __exit__(self, *exc_info):
+        milliseconds = (time.perf_counter() - self.start) * 1000
+        self.samples.append(milliseconds)
+        self.profiler.frame_idle += milliseconds
+        return False
+
+
+def percentile(sorted_samples, percent):
+    """Nearest rank percentile of samples sorted in ascending order."""
+    if not sorted_samples:
+        return 0.0
+    rank = int(math.ceil(percent / 100.0 * len(sorted_samples)))
+    return sorted_samples[max(rank, 1) - 1]
+
+
+class FrameProfiler(object):
+    """Times the phases of every frame."""
+
+    def __init__(self, window=FRAME_WINDOW):
+        self.enabled = False
+        # Whether the game shows the statistics on screen.
+        self.overlay = False
+        self.window = window
+        self.samples = {}
+        self.frame_start = None
+        # Milliseconds of the idle phases of this frame.
+        self.frame_idle = 0.0
+        # Time the first input of each kind of this frame arrived, the
+        # kinds of input whose effect the frame shows and when the events
+        # were last read.
+        self.inputs = {}
+        self.shown = set()
+        self.last_read = None
+
+    def enable(self):
+        """Start recording."""
+        self.enabled = True
+        self.frame_start = time.perf_counter()
+
+    def phase_samples(self, name):
+        """Rolling samples of a phase, in milliseconds."""
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.window)
+        return self.samples[name]
+
+    def phase(self, name):
+        """Context manager timing the code it wraps as the named phase."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self.phase_samples(name))
+
+    def idle(self, name):
+        """Context manager timing the code it wraps as the named phase, the
+        game idling, which is left out of the BUSY time of the frame."""
+        if not self.enabled:
+            return _NULL_PHASE
+        return _IdlePhase(self.phase_samples(name), self)
+
+    def events_read(self, waited=False):
+        """Note that the pending events were read.
+
+        Returns the time they arrived by: the time the events were read
+        before, or now if waited, for the events of a blocking wait.
+        """
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        arrived = now if waited or self.last_read is None else self.last_read
+        self.last_read = now
+        return arrived
+
+    def input(self, kind, event, arrived=None):
+        """Note an event of a kind of input arrived at arrived, see
+        events_read, or at the time it was posted if it carries it."""
+        if self.enabled and kind not in self.inputs:
+            self.inputs[kind] = (getattr(event, 'posted', None) or arrived or
+                                 time.perf_counter())
+
+    def input_shown(self, kind):
+        """Note that the frame shows the effect of the input of kind."""
+        if self.enabled:
+            self.shown.add(kind)
+
+    def end_frame(self):
+        """Record the time since the last end_frame as a frame, the part of
+        it outside of idle phases as busy, and the latency of the inputs
+        whose effect the frame showed.
+
+        Input whose effect the frame does not show, such as a click while
+        the input is locked, is not traced.
+        """
+        if self.enabled:
+            now = time.perf_counter()
+            frame = (now - self.frame_start) * 1000
+            self.phase_samples(FRAME).append(frame)
+            self.phase_samples(BUSY).append(max(0.0, frame - self.frame_idle))
+            self.frame_start = now
+            self.frame_idle = 0.0
+            for kind in self.shown:
+                if kind in self.inputs:
+                    self.phase_samples(LATENCY + kind).append(
+                        (now - self.inputs[kind]) * 1000)
+            self.inputs.clear()
+            self.shown.clear()
+
+    def percentiles(self, name):
+        """The PERCENTILES of a phase, as a dict keyed by 'p50' and so on."""
+        sorted_samples = sorted(self.samples.get(name, ()))
+        return dict(('p%d' % percent, percentile(sorted_samples, percent))
+                    for percent in PERCENTILES)
+
+    def histogram(self, name):
+        """Counts of samples of a phase per HISTOGRAM_BOUNDS bucket."""
+        counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        for sample in self.samples.get(name, ()):
+            bucket = 0
+            while (bucket < len(HISTOGRAM_BOUNDS) and
+                   sample > HISTOGRAM_BOUNDS[bucket]):
+                bucket += 1
+            counts[bucket] += 1
+        return counts
+
+    def report(self):
+        """Statistics of every phase, keyed by phase name."""
+        report = {}
+        for name in sorted(self.samples):
+            stats = self.percentiles(name)
+            stats['count'] = len(self.samples[name])
+            stats['histogram'] = self.histogram(name)
+            report[name] = stats
+        return report
+
+    def dump_json(self, path):
+        """Write the report with the histogram bounds as JSON."""
+        import json
+
+        with open(path, 'w') as json_file:
+            json.dump({'histogram_bounds_ms': list(HISTOGRAM_BOUNDS),
+                       'phases': self.report()},
+                      json_file, indent=2, sort_keys=True)
+
+    def dump_csv(self, path):
+        """Write the report as CSV, one row per phase."""
+        import csv
+
+        percent_keys = ['p%d' % percent for percent in PERCENTILES]
+        bucket_keys = ['le_%s_ms' % bound for bound in HISTOGRAM_BOUNDS]
+        bucket_keys.append('gt_%s_ms' % HISTOGRAM_BOUNDS[-1])
+        with open(path, 'w') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['phase', 'count'] + percent_keys + bucket_keys)
+            for name, stats in sorted(self.report().items()):
+                writer.writerow(
+                    [name, stats['count']] +
+                    ['%.4f' % stats[key] for key in percent_keys] +
+                    stats['histogram'])
+
+    def dump(self, path_prefix):
+        """Write path_prefix.json and path_prefix.csv."""
+        self.dump_json(path_prefix + '.json')
+        self.dump_csv(path_prefix + '.csv')
+
+
+# The profiler shared by the game, enabled from memorypuzzle.main.
+PROFILER = FrameProfiler()
@@ -0,0 +1,270 @@
+"""Recording and replay of Memory Puzzle Game sessions.
+
+A session is reproduced by the seed of the random module, which the boards
+and the opening animations are drawn from, and by the input the game read.
+A Recorder stands between the game and its input and writes every read,
+events or the mouse position, with the time it happened to a compact zlib
+compressed file. The game time is latched at every read, so the game sees
+exactly the times written to the file.
+
+A Replayer reads such a file and is given to the game in place of its
+input, clock and ticks, feeding it the same reads at the same game times,
+either paced like the recorded session or as fast as possible.
+"""
+import struct
+import time
+import zlib
+
+import pygame
+from pygame.constants import (
+    KEYDOWN, KEYUP, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL, NOEVENT, QUIT)
+
+MAGIC = b'MPRC'
+VERSION = 1
+
+# File header: magic, version, seed, the game time recording started and
+# the rows and columns of the board played on, 0 when chosen on the welcome
+# screen.
+HEADER = struct.Struct('<4sBQIHH')
+
+# A read: kind of read, milliseconds since the previous read and the number
+# of events read.
+READ = struct.Struct('<BIH')
+
+# An event: its type code and up to five integer attributes.
+EVENT = struct.Struct('<B5i')
+NO_VALUES = (0, 0, 0, 0, 0)
+
+# Kinds of reads
+GET = 0
+WAIT = 1
+GET_POS = 2
+
+# Type codes of the recorded events, the mouse position read by GET_POS
+# being stored as a pseudo event. Events of other types are not used by the
+# game and not recorded, except for the event a wait returns, see
+# Recorder.wait, stored as OTHER_CODE with its type.
+EVENT_TYPES = (NOEVENT, QUIT, KEYUP, KEYDOWN, MOUSEMOTION, MOUSEBUTTONUP,
+               MOUSEWHEEL)
+POS_CODE = len(EVENT_TYPES)
+OTHER_CODE = POS_CODE + 1
+
+
+class ReplayDivergence(Exception):
+    """The replayed game read its input differently from the recording."""
+
+
+class EndOfRecording(Exception):
+    """The replayed game read more input than was recorded."""
+
+
+class PygameInput(object):
+    """Input read from pygame, what the game plays with by default."""
+
+    def get(self):
+        """Get the pending events."""
+        return pygame.event.get()
+
+    def wait(self, timeout):
+        """Wait for an event, see pygame.event.wait."""
+        return pygame.event.wait(timeout)
+
+    def get_pos(self):
+        """Get the mouse position."""
+        return pygame.mouse.get_pos()
+
+
+def encode_event(event):
+    """Convert an event to (type code, attributes) or None to drop it."""
+    if event.type not in EVENT_TYPES:
+        return None
+    code = EVENT_TYPES.index(event.type)
+    if event.type in (KEYUP, KEYDOWN):
+        values = (event.key, 0, 0, 0, 0)
+    elif event.type == MOUSEMOTION:
+        values = tuple(event.pos) + tuple(event.rel) + (event.buttons[2],)
+    elif event.type == MOUSEBUTTONUP:
+        values = tuple(event.pos) + (event.button, 0, 0)
+    elif event.type == MOUSEWHEEL:
+        values = (event.y, 0, 0, 0, 0)
+    else:
+        values = NO_VALUES
+    return code, values
+
+
+def decode_event(code, values):
+    """Convert (type code, attributes) back to an event."""
+    if code == OTHER_CODE:
+        return pygame.event.Event(values[0])
+    event_type = EVENT_TYPES[code]
+    if event_type in (KEYUP, KEYDOWN):
+        return pygame.event.Event(event_type, key=values[0])
+    if event_type == MOUSEMOTION:
+        return pygame.event.Event(event_type, pos=values[0:2],
+                                  rel=values[2:4], buttons=(0, 0, values[4]))
+    if event_type == MOUSEBUTTONUP:
+        return pygame.event.Event(event_type, pos=values[0:2],
+                                  button=values[2])
+    if event_type == MOUSEWHEEL:
+        return pygame.event.Event(event_type, x=0, y=values[0])
+    return pygame.event.Event(event_type)
+
+
+class Recorder(object):
+    """Records the input read through it to a file.
+
+    Reads from input_source, PygameInput by default, timed by get_ticks,
+    pygame.time.get_ticks by default. Pass get_ticks of the recorder to the
+    game, so that it runs on the latched times that are recorded. game_grid
+    is the board the game is played on, if not chosen on the welcome screen.
+    """
+
+    def __init__(self, path, seed, game_grid=None, input_source=None,
+                 get_ticks=None):
+        self.input_source = input_source or PygameInput()
+        self.source_ticks = get_ticks or pygame.time.get_ticks
+        self.now = self.source_ticks()
+        self.recording_file = open(path, 'wb')
+        self.recording_file.write(HEADER.pack(
+            MAGIC, VERSION, seed, self.now, *(game_grid or (0, 0))))
+        self.compressor = zlib.compressobj(9)
+
+    def get_ticks(self):
+        """Game time in milliseconds, as of the last read."""
+        return self.now
+
+    def record(self, kind, codes):
+        """Latch the time and write a read of the encoded events."""
+        now = self.source_ticks()
+        data = [READ.pack(kind, now - self.now, len(codes))]
+        data.extend(EVENT.pack(code, *values) for code, values in codes)
+        self.recording_file.write(self.compressor.compress(b''.join(data)))
+        self.now = now
+
+    def get(self):
+        """Get and record the pending events."""
+        events = self.input_source.get()
+        codes = [code for code in map(encode_event, events)
+                 if code is not None]
+        self.record(GET, codes)
+        return events
+
+    def wait(self, timeout):
+        """Wait for and record an event.
+
+        An event the game does not use is recorded by its type, as the game
+        reads the events pending after any event but NOEVENT.
+        """
+        event = self.input_source.wait(timeout)
+        code = encode_event(event)
+        if code is None:
+            code = OTHER_CODE, (event.type,) + NO_VALUES[1:]
+        self.record(WAIT, [code])
+        return event
+
+    def get_pos(self):
+        """Get and record the mouse position."""
+        pos = self.input_source.get_pos()
+        self.record(GET_POS, [(POS_CODE, tuple(pos) + (0, 0, 0))])
+        return pos
+
+    def close(self):
+        """Finish writing the recording."""
+        self.recording_file.write(self.compressor.flush())
+        self.recording_file.close()
+
+
+def read_recording(path):
+    """Read a recording, returning its seed, start time, grid and reads.
+
+    The grid is None when chosen on the welcome screen. A read is a (kind,
+    time, codes) tuple, time being the game time of the read in
+    milliseconds.
+    """
+    with open(path, 'rb') as recording_file:
+        data = recording_file.read()
+    magic, version, seed, start, game_rows, game_cols = HEADER.unpack_from(
+        data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a recording of version %d"
+                         % (path, VERSION))
+    data = zlib.decompressobj().decompress(data[HEADER.size:])
+    reads = []
+    now = start
+    offset = 0
+    # A recording cut short by a crash ends in a partial read, ignored.
+    while offset + READ.size <= len(data):
+        kind, delta, count = READ.unpack_from(data, offset)
+        end = offset + READ.size + count * EVENT.size
+        if end > len(data):
+            break
+        now += delta
+        codes = []
+        for position in range(offset + READ.size, end, EVENT.size):
+            values = EVENT.unpack_from(data, position)
+            codes.append((values[0], values[1:]))
+        reads.append((kind, now, codes))
+        offset = end
+    return seed, start, (game_rows, game_cols) if game_rows else None, reads
+
+
+class Replayer(object):
+    """Replays a recording as the input, clock and ticks of a game.
+
+    In real time the clock waits until the time of the next read has passed
+    since the replay started, as fast as possible otherwise.
+    """
+
+    def __init__(self, path, real_time=True):
+        self.seed, self.start, self.game_grid, self.reads = read_recording(
+            path)
+        self.real_time = real_time
+        self.position = 0
+        self.now = self.start
+        self.started = time.time()
+
+    def get_ticks(self):
+        """Game time in milliseconds, as of the last read."""
+        return self.now
+
+    def replay(self, kind):
+        """Advance to the next read, which must be of kind."""
+        if self.position == len(self.reads):
+            raise EndOfRecording(
+                "the replay read more than the %d recorded reads"
+                % len(self.reads))
+        read_kind, self.now, codes = self.reads[self.position]
+        if read_kind != kind:
+            raise ReplayDivergence(
+                "read %d is a %d read, replayed as a %d read"
+                % (self.position, read_kind, kind))
+        self.position += 1
+        return codes
+
+    def get(self):
+        """Replay getting the pending events."""
+        return [decode_event(code, values)
+                for code, values in self.replay(GET)]
+
+    def wait(self, timeout):
+        """Replay waiting for an event."""
+        (code, values), = self.replay(WAIT)
+        return decode_event(code, values)
+
+    def get_pos(self):
+        """Replay getting the mouse position."""
+        (code, values), = self.replay(GET_POS)
+        return values[:2]
+
+    def tick(self, framerate=0):
+        """Wait until the next read is due when replaying in real time."""
+        if self.real_time and self.position < len(self.reads):
+            delay = ((self.reads[self.position][1] - self.start) / 1000.0 -
+                     (time.time() - self.started))
+            if delay > 0:
+                time.sleep(delay)
+        return 0
+
+    def finished(self):
+        """Whether every recorded read was replayed."""
+        return self.position == len(self.reads)
@@ -0,0 +1,233 @@
+"""Render backends of the Memory Puzzle Game.
+
+The game draws through a backend, which draws the tiles of the boxes, their
+covers and the highlight and presents the frame:
+
+* SurfaceBackend draws on the software display surface of
+  pygame.display.set_mode with blits and pygame.draw, presenting the dirty
+  rects with pygame.display.update.
+* TextureBackend draws with a pygame._sdl2 Renderer. Every surface drawn,
+  the icon atlases, animation strips and rendered text, is uploaded once as
+  a texture and copied by the renderer from then on, on the GPU when the
+  renderer is accelerated. The frame is kept in a target texture, so that
+  only the boxes that changed are drawn again like on a surface. Presenting
+  copies the dirty rects of it to the window when the window keeps its
+  contents, as with SDL's software renderer, and the whole frame otherwise,
+  which an accelerated renderer does on the GPU. On the software renderer
+  it costs somewhat more CPU than the surface backend, so it only pays off
+  with a GPU. It draws the same pixels as the surface backend, apart from
+  the smoothed edges of zoomed icons, which SDL blends a few color levels
+  apart from pygame.
+* NullBackend draws nothing, for headless runs such as fast replays.
+"""
+import weakref
+
+import pygame
+
+BACKENDS = ('surface', 'texture', 'null')
+
+
+def outline_rects(rect, width):
+    """Rects filling the outline of rect width pixels wide.
+
+    Draws the same pixels as pygame.draw.rect with that width for a rect
+    inside the surface, which fills the whole rect when the outline is at
+    least half as wide as the rect.
+    """
+    rect = pygame.Rect(rect)
+    if width <= 0 or 2 * width >= min(rect.width, rect.height):
+        return [rect]
+    return [pygame.Rect(rect.left, rect.top, rect.width, width),
+            pygame.Rect(rect.left, rect.bottom - width, rect.width, width),
+            pygame.Rect(rect.left, rect.top, width, rect.height),
+            pygame.Rect(rect.right - width, rect.top, width, rect.height)]
+
+
+class SurfaceBackend(object):
+    """Draws on a surface, the display surface when presenting."""
+
+    name = 'surface'
+
+    def __init__(self, surface):
+        self.surface = surface
+
+    def get_size(self):
+        """Size of the frame."""
+        return self.surface.get_size()
+
+    def get_rect(self):
+        """Rect of the whole frame."""
+        return self.surface.get_rect()
+
+    def fill(self, color, rect=None):
+        """Fill the frame, or a rect of it, with color."""
+        self.surface.fill(color, rect)
+
+    def draw_tile(self, source, position, area=None):
+        """Draw a surface, or an area of it, at position.
+
+        Sources are the icon atlases, animation strips and other cached
+        surfaces, which must not change once drawn.
+        """
+        self.surface.blit(source, position, area)
+
+    def draw_cover(self, rect, color, width):
+        """Draw the outline of a covered box."""
+        pygame.draw.rect(self.surface, color, rect, width)
+
+    def draw_highlight(self, rect, color, width):
+        """Draw the outline highlighting a box."""
+        pygame.draw.rect(self.surface, color, rect, width)
+
+    def present(self, rects=None):
+        """Show the frame, only the dirty rects of it if given."""
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+
+class TextureBackend(object):
+    """Draws with a pygame._sdl2 Renderer into a target texture of size.
+
+    The textures of the surfaces drawn are kept for as long as the
+    surfaces, which the caches of memorypuzzle hold. keeps_frame tells
+    whether the window keeps its contents between presents, so that only
+    the dirty rects need copying to it.
+    """
+
+    name = 'texture'
+    surface = None
+
+    def __init__(self, renderer, size, keeps_frame=False):
+        from pygame._sdl2.video import Texture
+
+        self.renderer = renderer
+        self.size = size
+        self.keeps_frame = keeps_frame
+        self.presented = False
+        self.target = Texture(renderer, size, target=True)
+        renderer.target = self.target
+        self.textures = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def open(cls, size, title, vsync=False, accelerated=-1):
+        """Open a window of size and a renderer drawing to it.
+
+        accelerated -1 picks an accelerated renderer if there is one and
+        SDL's software renderer, which needs no GPU, otherwise, 1 only an
+        accelerated renderer and 0 only the software renderer. The window of
+        the software renderer keeps its contents between presents.
+        """
+        from pygame._sdl2.sdl2 import error
+        from pygame._sdl2.video import Renderer, Window
+
+        window = Window(title, size)
+        if accelerated != 0:
+            try:
+                return cls(Renderer(window, accelerated=1, vsync=vsync,
+                                    target_texture=True), size)
+            except error:
+                if accelerated == 1:
+                    raise
+        return cls(Renderer(window, accelerated=0, vsync=vsync,
+                            target_texture=True), size, keeps_frame=True)
+
+    def get_size(self):
+        """Size of the frame."""
+        return self.size
+
+    def get_rect(self):
+        """Rect of the whole frame."""
+        return pygame.Rect((0, 0), self.size)
+
+    def texture(self, source):
+        """The texture of a surface, uploaded on first use."""
+        try:
+            return self.textures[source]
+        except KeyError:
+            from pygame._sdl2.video import Texture
+
+            texture = self.textures[source] = Texture.from_surface(
+                self.renderer, source)
+            return texture
+
+    def fill(self, color, rect=None):
+        """Fill the frame, or a rect of it, with color."""
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.fill_rect(self.get_rect() if rect is None else rect)
+
+    def draw_tile(self, source, position, area=None):
+        """Copy the texture of a surface, or an area of it, to position."""
+        if area is None:
+            area = source.get_rect()
+        left, top = position
+        self.texture(source).draw(area, (left, top, area[2], area[3]))
+
+    def draw_outline(self, rect, color, width):
+        """Fill the outline of rect like pygame.draw.rect does."""
+        self.renderer.draw_color = pygame.Color(color)
+        for outline_rect in outline_rects(rect, width):
+            self.renderer.fill_rect(outline_rect)
+
+    def draw_cover(self, rect, color, width):
+        """Draw the outline of a covered box."""
+        self.draw_outline(rect, color, width)
+
+    def draw_highlight(self, rect, color, width):
+        """Draw the outline highlighting a box."""
+        self.draw_outline(rect, color, width)
+
+    def present(self, rects=None):
+        """Copy the frame to the window and show it.
+
+        Only the dirty rects are copied if given and the window keeps its
+        contents, the whole frame otherwise.
+        """
+        self.renderer.target = None
+        if rects is None or not self.keeps_frame or not self.presented:
+            self.target.draw()
+        else:
+            frame = self.get_rect()
+            for rect in rects:
+                rect = frame.clip(rect)
+                if rect:
+                    self.target.draw(rect, rect)
+        self.renderer.present()
+        self.renderer.target = self.target
+        self.presented = True
+
+
+class NullBackend(object):
+    """Draws nothing, counting the frames presented."""
+
+    name = 'null'
+    surface = None
+
+    def __init__(self, size):
+        self.size = size
+        self.frames = 0
+
+    def get_size(self):
+        """Size of the frame."""
+        return self.size
+
+    def get_rect(self):
+        """Rect of the whole frame."""
+        return pygame.Rect((0, 0), self.size)
+
+    def fill(self, color, rect=None):
+        """Draw nothing."""
+
+    def draw_tile(self, source, position, area=None):
+        """Draw nothing."""
+
+    def draw_cover(self, rect, color, width):
+        """Draw nothing."""
+
+    def draw_highlight(self, rect, color, width):
+        """Draw nothing."""
+
+    def present(self, rects=None):
+        """Count the frame."""
+        self.frames += 1
@@ -0,0 +1,113 @@
+"""Whole board compositing of the Memory Puzzle Game with NumPy.
+
+Instead of a blit or a pygame.draw call per box, the boxes inside the window
+are composed in a single pass over its pixels. Every box shows a tile, its
+cover or its icon, pre-baked in the pixel format of the window over the
+background color the board is drawn on, so that every tile is opaque. The
+tiles are stacked in a TileBank, a single array indexed by the icon code of
+the tile, and the tiles of all the boxes are picked at once by fancy
+indexing with an integer array of the tile of every box. They are copied
+through a strided view of the window pixels that skips the gaps between the
+boxes, which must already show the background color.
+
+Baking a tile draws it with pygame over the background color, so the window
+ends up pixel identical to drawing the boxes one by one.
+"""
+import numpy
+import pygame
+
+from icons import ALL_ICONS
+
+# Icon code of the tile of a covered box, after the codes of ALL_ICONS.
+COVER = len(ALL_ICONS)
+
+
+def surface_tile(surface, target, background, area=None):
+    """Tile of a surface, or of an area of it, drawn over background.
+
+    Returns a (height, width) array of the pixels in the format of target.
+    """
+    if area is None:
+        area = surface.get_rect()
+    tile = pygame.Surface(pygame.Rect(area).size, 0, target)
+    tile.fill(background)
+    tile.blit(surface, (0, 0), area)
+    return pygame.surfarray.array2d(tile).T
+
+
+def cover_tile(box_size, color, width, target, background):
+    """Tile of a covered box, its outline drawn like draw_box does."""
+    tile = pygame.Surface((box_size, box_size), 0, target)
+    tile.fill(background)
+    pygame.draw.rect(tile, color, (0, 0, box_size, box_size), width)
+    return pygame.surfarray.array2d(tile).T
+
+
+class TileBank(object):
+    """Tiles of a box size baked over a background, stacked in one array.
+
+    The tile of icon code, COVER for the cover, is tiles[slots[code]]. At
+    most capacity tiles are kept, the bank starting over once full.
+    """
+
+    def __init__(self, box_size, capacity):
+        self.capacity = capacity
+        self.tiles = numpy.empty((0, box_size, box_size), numpy.uint32)
+        self.slots = numpy.full(COVER + 1, -1, numpy.intp)
+        self.count = 0
+
+    def lookup(self, codes, build):
+        """Slots of the tiles of an array of icon codes.
+
+        build(code) bakes the tile of a code missing from the bank.
+        """
+        slots = self.slots[codes]
+        if (slots >= 0).all():
+            return slots
+        missing = numpy.unique(codes[slots < 0])
+        if self.count + len(missing) > self.capacity:
+            self.slots[:] = -1
+            self.count = 0
+            missing = numpy.unique(codes)
+        if self.count + len(missing) > len(self.tiles):
+            size = max(self.count + len(missing), 2 * len(self.tiles))
+            tiles = numpy.empty((size,) + self.tiles.shape[1:],
+                                numpy.uint32)
+            tiles[:self.count] = self.tiles[:self.count]
+            self.tiles = tiles
+        for code in missing:
+            self.tiles[self.count] = build(code)
+            self.slots[code] = self.count
+            self.count += 1
+        return self.slots[codes]
+
+
+def box_view(pixels, left, top, pitch, box_size, cols, rows):
+    """View of a grid of boxes in a (height, width) pixel array.
+
+    The view has the shape (rows, box size, cols, box size), skipping the
+    gaps, and writes through to pixels.
+    """
+    y_stride, x_stride = pixels.strides
+    return numpy.lib.stride_tricks.as_strided(
+        pixels[top:, left:], (rows, box_size, cols, box_size),
+        (pitch * y_stride, y_stride, pitch * x_stride, x_stride))
+
+
+def compose_board(surface, viewport, left_top, slots, tiles):
+    """Draw tiles on a grid of boxes of surface from left_top.
+
+    slots is a (rows, cols) array of the index into tiles, a (count, box
+    size, box size) array, of every box. The boxes must lie inside the
+    surface, which must have 32 bits per pixel, the gaps between them are
+    left untouched.
+    """
+    rows, cols = slots.shape
+    if not cols or not rows:
+        return
+    left, top = left_top
+    boxes = box_view(pygame.surfarray.pixels2d(surface).T, left, top,
+                     viewport.pitch, viewport.box_size, cols, rows)
+    # Gathered by the row and column of the box and the row and column of
+    # the pixel in it, like the view of the window.
+    boxes[...] = tiles[slots].transpose(0, 2, 1, 3)
@@ -0,0 +1,56 @@
+import unittest
+
+from mock import MagicMock
+
+from animation import Animation, Scheduler, end_time
+
+
+class TestAnimation(unittest.TestCase):
+    def test_progress(self):
+        animation = Animation(100, 200, MagicMock())
+        self.assertEqual(300, animation.end)
+        self.assertEqual(0.0, animation.progress(100))
+        self.assertEqual(0.5, animation.progress(200))
+        self.assertEqual(1.0, animation.progress(500))
+        self.assertEqual(1.0, Animation(100, 0, MagicMock()).progress(100))
+
+    def test_end_time(self):
+        self.assertEqual(0, end_time([]))
+        self.assertEqual(
+            400,
+            end_time([Animation(0, 400, None), Animation(100, 200, None)]))
+
+
+class TestScheduler(unittest.TestCase):
+    def test_update(self):
+        step = MagicMock(return_value=[(0, 0, 1, 1)])
+        done = MagicMock(return_value=[(1, 1, 1, 1)])
+        scheduler = Scheduler()
+        scheduler.add(Animation(100, 200, step, done))
+        self.assertEqual([], scheduler.update(50))
+        self.assertFalse(step.called)
+        self.assertEqual([(0, 0, 1, 1)], scheduler.update(150))
+        step.assert_called_once_with(0.25)
+        self.assertFalse(done.called)
+        # Frames skipped by a slow update still finish the animation.
+        self.assertEqual([(0, 0, 1, 1), (1, 1, 1, 1)], scheduler.update(1000))
+        step.assert_called_with(1.0)
+        done.assert_called_once_with()
+        self.assertEqual([], scheduler.animations)
+
+    def test_overlapping_animations(self):
+        first, second = MagicMock(), MagicMock()
+        scheduler = Scheduler()
+        scheduler.add(Animation(0, 100, first), Animation(50, 100, second))
+        scheduler.update(75)
+        first.assert_called_once_with(0.75)
+        second.assert_called_once_with(0.25)
+
+    def test_time_to_next(self):
+        scheduler = Scheduler()
+        self.assertEqual(None, scheduler.time_to_next(0))
+        scheduler.add(Animation(100, 200, MagicMock()))
+        self.assertEqual(60, scheduler.time_to_next(40))
+        self.assertEqual(0, scheduler.time_to_next(150))
+        scheduler.clear()
+        self.assertEqual(None, scheduler.time_to_next(150))
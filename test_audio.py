@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import timeit
+import unittest
+import wave
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import mock  # noqa: E402
+import pygame  # noqa: E402
+
+import audio  # noqa: E402
+
+
+def write_wave(path, frames=4410):
+    """Write a silent mono wave file of frames at 44100 Hz."""
+    wave_file = wave.open(path, 'wb')
+    try:
+        wave_file.setnchannels(1)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(44100)
+        wave_file.writeframes(b'\0\0' * frames)
+    finally:
+        wave_file.close()
+
+
+class TestAudio(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(pygame.quit)
+
+    def test_synthesize(self):
+        pygame.mixer.init(44100, -16, 2)
+        sound = audio.synthesize(((440, 100), (880, 50)), 44100, 2)
+        self.assertAlmostEqual(0.15, sound.get_length(), places=3)
+        samples = sound.get_raw()
+        self.assertEqual(2 * 2 * 6615, len(samples))
+
+    def test_play_before_loading(self):
+        sounds = audio.Audio()
+        sounds.play('reveal')
+        self.assertEqual(0, sounds.next_channel)
+        sounds.close()
+
+    def test_start(self):
+        sounds = audio.Audio()
+        sounds.start()
+        sounds.loader.join()
+        self.assertEqual(sorted(audio.EFFECTS), sorted(sounds.sounds))
+        self.assertEqual(audio.CHANNELS, pygame.mixer.get_num_channels())
+        for count in range(audio.CHANNELS + 1):
+            sounds.play('match')
+        self.assertEqual(1, sounds.next_channel)
+        self.assertTrue(sounds.channels[0].get_busy())
+        sounds.close()
+        self.assertEqual(None, pygame.mixer.get_init())
+        self.assertEqual({}, sounds.sounds)
+
+    def test_play_is_fast(self):
+        sounds = audio.Audio()
+        sounds.load()
+        seconds = min(timeit.repeat(
+            lambda: sounds.play('reveal'), number=1000, repeat=3))
+        self.assertTrue(seconds / 1000 < 50e-6,
+                        "%.1f us per effect" % (seconds * 1000))
+        sounds.close()
+
+    def test_sound_dir(self):
+        write_wave(os.path.join(self.directory, 'win.wav'))
+        sounds = audio.Audio(self.directory)
+        sounds.load()
+        self.assertAlmostEqual(0.1, sounds.sounds['win'].get_length(),
+                               places=3)
+        self.assertNotAlmostEqual(
+            0.1, sounds.sounds['reveal'].get_length(), places=3)
+        sounds.close()
+
+    def test_music(self):
+        music = os.path.join(self.directory, 'music.wav')
+        write_wave(music, 441000)
+        sounds = audio.Audio(music=music)
+        sounds.load()
+        self.assertTrue(pygame.mixer.music.get_busy())
+        sounds.close()
+
+    def test_missing_music(self):
+        sounds = audio.Audio(music=os.path.join(self.directory, 'none.ogg'))
+        with mock.patch('sys.stderr') as stderr:
+            sounds.load()
+        self.assertTrue(
+            stderr.write.call_args[0][0].startswith('audio: no music'))
+        self.assertEqual(sorted(audio.EFFECTS), sorted(sounds.sounds))
+        sounds.close()
+
+    def test_no_audio_device(self):
+        sounds = audio.Audio()
+        with mock.patch('pygame.mixer.init',
+                        side_effect=pygame.error('no device')):
+            with mock.patch('sys.stderr') as stderr:
+                sounds.load()
+        stderr.write.assert_called_once_with(
+            "audio: no sound: no device\n")
+        sounds.play('win')
+        sounds.close()
+
+    def test_dropped_on_quit(self):
+        sounds = audio.Audio()
+        sounds.load()
+        pygame.quit()
+        self.assertEqual({}, sounds.sounds)
+        sounds.play('cover')
+        sounds.close()
@@ -0,0 +1,73 @@
+import unittest
+
+import mock
+import pygame
+from pygame.constants import MOUSEBUTTONUP, QUIT
+
+import benchmark
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS, EASY_RECT
+from game_state import GameState
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare(self):
+        baseline = {'draw_icon.donut': 1.0, 'draw_icon.oval': 1.0}
+        results = {'draw_icon.donut': 1.2, 'draw_icon.oval': 1.3,
+                   'draw_icon.lines': 9.0}
+        self.assertEqual(
+            [('draw_icon.oval', 1.0, 1.3)],
+            benchmark.compare(results, baseline, 0.25))
+
+    def test_tiled_board(self):
+        board = benchmark.tiled_board(benchmark.LARGE_GRID[1])
+        game_rows, game_cols = benchmark.LARGE_GRID[1]
+        self.assertEqual(game_cols, len(board))
+        self.assertEqual(game_rows, len(board[0]))
+
+    def test_session_script(self):
+        script = benchmark.session_script(TEST_GRID)
+        events = [event for frame in sorted(script)
+                  for event in script[frame]]
+        self.assertEqual(EASY_GAME_ROWS * EASY_GAME_COLS + 1, len(events))
+        self.assertTrue(all(event.type == MOUSEBUTTONUP
+                            for event in events[:-1]))
+        self.assertEqual(QUIT, events[-1].type)
+
+    def test_run_session(self):
+        outcomes = []
+        select = GameState.select
+
+        def recording_select(game, box):
+            outcome = select(game, box)
+            outcomes.append(outcome)
+            return outcome
+
+        with mock.patch.object(GameState, 'select', recording_select):
+            frames = benchmark.run_session(TEST_GRID, EASY_RECT)
+        self.assertEqual(max(benchmark.session_script(TEST_GRID)), frames)
+        # Every scripted click selects a box.
+        self.assertEqual(EASY_GAME_ROWS * EASY_GAME_COLS, len(outcomes))
+        self.assertTrue('match' in outcomes)
+        self.assertTrue('mismatch' in outcomes)
+        pygame.quit()
+
+    def test_run_benchmarks(self):
+        results = benchmark.run_benchmarks(
+            number=1,
+            repeat=1,
+            sessions=False,
+            names=['draw_icon.', 'get_box_under_mouse.easy'])
+        self.assertEqual(
+            ['draw_icon.diamond', 'draw_icon.donut', 'draw_icon.lines',
+             'draw_icon.oval', 'draw_icon.square',
+             'get_box_under_mouse.easy.x6348'],
+            sorted(results))
+        pygame.quit()
+
+    def test_startup_budget(self):
+        self.assertTrue(benchmark.time_startup() < benchmark.STARTUP_BUDGET,
+                        "the first frame took longer than %.2f s"
+                        % benchmark.STARTUP_BUDGET)
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy
+
+import boards
+import icons
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS
+from icons import ALLCOLORS, ALLSHAPES
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+
+
+class TestBoards(unittest.TestCase):
+    def test_classic_icons(self):
+        codes = boards.generate_board_codes(TEST_GRID, 100, seed=1)
+        self.assertTrue(codes.max() < len(ALLSHAPES) * len(ALLCOLORS))
+
+    def test_generate_board_codes(self):
+        codes = boards.generate_board_codes(TEST_GRID, 100, seed=1)
+        self.assertEqual((100, EASY_GAME_COLS, EASY_GAME_ROWS), codes.shape)
+        for board_codes in codes:
+            counts = numpy.bincount(board_codes.ravel())
+            self.assertTrue(set(counts.tolist()) <= set([0, 2]))
+
+    def test_generate_board_codes_seeded(self):
+        self.assertTrue(numpy.array_equal(
+            boards.generate_board_codes(TEST_GRID, 10, seed=7),
+            boards.generate_board_codes(TEST_GRID, 10, seed=7)))
+        self.assertFalse(numpy.array_equal(
+            boards.generate_board_codes(TEST_GRID, 10, seed=7),
+            boards.generate_board_codes(TEST_GRID, 10, seed=8)))
+
+    def test_generate_board_codes_too_big(self):
+        self.assertRaises(
+            ValueError,
+            boards.generate_board_codes,
+            (len(icons.ALL_ICONS) + 1, 2))
+        self.assertRaises(ValueError, boards.generate_board_codes, (3, 3))
+
+    def test_generate_board_codes_procedural(self):
+        codes = boards.generate_board_codes((40, 40), 10, seed=1)
+        self.assertEqual((10, 40, 40), codes.shape)
+        for board_codes in codes:
+            counts = numpy.bincount(board_codes.ravel())
+            self.assertEqual(800, (counts == 2).sum())
+
+    def test_generate_boards(self):
+        board_codes = boards.generate_board_codes(TEST_GRID, seed=3)[0]
+        board, = boards.generate_boards(TEST_GRID, seed=3)
+        self.assertEqual(EASY_GAME_COLS, len(board))
+        for x_value in range(EASY_GAME_COLS):
+            self.assertEqual(EASY_GAME_ROWS, len(board[x_value]))
+            for y_value in range(EASY_GAME_ROWS):
+                self.assertEqual(
+                    icons.ALL_ICONS[board_codes[x_value][y_value]],
+                    board[x_value][y_value])
@@ -0,0 +1,74 @@
+import random
+import unittest
+
+import bots
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS
+from game_state import GameState, get_randomized_board
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+PAIRS = EASY_GAME_ROWS * EASY_GAME_COLS // 2
+
+
+def play(spec, seed):
+    rng = random.Random(seed)
+    game = GameState(TEST_GRID, get_randomized_board(TEST_GRID, rng))
+    bot = bots.make_bot(spec)
+    bot.new_game(game, rng)
+    moves = bot.play()
+    return game, moves
+
+
+class TestBots(unittest.TestCase):
+    def test_make_bot(self):
+        self.assertEqual(None, bots.make_bot('perfect').memory)
+        self.assertEqual(0, bots.make_bot('random').memory)
+        self.assertEqual(6, bots.make_bot('limited:6').memory)
+        for spec in ('limited', 'limited:x', 'perfect:3', 'genius'):
+            self.assertRaises(ValueError, bots.make_bot, spec)
+
+    def test_play(self):
+        for spec in ('perfect', 'limited:4', 'random'):
+            game, moves = play(spec, 1)
+            self.assertTrue(game.has_won())
+            self.assertEqual(game.moves, moves)
+            self.assertTrue(moves >= PAIRS)
+
+    def test_perfect_memory_bound(self):
+        # A perfect memory never turns a box more than twice.
+        for seed in range(50):
+            _, moves = play('perfect', seed)
+            self.assertTrue(moves < 2 * PAIRS)
+
+    def test_limited_memory(self):
+        bot = bots.make_bot('limited:2')
+        bot.new_game(GameState(TEST_GRID), random.Random(0))
+        for index in range(3):
+            bot.remember(index)
+        self.assertEqual([1, 2], list(bot.known))
+        bot.forget(1)
+        self.assertEqual([2], list(bot.known))
+
+    def test_deterministic(self):
+        self.assertEqual(play('limited:4', 3)[1], play('limited:4', 3)[1])
+
+    def test_percentile(self):
+        moves = {10: 50, 20: 40, 30: 10}
+        self.assertEqual(10, bots.percentile(moves, 50))
+        self.assertEqual(20, bots.percentile(moves, 90))
+        self.assertEqual(30, bots.percentile(moves, 99))
+
+    def test_evaluate(self):
+        levels = [('easy', TEST_GRID)]
+        results = bots.evaluate(['perfect', 'random'], levels, games=30,
+                                processes=2)
+        self.assertEqual([('perfect', 'easy'), ('random', 'easy')],
+                         list(results))
+        perfect, _ = results[('perfect', 'easy')]
+        self.assertEqual(30, sum(perfect.values()))
+        self.assertEqual(bots.play_games(('perfect', TEST_GRID, range(30))),
+                         perfect)
+        random_moves, _ = results[('random', 'easy')]
+        self.assertTrue(bots.percentile(perfect, 50) <
+                        bots.percentile(random_moves, 50))
+        self.assertEqual(3, len(bots.report(results)))
@@ -0,0 +1,113 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import mock  # noqa: E402
+import pygame  # noqa: E402
+
+import export  # noqa: E402
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS  # noqa: E402
+from game_state import get_randomized_board  # noqa: E402
+
+try:
+    import PIL
+except ImportError:
+    PIL = None
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+PAIRS = EASY_GAME_ROWS * EASY_GAME_COLS // 2
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.out)
+        patcher = mock.patch.dict('memorypuzzle._VIEWPORTS', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        self.addCleanup(pygame.display.quit)
+
+    def path(self, *names):
+        return os.path.join(self.out, *names)
+
+    def test_reveal_order(self):
+        board = get_randomized_board(TEST_GRID, random.Random(3))
+        pairs = export.reveal_order(board)
+        self.assertEqual(PAIRS, len(pairs))
+        boxes = [box for pair in pairs for box in pair]
+        self.assertEqual(EASY_GAME_ROWS * EASY_GAME_COLS, len(set(boxes)))
+        for first, second in pairs:
+            self.assertEqual(board[first[0]][first[1]],
+                             board[second[0]][second[1]])
+        self.assertEqual(sorted(pairs), pairs)
+
+    def test_board_viewport(self):
+        viewport = export.board_viewport(TEST_GRID, 0.5)
+        game_rows, game_cols = TEST_GRID
+        gap_size = viewport.gap_size
+        self.assertEqual((gap_size, gap_size), viewport.left_top((0, 0)))
+        right, bottom = viewport.left_top((game_cols - 1, game_rows - 1))
+        self.assertEqual(
+            (right + viewport.box_size + gap_size,
+             bottom + viewport.box_size + gap_size), viewport.size)
+
+    def test_chunk_size(self):
+        self.assertEqual(7, export.chunk_size(100, 4))
+        self.assertEqual(1, export.chunk_size(3, 8))
+        self.assertEqual(export.CHUNK_SIZE, export.chunk_size(100000, 2))
+
+    def test_export_board(self):
+        self.assertEqual(1, export.export_board(self.out, TEST_GRID, 5,
+                                                width=100))
+        thumbnail = pygame.image.load(self.path('board-4x5-5.png'))
+        self.assertEqual(100, thumbnail.get_width())
+        self.assertEqual(2 + PAIRS, export.export_board(
+            self.out, TEST_GRID, 6, frames='png'))
+        frames = sorted(os.listdir(self.path('board-4x5-6')))
+        self.assertEqual(['frame-%04d.png' % count
+                          for count in range(PAIRS + 1)], frames)
+        # The last frame reveals every box, like the thumbnail.
+        full = pygame.image.load(self.path('board-4x5-6.png'))
+        last = pygame.image.load(self.path('board-4x5-6', frames[-1]))
+        self.assertEqual(pygame.image.tostring(full, 'RGB'),
+                         pygame.image.tostring(last, 'RGB'))
+        first = pygame.image.load(self.path('board-4x5-6', frames[0]))
+        self.assertNotEqual(pygame.image.tostring(full, 'RGB'),
+                            pygame.image.tostring(first, 'RGB'))
+
+    @mock.patch('export.save_gif')
+    def test_export_board_gif_count(self, save_gif):
+        # The thumbnail and the GIF, not the frames in the GIF.
+        self.assertEqual(2, export.export_board(
+            self.out, TEST_GRID, 6, frames='gif'))
+        path, frames = save_gif.call_args[0]
+        self.assertEqual(self.path('board-4x5-6.gif'), path)
+        self.assertEqual(PAIRS + 1, len(frames))
+
+    @unittest.skipUnless(PIL, "needs Pillow")
+    def test_export_board_gif(self):
+        self.assertEqual(2, export.export_board(
+            self.out, TEST_GRID, 6, frames='gif'))
+        self.assertTrue(os.path.getsize(self.path('board-4x5-6.gif')))
+
+    def test_main(self):
+        with mock.patch('sys.stdout'):
+            self.assertEqual(0, export.main([
+                '--count', '3', '--seed', '10', '--out', self.path('boards'),
+                '--processes', '1', '--grid', '2x3']))
+        self.assertEqual(['board-2x3-%d.png' % seed for seed in (10, 11, 12)],
+                         sorted(os.listdir(self.path('boards'))))
+        self.assertEqual(
+            160, pygame.image.load(self.path('boards', 'board-2x3-10.png'))
+            .get_width())
+
+
+if __name__ == '__main__':
+    unittest.main()
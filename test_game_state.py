@@ -0,0 +1,110 @@
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+import game_state
+from colors import CYAN, RED
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS
+from shapes import DONUT, SQUARE
+
+
+TEST_GRID = (1, 4)
+TEST_BOARD = [[(DONUT, RED)], [(SQUARE, CYAN)], [(DONUT, RED)],
+              [(SQUARE, CYAN)]]
+
+
+class TestGameState(unittest.TestCase):
+    def test_no_pygame(self):
+        output = subprocess.check_output(
+            [sys.executable, '-c',
+             'import sys, game_state; print("pygame" in sys.modules)'],
+            cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(b'False', output.strip(),
+                         "game_state must not depend on pygame.")
+
+    def test_get_randomized_board(self):
+        grid = (EASY_GAME_ROWS, EASY_GAME_COLS)
+        board = game_state.get_randomized_board(grid)
+        self.assertEqual(EASY_GAME_COLS, len(board))
+        icons = [icon for column in board for icon in column]
+        self.assertEqual(EASY_GAME_ROWS * EASY_GAME_COLS, len(icons))
+        for icon in icons:
+            self.assertEqual(2, icons.count(icon))
+
+    def test_get_randomized_board_seeded(self):
+        grid = (EASY_GAME_ROWS, EASY_GAME_COLS)
+        self.assertEqual(
+            game_state.get_randomized_board(grid, random.Random(5)),
+            game_state.get_randomized_board(grid, random.Random(5)))
+
+    def test_encode_decode_board(self):
+        board_codes = game_state.encode_board(TEST_BOARD)
+        self.assertEqual(
+            [game_state.ICON_CODES[(DONUT, RED)],
+             game_state.ICON_CODES[(SQUARE, CYAN)]] * 2,
+            board_codes.tolist())
+        self.assertEqual(
+            TEST_BOARD,
+            game_state.decode_board(board_codes, TEST_GRID))
+
+    def test_board_codes(self):
+        board_codes = game_state.encode_board(TEST_BOARD)
+        game = game_state.GameState(TEST_GRID, board_codes=board_codes)
+        self.assertEqual(TEST_BOARD, game.board)
+        self.assertEqual(game_state.FIRST_SELECTION, game.select((1, 0)))
+        self.assertEqual(game_state.MATCH, game.select((3, 0)))
+        self.assertEqual([[False], [True], [False], [True]], game.revealed)
+        self.assertEqual(0b1010, game.revealed_mask)
+        self.assertEqual(1, game.matched_pairs)
+
+    def test_revealed_lookup(self):
+        revealed = game_state.generate_revealed_boxes_data(False, TEST_GRID)
+        is_revealed = game_state.revealed_lookup(revealed)
+        self.assertFalse(is_revealed((2, 0)))
+        revealed[2][0] = True
+        self.assertTrue(is_revealed((2, 0)))
+
+    def test_score(self):
+        self.assertEqual(200, game_state.score(TEST_GRID, 2, 999))
+        self.assertEqual(178, game_state.score(TEST_GRID, 4, 1000))
+        self.assertEqual(0, game_state.score(TEST_GRID, 100, 0))
+
+    def test_select_match(self):
+        game = game_state.GameState(TEST_GRID, TEST_BOARD)
+        self.assertEqual(game_state.FIRST_SELECTION, game.select((0, 0)))
+        self.assertEqual(game_state.IGNORED, game.select((0, 0)))
+        self.assertEqual(game_state.MATCH, game.select((2, 0)))
+        self.assertTrue(game.is_box_revealed((0, 0)))
+        self.assertTrue(game.is_box_revealed((2, 0)))
+        self.assertEqual(1, game.moves)
+        self.assertFalse(game.has_won())
+
+    def test_select_mismatch(self):
+        game = game_state.GameState(TEST_GRID, TEST_BOARD)
+        game.select((0, 0))
+        self.assertEqual(game_state.MISMATCH, game.select((1, 0)))
+        self.assertEqual(((0, 0), (1, 0)), game.mismatched)
+        self.assertTrue(game.is_box_revealed((1, 0)))
+        self.assertEqual(((0, 0), (1, 0)), game.cover_mismatched())
+        self.assertFalse(game.is_box_revealed((0, 0)))
+        self.assertFalse(game.is_box_revealed((1, 0)))
+        self.assertEqual((), game.cover_mismatched())
+
+    def test_select_covers_pending_mismatch(self):
+        game = game_state.GameState(TEST_GRID, TEST_BOARD)
+        game.select((0, 0))
+        game.select((1, 0))
+        self.assertEqual(game_state.FIRST_SELECTION, game.select((1, 0)))
+        self.assertFalse(game.is_box_revealed((0, 0)))
+
+    def test_select_won(self):
+        game = game_state.GameState(TEST_GRID, TEST_BOARD)
+        game.select((0, 0))
+        game.select((2, 0))
+        game.select((1, 0))
+        self.assertEqual(game_state.WON, game.select((3, 0)))
+        self.assertTrue(game.has_won())
+        self.assertEqual(2, game.moves)
+
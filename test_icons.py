@@ -0,0 +1,37 @@
+import unittest
+
+import icons
+from icons import ALL_ICONS, ALLCOLORS, ALLSHAPES, ICONS
+
+
+class TestIcons(unittest.TestCase):
+    def test_icons(self):
+        self.assertEqual(len(ALLSHAPES) * len(ALLCOLORS), len(ICONS))
+        self.assertEqual(ICONS, ALL_ICONS[:len(ICONS)])
+        self.assertEqual(len(ALL_ICONS), len(set(ALL_ICONS)))
+        self.assertEqual(
+            len(ICONS) + len(icons.PROCEDURAL_SHAPES) * len(icons.PALETTE),
+            len(ALL_ICONS))
+
+    def test_icon_codes(self):
+        for code, icon in enumerate(ALL_ICONS):
+            self.assertEqual(code, icons.ICON_CODES[icon])
+
+    def test_parse_shape(self):
+        self.assertEqual(None, icons.parse_shape(ALLSHAPES[0]))
+        shape = icons.procedural_shape(icons.STAR, 5, 36, icons.OUTLINE)
+        self.assertEqual((icons.STAR, 5, 36.0, icons.OUTLINE),
+                         icons.parse_shape(shape))
+        for shape in icons.PROCEDURAL_SHAPES:
+            self.assertEqual(shape,
+                             icons.procedural_shape(*icons.parse_shape(shape)))
+
+    def test_palette(self):
+        self.assertEqual(len(icons.PALETTE), len(set(icons.PALETTE)))
+        self.assertFalse(set(ALLCOLORS) & set(icons.PALETTE))
+
+    def test_icon_pool(self):
+        self.assertEqual(ICONS, icons.icon_pool(len(ICONS)))
+        self.assertEqual(ALL_ICONS, icons.icon_pool(len(ICONS) + 1))
+        self.assertEqual(ALL_ICONS, icons.icon_pool(40 * 40 // 2))
+        self.assertRaises(ValueError, icons.icon_pool, len(ALL_ICONS) + 1)
@@ -0,0 +1,63 @@
+import unittest
+
+import mock
+import pygame
+from pygame.constants import MOUSEBUTTONUP, MOUSEMOTION, QUIT
+
+import game_state
+import latency
+import memorypuzzle
+import profiler
+
+TEST_GRID = (2, 4)
+
+
+class TestLatency(unittest.TestCase):
+    def test_input_script(self):
+        board = game_state.get_randomized_board(TEST_GRID)
+        script = latency.input_script(board, TEST_GRID)
+        self.assertEqual([MOUSEMOTION, MOUSEBUTTONUP] * 8 + [QUIT],
+                         [event.type for _, event in script])
+        times = [milliseconds for milliseconds, _ in script]
+        self.assertEqual(sorted(times), times)
+        self.assertTrue(times[0] > 2 * memorypuzzle.REVEAL_DURATION)
+        clicked = [memorypuzzle.get_box_under_mouse(event.pos, TEST_GRID)[1]
+                   for _, event in script if event.type == MOUSEBUTTONUP]
+        icons = [board[x_value][y_value] for x_value, y_value in clicked]
+        self.assertEqual(icons[0::2], icons[1::2])
+        self.assertEqual(8, len(set(clicked)))
+
+    def test_injected_input(self):
+        pygame.display.init()
+        self.addCleanup(pygame.display.quit)
+        input_source = latency.InjectedInput()
+        pygame.event.post(pygame.event.Event(
+            MOUSEMOTION, pos=(30, 40), rel=(0, 0), buttons=(0, 0, 0)))
+        input_source.get()
+        self.assertEqual((30, 40), input_source.get_pos())
+        pygame.event.post(pygame.event.Event(
+            MOUSEMOTION, pos=(50, 60), rel=(0, 0), buttons=(0, 0, 0)))
+        self.assertEqual(MOUSEMOTION, input_source.wait(100).type)
+        self.assertEqual((50, 60), input_source.get_pos())
+
+    @mock.patch('memorypuzzle.PROFILER', profiler.FrameProfiler())
+    def test_latency_budgets(self):
+        latencies = latency.measure(TEST_GRID)
+        for kind in latency.LATENCY_BUDGETS:
+            self.assertEqual(8, len(memorypuzzle.PROFILER.samples[
+                profiler.LATENCY + kind]))
+        self.assertEqual([], latency.over_budget(latencies), latencies)
+        self.assertEqual(memorypuzzle.FPS,
+                         memorypuzzle.RENDER_SETTINGS['frame_cap'])
+
+    def test_main(self):
+        latencies = dict((kind, {'p50': 1.0, 'p95': 2.0, 'p99': 3.0})
+                         for kind in latency.LATENCY_BUDGETS)
+        with mock.patch('latency.measure', return_value=latencies):
+            with mock.patch('latency.print', create=True):
+                self.assertEqual(0, latency.main(['--grid', '2x4']))
+            latencies['click']['p95'] = 1000.0
+            with mock.patch('latency.print', create=True):
+                with mock.patch('sys.stderr') as stderr:
+                    self.assertEqual(1, latency.main([]))
+        stderr.write.assert_called_once_with("click latency over budget\n")
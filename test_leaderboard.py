@@ -0,0 +1,107 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import mock
+
+import leaderboard
+from constants import EASY_GAME_COLS, EASY_GAME_ROWS
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+
+
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'leaderboard.db')
+
+    def open(self, **kwargs):
+        board = leaderboard.Leaderboard(self.path, **kwargs)
+        self.addCleanup(board.close)
+        return board
+
+    def test_top(self):
+        board = self.open()
+        self.assertEqual([], board.top(TEST_GRID))
+        self.assertEqual(None, board.best(TEST_GRID))
+        board.save(TEST_GRID, 12, 40000, 820, played_at=1.0)
+        board.save(TEST_GRID, 10, 30000, 940, played_at=2.0)
+        board.save(TEST_GRID, 11, 20000, 940, played_at=3.0)
+        board.save((6, 6), 18, 60000, 1680, played_at=4.0)
+        board.flush()
+        self.assertEqual(
+            [(940, 11, 20000, 3.0), (940, 10, 30000, 2.0),
+             (820, 12, 40000, 1.0)],
+            board.top(TEST_GRID))
+        self.assertEqual([(940, 11, 20000, 3.0)], board.top(TEST_GRID, 1))
+        self.assertEqual(940, board.best(TEST_GRID))
+        self.assertEqual(1680, board.best((6, 6)))
+
+    def test_batches(self):
+        board = self.open()
+        board.close()
+        board.batch_size = 3
+        for count in range(10):
+            board.save(TEST_GRID, 10, 1000, count)
+        board.results.put(None)
+        with mock.patch('leaderboard.connect') as connect:
+            board.write_results()
+        connection = connect.return_value
+        batches = [call[0][1]
+                   for call in connection.executemany.call_args_list]
+        self.assertEqual([3, 3, 3, 1], [len(batch) for batch in batches])
+        self.assertEqual(
+            list(range(10)), [row[2] for batch in batches for row in batch])
+        connection.close.assert_called_once_with()
+
+    def test_close_writes_queued_results(self):
+        board = leaderboard.Leaderboard(self.path)
+        board.save(TEST_GRID, 10, 1000, 500)
+        board.close()
+        self.assertFalse(board.writer.is_alive())
+        self.assertEqual(500, self.open().best(TEST_GRID))
+
+    def test_top_uses_the_index(self):
+        connection = leaderboard.connect(self.path)
+        self.addCleanup(connection.close)
+        plan = ' '.join(row[-1] for row in connection.execute(
+            "EXPLAIN QUERY PLAN " + leaderboard.TOP, TEST_GRID + (10,)))
+        self.assertTrue('results_by_score' in plan, plan)
+        self.assertFalse('TEMP B-TREE' in plan, plan)
+
+    def test_write_errors(self):
+        board = self.open()
+        with mock.patch('sys.stderr') as stderr:
+            board.save(TEST_GRID, 10, 1000, None)
+            board.flush()
+        self.assertTrue(
+            '1 results lost' in stderr.write.call_args[0][0])
+        self.assertEqual(None, board.best(TEST_GRID))
+
+    def test_main(self):
+        board = leaderboard.Leaderboard(self.path)
+        board.save(TEST_GRID, 10, 65000, 870, played_at=0)
+        board.close()
+        with mock.patch('leaderboard.print', create=True) as print_line:
+            self.assertEqual(0, leaderboard.main(
+                ['--db', self.path, '--grid', '%dx%d' % TEST_GRID]))
+        lines = [call[0][0] for call in print_line.call_args_list]
+        self.assertEqual('%dx%d (%dx%d)' % (TEST_GRID * 2), lines[0])
+        self.assertTrue(lines[1].startswith('  1.    870    10 moves    1:05'),
+                        lines[1])
+        self.assertEqual(2, len(lines))
+        self.assertRaises(SystemExit, leaderboard.main, ['--grid', '3x3'])
+
+    def test_report_levels(self):
+        lines = leaderboard.report(self.open(), leaderboard.LEVELS)
+        self.assertEqual(['easy (4x5)', 'medium (6x6)', 'hard (7x10)'], lines)
+
+    def test_wal(self):
+        self.open()
+        connection = sqlite3.connect(self.path)
+        self.addCleanup(connection.close)
+        self.assertEqual(
+            'wal', connection.execute('PRAGMA journal_mode').fetchone()[0])
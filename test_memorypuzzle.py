@@ -1,12 +1,15 @@
+import argparse
 import sys
+import time
 import unittest
 
 import mock
-from pygame.constants import QUIT, MOUSEBUTTONUP
+from pygame.constants import QUIT, MOUSEBUTTONUP, NOEVENT
 import pygame
 from mock import MagicMock
 
 import memorypuzzle
+from animation import Scheduler, end_time
 from colors import (
     BGCOLOR,
     BLUE,
@@ -33,8 +36,10 @@ from constants import (
     GAPSIZE,
     HARD_GAME_COLS,
     HARD_GAME_ROWS,
+    LEADERBOARD_PATH,
     MEDIUM_GAME_COLS,
     MEDIUM_GAME_ROWS,
+    REVEAL_DURATION,
     REVEALSPEED,
     WINDOWHEIGHT,
     WINDOWWIDTH, HALF_BOXSIZE, QUARTER_BOXSIZE, GAME_WON_FLASH_WAIT,
@@ -45,7 +50,10 @@ from shapes import (
     LINES,
     OVAL,
     SQUARE)
+from icons import ALL_ICONS, ICONS
 from memorypuzzle import ALLCOLORS, ALLSHAPES
+from profiler import LATENCY, FrameProfiler
+from render_backends import SurfaceBackend
 
 
 TEST_BOARD = [
@@ -59,8 +67,23 @@ TEST_BOX = (0, 0)
 TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
 LEFT_TOP_COORDS_OF_TEST_BOX = (195, 140)
 
+# pygame attributes replaced by mocks in the tests, restored after each test.
+PATCHED_PYGAME_ATTRIBUTES = (
+    'Rect', 'display', 'draw', 'event', 'font', 'init', 'quit', 'time')
+
 
 class TestGame(unittest.TestCase):
+    def setUp(self):
+        self.saved_pygame = dict(
+            (name, getattr(pygame, name))
+            for name in PATCHED_PYGAME_ATTRIBUTES)
+        self.saved_sys_exit = sys.exit
+
+    def tearDown(self):
+        for name, value in self.saved_pygame.items():
+            setattr(pygame, name, value)
+        sys.exit = self.saved_sys_exit
+
     def test_constants(self):
         self.assertTrue(GAME_ROWS > 0)
         self.assertTrue(GAME_COLS > 0)
@@ -139,14 +162,48 @@ class TestGame(unittest.TestCase):
     def test_get_game_clock_display(self):
         pygame.init = MagicMock()
         pygame.display = MagicMock()
+        pygame.font = MagicMock()
         pygame.time = MagicMock()
         memorypuzzle.get_game_clock_display()
-        pygame.init.assert_called_once_with()
+        self.assertFalse(pygame.init.called)
+        pygame.display.init.assert_called_once_with()
+        pygame.font.init.assert_called_once_with()
         pygame.display.set_caption.assert_called_once_with("Memory Game")
         pygame.time.Clock.assert_called_once_with()
         pygame.display.set_mode.assert_called_once_with(
             (WINDOWWIDTH, WINDOWHEIGHT))
 
+    def test_get_game_clock_display_vsync(self):
+        pygame.display = MagicMock()
+        pygame.font = MagicMock()
+        pygame.time = MagicMock()
+        fps_clock, display_surface = memorypuzzle.get_game_clock_display(True)
+        pygame.display.set_mode.assert_called_once_with(
+            (WINDOWWIDTH, WINDOWHEIGHT), pygame.SCALED, vsync=1)
+        pygame.display.set_mode.reset_mock()
+        pygame.display.set_mode.side_effect = [pygame.error, display_surface]
+        self.assertEqual(
+            display_surface,
+            memorypuzzle.get_game_clock_display(True)[1])
+        pygame.display.set_mode.assert_called_with((WINDOWWIDTH, WINDOWHEIGHT))
+
+    @mock.patch("memorypuzzle.get_game_clock_display")
+    def test_get_game_clock_backend(self, get_game_clock_display):
+        get_game_clock_display.return_value = (mock.ANY, MagicMock())
+        fps_clock, backend = memorypuzzle.get_game_clock_backend('surface')
+        self.assertEqual('surface', backend.name)
+        self.assertTrue(
+            backend.surface is get_game_clock_display.return_value[1])
+        pygame.display = MagicMock()
+        pygame.font = MagicMock()
+        pygame.time = MagicMock()
+        fps_clock, backend = memorypuzzle.get_game_clock_backend('null')
+        self.assertEqual('null', backend.name)
+        self.assertEqual((WINDOWWIDTH, WINDOWHEIGHT), backend.get_size())
+        pygame.display.init.assert_called_once_with()
+        pygame.font.init.assert_called_once_with()
+        self.assertFalse(pygame.display.set_mode.called)
+
     def test_left_top_coords_of_box(self):
         left, top = memorypuzzle.left_top_coords_of_box(TEST_BOX, TEST_GRID)
         self.assertEquals(
@@ -154,41 +211,103 @@ class TestGame(unittest.TestCase):
             LEFT_TOP_COORDS_OF_TEST_BOX,
             "Coordinates Differ From the calculated expected Value.")
 
-    @mock.patch("memorypuzzle.draw_icon", MagicMock())
+    def test_get_box_under_mouse(self):
+        self.assertEqual(
+            (True, TEST_BOX),
+            memorypuzzle.get_box_under_mouse(
+                LEFT_TOP_COORDS_OF_TEST_BOX,
+                TEST_GRID))
+        self.assertEqual(
+            (False, (None, None)),
+            memorypuzzle.get_box_under_mouse((0, 0), TEST_GRID))
+
+    def test_get_box_under_mouse_every_pixel(self):
+        for grid in ((EASY_GAME_ROWS, EASY_GAME_COLS),
+                     (MEDIUM_GAME_ROWS, MEDIUM_GAME_COLS),
+                     (HARD_GAME_ROWS, HARD_GAME_COLS)):
+            game_rows, game_cols = grid
+            boxes = [(boxx, boxy)
+                     for boxx in range(game_cols)
+                     for boxy in range(game_rows)]
+            box_rects = [
+                pygame.Rect(memorypuzzle.left_top_coords_of_box(box, grid),
+                            (BOXSIZE, BOXSIZE))
+                for box in boxes]
+            for x_value in range(WINDOWWIDTH):
+                for y_value in range(WINDOWHEIGHT):
+                    index = pygame.Rect(x_value, y_value, 1, 1).collidelist(
+                        box_rects)
+                    if index == -1:
+                        expected = (False, (None, None))
+                    else:
+                        expected = (True, boxes[index])
+                    self.assertEqual(
+                        expected,
+                        memorypuzzle.get_box_under_mouse(
+                            (x_value, y_value),
+                            grid))
+
+    @mock.patch.dict("memorypuzzle._ANIMATION_STRIPS", clear=True)
     def test_draw_box_covers(self):
-        pygame.draw = MagicMock()
-        pygame.display = MagicMock()
         display_surface = MagicMock()
-        fps_clock = MagicMock()
         left, top = LEFT_TOP_COORDS_OF_TEST_BOX
-        memorypuzzle.draw_box_covers(
-            display_surface,
-            fps_clock,
+        dirty_rects = memorypuzzle.draw_box_covers(
+            SurfaceBackend(display_surface),
             TEST_BOARD,
             [TEST_BOX],
-            10,
+            REVEALSPEED + 1,
             TEST_GRID)
 
-        expected_draw_rect = [
-            mock.call(display_surface, BGCOLOR, (left, top, BOXSIZE, BOXSIZE)),
-            mock.call(display_surface, BOXCOLOR, (left, top, 10, BOXSIZE))
-        ]
-        self.assertEqual(expected_draw_rect,
-                         pygame.draw.rect.call_args_list)
-        memorypuzzle.draw_icon.assert_called_once_with(
-            display_surface,
-            LINES,
-            ORANGE,
-            TEST_BOX,
-            TEST_GRID)
-        pygame.display.update.assert_called_once_with()
-        fps_clock.tick.assert_called_once_with(FPS)
+        display_surface.blit.assert_called_once_with(
+            memorypuzzle.get_animation_strip((LINES, ORANGE)),
+            (left, top),
+            pygame.Rect(BOXSIZE, 0, BOXSIZE, BOXSIZE))
+        self.assertEqual([((LINES, ORANGE), BOXSIZE)],
+                         list(memorypuzzle._ANIMATION_STRIPS))
+        self.assertEqual([(left, top, BOXSIZE, BOXSIZE)], dirty_rects)
 
-    def test_draw_icon(self):
+    @mock.patch.dict("memorypuzzle._ANIMATION_STRIPS", clear=True)
+    def test_draw_box_covers_matches_primitives(self):
+        left, top = LEFT_TOP_COORDS_OF_TEST_BOX
+        for shape, color in ((DONUT, RED), ALL_ICONS[len(ICONS)]):
+            board = [[(shape, color)]]
+            for coverage in (0, 1, HALF_BOXSIZE, BOXSIZE - 1, BOXSIZE):
+                # Covers are drawn in steps of REVEALSPEED pixels.
+                shown = coverage // REVEALSPEED * REVEALSPEED
+                expected = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+                expected.fill(LIGHTBGCOLOR)
+                expected.fill(BGCOLOR, (left, top, BOXSIZE, BOXSIZE))
+                memorypuzzle.render_icon(expected, shape, color, left, top)
+                expected.fill(BOXCOLOR, (left, top, shown, BOXSIZE))
+                actual = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+                actual.fill(LIGHTBGCOLOR)
+                memorypuzzle.draw_box_covers(
+                    SurfaceBackend(actual), board, [TEST_BOX], coverage,
+                    TEST_GRID)
+                self.assertEqual(
+                    pygame.image.tostring(expected, 'RGB'),
+                    pygame.image.tostring(actual, 'RGB'),
+                    "%s %s covered %d differs" % (shape, color, coverage))
+
+    @mock.patch.dict("memorypuzzle._ANIMATION_STRIPS", clear=True)
+    @mock.patch("memorypuzzle.ANIMATION_STRIP_CACHE_BYTES",
+                2 * 4 * 6 * BOXSIZE * BOXSIZE)
+    def test_get_animation_strip_evicts(self):
+        first = memorypuzzle.get_animation_strip(ICONS[0])
+        self.assertEqual((6 * BOXSIZE, BOXSIZE), first.get_size())
+        self.assertEqual(4 * 6 * BOXSIZE * BOXSIZE,
+                         memorypuzzle.surface_bytes(first))
+        self.assertTrue(first is memorypuzzle.get_animation_strip(ICONS[0]))
+        for icon in ICONS[1:3]:
+            memorypuzzle.get_animation_strip(icon)
+        self.assertEqual(2, len(memorypuzzle._ANIMATION_STRIPS))
+        self.assertFalse(first is memorypuzzle.get_animation_strip(ICONS[0]))
+
+    def test_render_icon(self):
         pygame.draw = MagicMock()
         display_surface = MagicMock()
         left, top = LEFT_TOP_COORDS_OF_TEST_BOX
-        memorypuzzle.draw_icon(display_surface, DONUT, RED, TEST_BOX, TEST_GRID)
+        memorypuzzle.render_icon(display_surface, DONUT, RED, left, top)
         expected = [
             mock.call(
                 display_surface,
@@ -201,60 +320,130 @@ class TestGame(unittest.TestCase):
                 (left + HALF_BOXSIZE, top + HALF_BOXSIZE),
                 QUARTER_BOXSIZE - 5)
         ]
-        self.assertTrue(pygame.draw.circle.call_args_list, expected)
+        self.assertEqual(pygame.draw.circle.call_args_list, expected)
+
+    def test_build_icon_atlas(self):
+        atlas, icon_rects = memorypuzzle.build_icon_atlas()
+        self.assertEqual(
+            (len(ALLSHAPES) * BOXSIZE, len(ALLCOLORS) * BOXSIZE),
+            atlas.get_size())
+        self.assertEqual(len(ALLSHAPES) * len(ALLCOLORS), len(icon_rects))
+        for rect in icon_rects.values():
+            self.assertTrue(atlas.get_rect().contains(rect))
+
+    def test_draw_icon(self):
+        display_surface = MagicMock()
+        atlas, icon_rects = memorypuzzle.get_icon_atlas()
+        memorypuzzle.draw_icon(SurfaceBackend(display_surface), DONUT, RED,
+                               TEST_BOX, TEST_GRID)
+        display_surface.blit.assert_called_once_with(
+            atlas,
+            LEFT_TOP_COORDS_OF_TEST_BOX,
+            icon_rects[(DONUT, RED)])
+
+    def test_draw_icon_matches_primitives(self):
+        for shape in ALLSHAPES:
+            for color in ALLCOLORS:
+                expected = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+                expected.fill(BGCOLOR)
+                left, top = LEFT_TOP_COORDS_OF_TEST_BOX
+                memorypuzzle.render_icon(expected, shape, color, left, top)
+                actual = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+                actual.fill(BGCOLOR)
+                memorypuzzle.draw_icon(SurfaceBackend(actual), shape, color,
+                                       TEST_BOX, TEST_GRID)
+                self.assertEqual(
+                    pygame.image.tostring(expected, 'RGB'),
+                    pygame.image.tostring(actual, 'RGB'),
+                    "%s %s differs from its primitives" % (shape, color))
+
+    @mock.patch.dict("memorypuzzle._ICON_SURFACES", clear=True)
+    def test_draw_icon_procedural(self):
+        shape, color = ALL_ICONS[len(ICONS)]
+        expected = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        expected.fill(BGCOLOR)
+        left, top = LEFT_TOP_COORDS_OF_TEST_BOX
+        memorypuzzle.render_icon(expected, shape, color, left, top)
+        actual = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        actual.fill(BGCOLOR)
+        memorypuzzle.draw_icon(SurfaceBackend(actual), shape, color,
+                               TEST_BOX, TEST_GRID)
+        self.assertEqual(
+            pygame.image.tostring(expected, 'RGB'),
+            pygame.image.tostring(actual, 'RGB'))
+        self.assertEqual(color, tuple(actual.get_at(
+            (left + HALF_BOXSIZE, top + HALF_BOXSIZE)))[:3])
+        self.assertEqual(
+            [(shape, color, BOXSIZE)], list(memorypuzzle._ICON_SURFACES))
+
+    @mock.patch.dict("memorypuzzle._ICON_SURFACES", clear=True)
+    @mock.patch("memorypuzzle.ICON_CACHE_SIZE", 4)
+    def test_get_icon_surface_evicts(self):
+        first = memorypuzzle.get_icon_surface(*ALL_ICONS[-1])
+        for shape, color in ALL_ICONS[-5:-1]:
+            memorypuzzle.get_icon_surface(shape, color)
+        self.assertEqual(4, len(memorypuzzle._ICON_SURFACES))
+        self.assertFalse(
+            first is memorypuzzle.get_icon_surface(*ALL_ICONS[-1]))
 
     @mock.patch('memorypuzzle.draw_board', MagicMock())
     def test_game_won(self):
         display_surface = MagicMock()
-        pygame.time = MagicMock()
-        pygame.display = MagicMock()
-        covered_boxes = memorypuzzle.generate_revealed_boxes_data(
-            True,
-            TEST_GRID)
-        display_update_expected = [mock.call() for _ in range(10)]
         flash_colors = [LIGHTBGCOLOR, BGCOLOR]
         display_surface_fill_expected = [
             mock.call(flash_colors[count % 2]) for count in range(10)]
-        time_wait_expected = [mock.call(GAME_WON_FLASH_WAIT) for _ in range(10)]
-        time_wait_expected.append(mock.call(GAME_END_WAIT))
         draw_board_called = [
-            mock.call(display_surface, TEST_BOARD, covered_boxes, TEST_GRID)
-            for _ in range(10)]
-        memorypuzzle.game_won(display_surface, TEST_BOARD, TEST_GRID)
+            mock.call(display_surface, TEST_BOARD, mock.ANY, TEST_GRID,
+                      flash_colors[count % 2])
+            for count in range(10)]
+        animations = memorypuzzle.game_won(
+            display_surface,
+            TEST_BOARD,
+            TEST_GRID,
+            100)
+        self.assertEqual(
+            [100 + count * GAME_WON_FLASH_WAIT for count in range(11)],
+            [animation.start for animation in animations])
         self.assertEqual(
-            pygame.display.update.call_args_list,
-            display_update_expected)
+            100 + 10 * GAME_WON_FLASH_WAIT + GAME_END_WAIT,
+            end_time(animations))
+        scheduler = Scheduler()
+        scheduler.add(*animations)
+        for count in range(10):
+            self.assertEqual(
+                [display_surface.get_rect.return_value],
+                scheduler.update(100 + count * GAME_WON_FLASH_WAIT))
         self.assertEqual(display_surface.fill.call_args_list,
                          display_surface_fill_expected)
-        self.assertEqual(pygame.time.wait.call_args_list,
-                         time_wait_expected)
         self.assertEqual(
             memorypuzzle.draw_board.call_args_list,
             draw_board_called)
+        is_revealed = memorypuzzle.draw_board.call_args[0][2]
+        self.assertTrue(all(is_revealed((x_value, y_value))
+                            for x_value in range(TEST_GRID[1])
+                            for y_value in range(TEST_GRID[0])))
 
     @mock.patch('memorypuzzle.draw_box_covers', MagicMock())
     def test_cover_boxes_animation(self):
         display_surface = MagicMock()
-        fps_clock = MagicMock()
-        expected_box_covers = [
-            mock.call(
-                display_surface,
-                fps_clock,
-                TEST_BOARD,
-                [TEST_BOX],
-                coverage,
-                TEST_GRID)
-            for coverage in range(0, BOXSIZE + REVEALSPEED, REVEALSPEED)]
-
-        memorypuzzle.cover_boxes_animation(
+        done = MagicMock()
+        animation = memorypuzzle.cover_boxes_animation(
             display_surface,
-            fps_clock,
             TEST_BOARD,
             [TEST_BOX],
-            TEST_GRID)
-        self.assertEquals(
+            TEST_GRID,
+            100,
+            done)
+        self.assertEqual(100, animation.start)
+        self.assertEqual(REVEAL_DURATION, animation.duration)
+        self.assertTrue(animation.done is done)
+        for progress in (0.0, 0.5, 1.0):
+            animation.step(progress)
+        self.assertEqual(
             memorypuzzle.draw_box_covers.call_args_list,
-            expected_box_covers)
+            [mock.call(display_surface, TEST_BOARD, [TEST_BOX], coverage,
+                       TEST_GRID)
+             for coverage in (0, HALF_BOXSIZE, BOXSIZE)])
 
     def test_get_shape_and_color(self):
         self.assertEqual(
@@ -264,31 +453,28 @@ class TestGame(unittest.TestCase):
     @mock.patch("memorypuzzle.draw_box_covers", MagicMock())
     def test_reveal_boxes_animation(self):
         display_surface = MagicMock()
-        fps_clock = MagicMock()
-        expected_draw_box_covers = [
-            mock.call(
-                display_surface,
-                fps_clock,
-                TEST_BOARD,
-                [TEST_BOX],
-                coverage,
-                TEST_GRID)
-            for coverage in range(BOXSIZE, -1, -REVEALSPEED)]
-        memorypuzzle.reveal_boxes_animation(
+        animation = memorypuzzle.reveal_boxes_animation(
             display_surface,
-            fps_clock,
             TEST_BOARD,
             [TEST_BOX],
-            TEST_GRID)
+            TEST_GRID,
+            100)
+        self.assertEqual(100, animation.start)
+        self.assertEqual(REVEAL_DURATION, animation.duration)
+        for progress in (0.0, 0.5, 1.0):
+            animation.step(progress)
         self.assertEqual(
-            expected_draw_box_covers,
-            memorypuzzle.draw_box_covers.call_args_list)
+            memorypuzzle.draw_box_covers.call_args_list,
+            [mock.call(display_surface, TEST_BOARD, [TEST_BOX], coverage,
+                       TEST_GRID)
+             for coverage in (BOXSIZE, HALF_BOXSIZE, 0)])
 
     def test_draw_highlight_box(self):
         display_surface = MagicMock()
         left, top = LEFT_TOP_COORDS_OF_TEST_BOX
         pygame.draw = MagicMock()
-        memorypuzzle.draw_highlight_box(display_surface, TEST_BOX, TEST_GRID)
+        memorypuzzle.draw_highlight_box(SurfaceBackend(display_surface),
+                                        TEST_BOX, TEST_GRID)
         pygame.draw.rect.assert_called_once_with(
             display_surface,
             HIGHLIGHTCOLOR,
@@ -312,9 +498,77 @@ class TestGame(unittest.TestCase):
             (True, (100, 100)),
             memorypuzzle.get_mouse_click())
 
+    def test_get_mouse_click_waits(self):
+        pygame.event = MagicMock()
+        pygame.time = MagicMock()
+        pygame.time.get_ticks.side_effect = [100, 350]
+        pygame.event.get.side_effect = [[], []]
+        pygame.event.wait.return_value.type = MOUSEBUTTONUP
+        pygame.event.wait.return_value.pos = (100, 100)
+        idle_ms = memorypuzzle.IDLE_STATS['idle_ms']
+        self.assertEqual(
+            (True, (100, 100)),
+            memorypuzzle.get_mouse_click(500))
+        pygame.event.wait.assert_called_once_with(500)
+        self.assertEqual(idle_ms + 250, memorypuzzle.IDLE_STATS['idle_ms'])
+
+    def test_get_mouse_click_wait_timeout(self):
+        pygame.event = MagicMock()
+        pygame.time = MagicMock()
+        pygame.time.get_ticks.return_value = 0
+        pygame.event.get.return_value = []
+        pygame.event.wait.return_value.type = NOEVENT
+        self.assertEqual((False, (0, 0)), memorypuzzle.get_mouse_click(10))
+        pygame.event.get.assert_called_once_with()
+
+    def test_get_mouse_click_polls(self):
+        pygame.event = MagicMock()
+        pygame.event.get.return_value = []
+        self.assertEqual((False, (0, 0)), memorypuzzle.get_mouse_click())
+        self.assertFalse(pygame.event.wait.called)
+
+    def click_latency(self, wait=None, timeout=None):
+        """Latency of a real click, without the time it was posted at."""
+        frame_profiler = FrameProfiler()
+        frame_profiler.enable()
+        pygame.event = MagicMock()
+        pygame.event.get.return_value = []
+        with mock.patch.object(memorypuzzle, 'PROFILER', frame_profiler):
+            memorypuzzle.get_mouse_click()
+            click = MagicMock(type=MOUSEBUTTONUP, pos=(100, 100),
+                              posted=None)
+            if wait:
+                pygame.event.wait.side_effect = lambda timeout: (
+                    time.sleep(wait) or click)
+            else:
+                time.sleep(0.05)
+                pygame.event.get.return_value = [click]
+            self.assertEqual((True, (100, 100)),
+                             memorypuzzle.get_mouse_click(timeout))
+            frame_profiler.input_shown('click')
+            frame_profiler.end_frame()
+        return frame_profiler.samples[LATENCY + 'click'][0]
+
+    def test_get_mouse_click_queued_latency(self):
+        # Counts the time the click queued before it was polled.
+        self.assertTrue(self.click_latency() >= 50)
+
+    def test_get_mouse_click_waited_latency(self):
+        # Does not count the time waiting for the click.
+        self.assertTrue(self.click_latency(wait=0.05, timeout=500) < 50)
+
+    @mock.patch.dict("memorypuzzle.IDLE_STATS", {'idle_ms': 750})
+    def test_idle_ratio(self):
+        pygame.time = MagicMock()
+        pygame.time.get_ticks.return_value = 1000
+        self.assertEqual(0.75, memorypuzzle.idle_ratio())
+        pygame.time.get_ticks.return_value = 0
+        self.assertEqual(0.0, memorypuzzle.idle_ratio())
+
     @mock.patch("memorypuzzle.draw_icon", MagicMock())
     def test_draw_board(self):
         display_surface = MagicMock()
+        backend = SurfaceBackend(display_surface)
         pygame.draw = MagicMock()
         rows, cols = TEST_GRID
         revealed_boxes = memorypuzzle.generate_revealed_boxes_data(
@@ -328,20 +582,20 @@ class TestGame(unittest.TestCase):
                 3)
             for _ in range(rows * cols)]
         memorypuzzle.draw_board(
-            display_surface,
+            backend,
             TEST_BOARD,
-            revealed_boxes,
+            memorypuzzle.revealed_lookup(revealed_boxes),
             TEST_GRID)
         self.assertEqual(expected_pygame_draw, pygame.draw.rect.call_args_list)
         revealed_boxes[0][0] = True
         expected_pygame_draw.pop(0)
         pygame.draw.rect.reset_mock()
         expected_draw_icon = [
-            mock.call(display_surface, LINES, ORANGE, TEST_BOX, TEST_GRID)]
+            mock.call(backend, LINES, ORANGE, TEST_BOX, TEST_GRID)]
         memorypuzzle.draw_board(
-            display_surface,
+            backend,
             TEST_BOARD,
-            revealed_boxes,
+            memorypuzzle.revealed_lookup(revealed_boxes),
             TEST_GRID)
         self.assertEqual(
             len(expected_pygame_draw),
@@ -350,6 +604,137 @@ class TestGame(unittest.TestCase):
             expected_draw_icon,
             memorypuzzle.draw_icon.call_args_list)
 
+    @mock.patch.dict("memorypuzzle._VIEWPORTS", clear=True)
+    @mock.patch("memorypuzzle.draw_box", MagicMock())
+    def test_draw_board_culls(self):
+        display_surface = MagicMock()
+        small_grid, huge_grid = (10, 10), (200, 200)
+        for grid in (small_grid, huge_grid):
+            memorypuzzle.draw_board(display_surface, None, None, grid)
+        small_count, huge_count = (
+            len([call for call in memorypuzzle.draw_box.call_args_list
+                 if call[0][4] == grid])
+            for grid in (small_grid, huge_grid))
+        self.assertEqual(100, small_count)
+        self.assertTrue(huge_count < 200)
+        x_range, y_range = memorypuzzle.get_viewport(
+            huge_grid).visible_ranges()
+        self.assertEqual(len(x_range) * len(y_range), huge_count)
+
+    @mock.patch.dict("memorypuzzle._VIEWPORTS", clear=True)
+    @mock.patch.dict("memorypuzzle._BOARD_TILES", clear=True)
+    @mock.patch.dict("memorypuzzle.RENDER_SETTINGS")
+    def test_draw_board_surfarray(self):
+        for grid, icons in ((TEST_GRID, ICONS), ((40, 40), ALL_ICONS[:100])):
+            game_rows, game_cols = grid
+            board = [[icons[(x_value * game_rows + y_value) % len(icons)]
+                      for y_value in range(game_rows)]
+                     for x_value in range(game_cols)]
+            revealed = [[(x_value + 2 * y_value) % 3 != 0
+                         for y_value in range(game_rows)]
+                        for x_value in range(game_cols)]
+            viewport = memorypuzzle.get_viewport(grid)
+            for zoom_steps in range(-3, 3):
+                viewport.reset()
+                viewport.zoom_at(zoom_steps, (0, 0))
+                viewport.pan(17, -13)
+                drawn = []
+                for renderer in memorypuzzle.BOARD_RENDERERS:
+                    memorypuzzle.RENDER_SETTINGS['board_renderer'] = renderer
+                    surface = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+                    surface.fill(LIGHTBGCOLOR)
+                    memorypuzzle.draw_board(
+                        SurfaceBackend(surface), board,
+                        memorypuzzle.revealed_lookup(revealed), grid,
+                        LIGHTBGCOLOR)
+                    drawn.append(pygame.image.tostring(surface, 'RGB'))
+                self.assertEqual(
+                    drawn[0], drawn[1],
+                    "%s at zoom %s differs" % (grid, viewport.zoom))
+
+    @mock.patch.dict("memorypuzzle._VIEWPORTS", clear=True)
+    @mock.patch.dict("memorypuzzle.RENDER_SETTINGS")
+    def test_draw_board_surfarray_fallback(self):
+        # Surfaces of other than 32 bits per pixel are drawn box by box.
+        revealed = memorypuzzle.generate_revealed_boxes_data(True, TEST_GRID)
+        for depth in (16, 24):
+            drawn = []
+            for renderer in memorypuzzle.BOARD_RENDERERS:
+                memorypuzzle.RENDER_SETTINGS['board_renderer'] = renderer
+                surface = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT), 0,
+                                         depth)
+                surface.fill(LIGHTBGCOLOR)
+                memorypuzzle.draw_board(
+                    SurfaceBackend(surface), TEST_BOARD,
+                    memorypuzzle.revealed_lookup(revealed), TEST_GRID,
+                    LIGHTBGCOLOR)
+                drawn.append(pygame.image.tostring(surface, 'RGB'))
+            self.assertEqual(drawn[0], drawn[1], "%d bits differ" % depth)
+
+    @mock.patch.dict("memorypuzzle._VIEWPORTS", clear=True)
+    def test_zoomed_geometry(self):
+        viewport = memorypuzzle.get_viewport(TEST_GRID)
+        viewport.zoom_at(1, (WINDOWWIDTH // 2, WINDOWHEIGHT // 2))
+        self.assertEqual(
+            (True, TEST_BOX),
+            memorypuzzle.get_box_under_mouse(
+                memorypuzzle.left_top_coords_of_box(TEST_BOX, TEST_GRID),
+                TEST_GRID))
+        left, top, width, height = memorypuzzle.highlight_rect(
+            TEST_BOX, TEST_GRID)
+        self.assertEqual(viewport.box_size + 2 * viewport.scale(5), width)
+        atlas, icon_rects = memorypuzzle.get_icon_atlas(viewport.box_size)
+        self.assertEqual(
+            (viewport.box_size, viewport.box_size),
+            icon_rects[(DONUT, RED)].size)
+        self.assertEqual(
+            (viewport.box_size, viewport.box_size),
+            memorypuzzle.get_icon_surface(*ALL_ICONS[-1],
+                                          viewport.box_size).get_size())
+
+    def test_get_mouse_click_viewport(self):
+        pygame.event = MagicMock()
+        viewport = MagicMock()
+        pan_event = MagicMock(type=pygame.KEYDOWN, key=pygame.K_LEFT)
+        zoom_event = MagicMock(type=pygame.MOUSEWHEEL, y=1)
+        right_click = MagicMock(type=MOUSEBUTTONUP, button=3, pos=(1, 2))
+        pygame.event.get.return_value = [pan_event, zoom_event, right_click]
+        with mock.patch('pygame.mouse.get_pos', return_value=(3, 4)):
+            self.assertEqual(
+                (False, (0, 0)),
+                memorypuzzle.get_mouse_click(None, viewport))
+        viewport.pan.assert_called_once_with(*memorypuzzle.PAN_KEYS[
+            pygame.K_LEFT])
+        viewport.zoom_at.assert_called_once_with(1, (3, 4))
+
+    @mock.patch("memorypuzzle.draw_icon", MagicMock())
+    def test_redraw_box(self):
+        display_surface = MagicMock()
+        pygame.draw = MagicMock()
+        left, top = LEFT_TOP_COORDS_OF_TEST_BOX
+        highlight = (left - 5, top - 5, BOXSIZE + 10, BOXSIZE + 10)
+        revealed_boxes = memorypuzzle.generate_revealed_boxes_data(
+            False,
+            TEST_GRID)
+        self.assertEqual(
+            highlight,
+            memorypuzzle.highlight_rect(TEST_BOX, TEST_GRID))
+        self.assertEqual(
+            highlight,
+            memorypuzzle.redraw_box(
+                SurfaceBackend(display_surface),
+                TEST_BOARD,
+                memorypuzzle.revealed_lookup(revealed_boxes),
+                TEST_BOX,
+                TEST_GRID))
+        display_surface.fill.assert_called_once_with(BGCOLOR, highlight)
+        pygame.draw.rect.assert_called_once_with(
+            display_surface,
+            BOXCOLOR,
+            (left, top, BOXSIZE, BOXSIZE),
+            3)
+        self.assertFalse(memorypuzzle.draw_icon.called)
+
     def test_generate_revealed_boxes_data(self):
         table = memorypuzzle.generate_revealed_boxes_data(True, TEST_GRID)
         self.assertTrue(all(all(rows) for rows in table))
@@ -358,54 +743,167 @@ class TestGame(unittest.TestCase):
     @mock.patch("memorypuzzle.reveal_boxes_animation", MagicMock())
     @mock.patch("memorypuzzle.cover_boxes_animation", MagicMock())
     def test_start_game_animation(self):
-        display_surface = MagicMock()
-        fps_clock = MagicMock()
-        covered_boxes = memorypuzzle.generate_revealed_boxes_data(
-            False,
-            TEST_GRID)
+        backend = MagicMock()
         expected_revealed_boxes_animation = [
-            mock.call(display_surface, fps_clock, TEST_BOARD, mock.ANY,
-                      TEST_GRID)
-            for _ in range(3)]
+            mock.call(backend, TEST_BOARD, mock.ANY, TEST_GRID,
+                      100 + count * 2 * REVEAL_DURATION)
+            for count in range(3)]
         expected_cover_boxes_animation = [
-            mock.call(display_surface, fps_clock, TEST_BOARD, mock.ANY,
-                      TEST_GRID)
-            for _ in range(3)]
-        memorypuzzle.start_game_animation(
-            display_surface,
-            fps_clock,
+            mock.call(backend, TEST_BOARD, mock.ANY, TEST_GRID,
+                      100 + (count * 2 + 1) * REVEAL_DURATION, mock.ANY)
+            for count in range(3)]
+        animations = memorypuzzle.start_game_animation(
+            backend,
             TEST_BOARD,
-            TEST_GRID)
+            TEST_GRID,
+            100)
+        self.assertEqual(6, len(animations))
         self.assertEqual(
-            [mock.call(display_surface, TEST_BOARD, covered_boxes, TEST_GRID)],
+            [mock.call(backend, TEST_BOARD, mock.ANY, TEST_GRID)],
             memorypuzzle.draw_board.call_args_list)
+        is_revealed = memorypuzzle.draw_board.call_args[0][2]
+        self.assertFalse(any(is_revealed((x_value, y_value))
+                             for x_value in range(TEST_GRID[1])
+                             for y_value in range(TEST_GRID[0])))
+        backend.present.assert_called_once_with()
         self.assertEqual(
             expected_revealed_boxes_animation,
             memorypuzzle.reveal_boxes_animation.call_args_list)
         self.assertEqual(
             expected_cover_boxes_animation,
             memorypuzzle.cover_boxes_animation.call_args_list)
+        boxes = [box
+                 for call in memorypuzzle.reveal_boxes_animation.call_args_list
+                 for box in call[0][2]]
+        self.assertEqual(EASY_GAME_ROWS * EASY_GAME_COLS, len(set(boxes)))
 
     @mock.patch("memorypuzzle.get_mouse_click", MagicMock())
+    @mock.patch("memorypuzzle.get_welcome_screen", MagicMock())
     def test_game_level(self):
-        display_surface = MagicMock()
+        backend = MagicMock()
         fps_clock = MagicMock()
         pygame.Rect = MagicMock()
-        pygame.font = MagicMock()
         memorypuzzle.get_mouse_click.return_value = (True, mock.ANY)
         pygame.Rect(EASY_RECT).collidepoint.return_value = True
         self.assertEqual(
             (EASY_GAME_ROWS, EASY_GAME_COLS),
-            memorypuzzle.get_game_level(display_surface, fps_clock))
-        memorypuzzle.get_mouse_click.assert_called_once_with()
+            memorypuzzle.get_game_level(backend, fps_clock))
+        memorypuzzle.get_mouse_click.assert_called_once_with(
+            0, None, memorypuzzle.PYGAME_INPUT)
+        memorypuzzle.get_welcome_screen.assert_called_once_with(
+            backend.get_size())
+        backend.draw_tile.assert_called_once_with(
+            memorypuzzle.get_welcome_screen.return_value, (0, 0))
+        backend.present.assert_called_once_with()
+
+    @mock.patch.dict("memorypuzzle._WELCOME_SCREENS", clear=True)
+    def test_get_welcome_screen(self):
+        pygame.font.init()
+        size = (WINDOWWIDTH, WINDOWHEIGHT)
+        welcome_screen = memorypuzzle.get_welcome_screen(size)
+        self.assertEqual(size, welcome_screen.get_size())
+        self.assertEqual(BGCOLOR, tuple(welcome_screen.get_at((0, 0)))[:3])
+        self.assertEqual(
+            CYAN,
+            tuple(welcome_screen.get_at(pygame.Rect(EASY_RECT).topleft))[:3])
+        self.assertTrue(
+            welcome_screen is memorypuzzle.get_welcome_screen(size))
+
+    @mock.patch.dict("memorypuzzle._FONTS", clear=True)
+    @mock.patch.dict("memorypuzzle._TEXT_SURFACES", clear=True)
+    def test_render_text(self):
+        pygame.font = MagicMock()
+        text_surface = memorypuzzle.render_text("Easy", 10, IVORY)
+        self.assertTrue(
+            text_surface is memorypuzzle.render_text("Easy", 10, IVORY))
+        pygame.font.Font.assert_called_once_with(None, 10)
+        pygame.font.Font.return_value.render.assert_called_once_with(
+            "Easy", True, IVORY)
+        for count in range(memorypuzzle.TEXT_CACHE_SIZE):
+            memorypuzzle.render_text(str(count), 10, IVORY)
+        self.assertEqual(
+            memorypuzzle.TEXT_CACHE_SIZE,
+            len(memorypuzzle._TEXT_SURFACES))
+        self.assertFalse(
+            ("Easy", 10, IVORY) in memorypuzzle._TEXT_SURFACES)
 
     @mock.patch("memorypuzzle.game_loop", MagicMock())
     @mock.patch(
-        "memorypuzzle.get_game_clock_display",
+        "memorypuzzle.get_game_clock_backend",
         MagicMock(return_value=(mock.ANY, mock.ANY)))
-    def test_main(self):
+    @mock.patch("leaderboard.Leaderboard")
+    @mock.patch("memorypuzzle.Audio")
+    def test_main(self, audio_class, leaderboard_class):
+        leaderboard = leaderboard_class.return_value
+        audio = audio_class.return_value
+        memorypuzzle.main()
+        memorypuzzle.get_game_clock_backend.assert_called_with(
+            'surface', False)
+        fps, clock = memorypuzzle.get_game_clock_backend()
+        memorypuzzle.game_loop.assert_called_with(
+            fps, clock, game_grid=None, leaderboard=leaderboard, audio=audio)
+        leaderboard_class.assert_called_with(LEADERBOARD_PATH)
+        leaderboard.close.assert_called_once_with()
+        audio_class.assert_called_with(None, None)
+        audio.start.assert_called_once_with()
+        audio.close.assert_called_once_with()
+        memorypuzzle.main(['--grid', '40x40', '--leaderboard', 'scores.db'])
+        memorypuzzle.game_loop.assert_called_with(
+            fps, clock, game_grid=(40, 40), leaderboard=leaderboard,
+            audio=audio)
+        leaderboard_class.assert_called_with('scores.db')
+        memorypuzzle.main(['--leaderboard', ''])
+        memorypuzzle.game_loop.assert_called_with(
+            fps, clock, game_grid=None, leaderboard=None, audio=audio)
+        audio.reset_mock()
+        memorypuzzle.main(['--mute', '--sounds', 'sounds',
+                           '--music', 'music.ogg'])
+        audio_class.assert_called_with('sounds', 'music.ogg')
+        self.assertFalse(audio.start.called)
+        audio.close.assert_called_once_with()
+        self.assertEqual(
+            'draw', memorypuzzle.RENDER_SETTINGS['board_renderer'])
+        memorypuzzle.main(['--backend', 'texture', '--vsync'])
+        memorypuzzle.get_game_clock_backend.assert_called_with(
+            'texture', True)
+        memorypuzzle.main(['--renderer', 'surfarray'])
+        self.assertEqual(
+            'surfarray', memorypuzzle.RENDER_SETTINGS['board_renderer'])
+        memorypuzzle.main(['--benchmark'])
+        self.assertEqual(
+            {'board_renderer': 'draw', 'frame_cap': 0, 'benchmark': True},
+            memorypuzzle.RENDER_SETTINGS)
+        memorypuzzle.main(['--fps', '144'])
+        self.assertEqual(
+            {'board_renderer': 'draw', 'frame_cap': 144, 'benchmark': False},
+            memorypuzzle.RENDER_SETTINGS)
         memorypuzzle.main()
-        fps, clock = memorypuzzle.get_game_clock_display()
-        memorypuzzle.game_loop.assert_called_with(fps, clock)
+        memorypuzzle.game_loop.reset_mock()
+        with mock.patch("memorypuzzle.draw_welcome_screen") as draw:
+            memorypuzzle.main(['--first-frame'])
+        draw.assert_called_once_with(clock)
+        self.assertFalse(memorypuzzle.game_loop.called)
+        self.assertEqual(8, leaderboard_class.call_count)
+
+    def test_game_result(self):
+        leaderboard = MagicMock()
+        leaderboard.best.return_value = None
+        self.assertEqual(
+            "won in 1:05 with 12 moves, score 850",
+            memorypuzzle.game_result(leaderboard, (4, 5), 12, 65000))
+        leaderboard.save.assert_called_once_with((4, 5), 12, 65000, 850)
+        leaderboard.best.return_value = 900
+        self.assertEqual(
+            "won in 0:30 with 10 moves, score 940, best 940",
+            memorypuzzle.game_result(leaderboard, (4, 5), 10, 30000))
+        self.assertEqual(
+            "won in 0:30 with 10 moves, score 940",
+            memorypuzzle.game_result(None, (4, 5), 10, 30000))
+
+    def test_parse_grid(self):
+        self.assertEqual((4, 5), memorypuzzle.parse_grid('4x5'))
+        for text in ('4', '4x5x6', 'ax5', '3x3', '0x4', '100x100'):
+            self.assertRaises(
+                argparse.ArgumentTypeError, memorypuzzle.parse_grid, text)
 
 
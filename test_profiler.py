@@ -0,0 +1,126 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+
+import profiler
+
+
+class TestFrameProfiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = profiler.FrameProfiler(window=100)
+
+    def test_disabled(self):
+        with self.profiler.phase('draw'):
+            pass
+        with self.profiler.idle('idle'):
+            pass
+        self.profiler.end_frame()
+        self.assertEqual({}, self.profiler.samples)
+
+    def test_phase(self):
+        self.profiler.enable()
+        with self.profiler.phase('draw'):
+            pass
+        self.profiler.end_frame()
+        self.assertEqual(1, len(self.profiler.samples['draw']))
+        self.assertEqual(1, len(self.profiler.samples[profiler.FRAME]))
+
+    @mock.patch('profiler.time.perf_counter')
+    def test_busy(self, perf_counter):
+        perf_counter.side_effect = [1.0, 1.002, 1.004, 1.010, 1.011, 1.020,
+                                    1.030, 1.040]
+        self.profiler.enable()
+        with self.profiler.phase('draw'):
+            pass
+        with self.profiler.idle('idle'):
+            pass
+        with self.profiler.idle('tick'):
+            pass
+        self.profiler.end_frame()
+        frame, = self.profiler.samples[profiler.FRAME]
+        busy, = self.profiler.samples[profiler.BUSY]
+        self.assertAlmostEqual(40, frame)
+        self.assertAlmostEqual(29, busy)
+        self.assertEqual(1, len(self.profiler.samples['tick']))
+        self.assertEqual(0.0, self.profiler.frame_idle)
+
+    def test_rolling_window(self):
+        self.profiler.enable()
+        for _ in range(150):
+            self.profiler.end_frame()
+        self.assertEqual(100, len(self.profiler.samples[profiler.FRAME]))
+
+    def test_percentiles(self):
+        self.profiler.phase_samples('draw').extend(range(100, 0, -1))
+        self.assertEqual({'p50': 50, 'p95': 95, 'p99': 99},
+                         self.profiler.percentiles('draw'))
+        self.assertEqual({'p50': 0.0, 'p95': 0.0, 'p99': 0.0},
+                         self.profiler.percentiles('present'))
+
+    def test_histogram(self):
+        self.profiler.phase_samples('draw').extend([0.05, 0.1, 3, 1000])
+        histogram = self.profiler.histogram('draw')
+        self.assertEqual(len(profiler.HISTOGRAM_BOUNDS) + 1, len(histogram))
+        self.assertEqual(2, histogram[0])
+        self.assertEqual(1, histogram[profiler.HISTOGRAM_BOUNDS.index(4)])
+        self.assertEqual(1, histogram[-1])
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.profiler.phase_samples('draw').extend([1, 2, 3])
+        path_prefix = os.path.join(directory, 'profile')
+        self.profiler.dump(path_prefix)
+        with open(path_prefix + '.json') as json_file:
+            report = json.load(json_file)
+        self.assertEqual(3, report['phases']['draw']['count'])
+        self.assertEqual(2, report['phases']['draw']['p50'])
+        with open(path_prefix + '.csv') as csv_file:
+            rows = list(csv.reader(csv_file))
+        self.assertEqual(['phase', 'count', 'p50', 'p95', 'p99'], rows[0][:5])
+        self.assertEqual(['draw', '3'], rows[1][:2])
+
+    def test_input_latency(self):
+        self.profiler.enable()
+        event = mock.Mock(posted=time.perf_counter() - 0.05)
+        self.profiler.input('click', event)
+        self.profiler.input('click', mock.Mock(posted=None))
+        self.profiler.input('hover', mock.Mock(posted=None))
+        self.profiler.input_shown('click')
+        self.profiler.end_frame()
+        latencies = self.profiler.samples[profiler.LATENCY + 'click']
+        self.assertEqual(1, len(latencies))
+        self.assertTrue(latencies[0] >= 50, latencies)
+        self.assertFalse(profiler.LATENCY + 'hover' in self.profiler.samples)
+        self.profiler.input_shown('click')
+        self.profiler.end_frame()
+        self.assertEqual(1, len(latencies))
+
+    @mock.patch('profiler.time.perf_counter')
+    def test_events_read(self, perf_counter):
+        perf_counter.return_value = 10.0
+        self.profiler.enable()
+        self.assertEqual(10.0, self.profiler.events_read())
+        perf_counter.return_value = 10.25
+        self.assertEqual(10.0, self.profiler.events_read())
+        perf_counter.return_value = 11.0
+        self.assertEqual(11.0, self.profiler.events_read(waited=True))
+        self.profiler.input('click', mock.Mock(posted=None), 10.25)
+        self.profiler.input_shown('click')
+        perf_counter.return_value = 11.5
+        self.profiler.end_frame()
+        self.assertEqual([1250.0], list(
+            self.profiler.samples[profiler.LATENCY + 'click']))
+
+    def test_input_disabled(self):
+        self.assertEqual(None, self.profiler.events_read())
+        self.profiler.input('click', mock.Mock(posted=None))
+        self.profiler.input_shown('click')
+        self.assertEqual({}, self.profiler.inputs)
+        self.assertEqual(set(), self.profiler.shown)
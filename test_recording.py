@@ -0,0 +1,268 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import mock  # noqa: E402
+import pygame  # noqa: E402
+from pygame.constants import (  # noqa: E402
+    K_LEFT, KEYDOWN, MOUSEBUTTONDOWN, MOUSEBUTTONUP, MOUSEMOTION, MOUSEWHEEL,
+    NOEVENT, QUIT)
+
+import memorypuzzle  # noqa: E402
+import recording  # noqa: E402
+from constants import (  # noqa: E402
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    PIECE_CLOSE_WAIT,
+    REVEAL_DURATION,
+    WINDOWHEIGHT,
+    WINDOWWIDTH)
+from game_state import GameState, get_randomized_board  # noqa: E402
+from render_backends import SurfaceBackend  # noqa: E402
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+
+
+class ScriptedInput(object):
+    """Input clicking boxes in turn, every box by default, and then quitting,
+    on a fake clock. The first click is wait milliseconds late. With press,
+    the mouse button is pressed before every click releases it."""
+
+    def __init__(self, game_grid, boxes=None, wait=0, press=False):
+        self.now = 1000
+        self.script = []
+        click_time = self.now + wait
+        if boxes is None:
+            boxes = [(x_value, y_value) for x_value in range(game_grid[1])
+                     for y_value in range(game_grid[0])]
+        for box in boxes:
+            left, top = memorypuzzle.left_top_coords_of_box(box, game_grid)
+            click_time += 700
+            if press:
+                self.script.append((click_time - 100, pygame.event.Event(
+                    MOUSEBUTTONDOWN, pos=(left + 1, top + 1), button=1)))
+            self.script.append((click_time, pygame.event.Event(
+                MOUSEBUTTONUP, pos=(left + 1, top + 1), button=1)))
+        self.script.append((click_time + 5000, pygame.event.Event(QUIT)))
+
+    def get_ticks(self):
+        return self.now
+
+    def get(self):
+        self.now += 7
+        events = []
+        while self.script and self.script[0][0] <= self.now:
+            events.append(self.script.pop(0)[1])
+        return events
+
+    def wait(self, timeout):
+        if timeout == 0 or self.now + timeout >= self.script[0][0]:
+            self.now, event = self.script.pop(0)
+            return event
+        self.now += timeout
+        return pygame.event.Event(NOEVENT)
+
+    def get_pos(self):
+        return (0, 0)
+
+
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'session.rec')
+
+    def play(self, input_source, get_ticks, fps_clock, seed, game_grid,
+             audio=None, surface=None):
+        """Play a game, returning the outcomes of the selections.
+
+        The game is drawn on surface if given."""
+        outcomes = []
+        select = GameState.select
+
+        def recording_select(game, box):
+            outcome = select(game, box)
+            outcomes.append((box, outcome))
+            return outcome
+
+        pygame.display.init()
+        pygame.font.init()
+        random.seed(seed)
+        with mock.patch.object(GameState, 'select', recording_select):
+            try:
+                display = pygame.display.set_mode((1, 1))
+                memorypuzzle.game_loop(
+                    SurfaceBackend(surface or display),
+                    fps_clock, get_ticks,
+                    game_grid, input_source, audio=audio)
+            except (SystemExit, recording.EndOfRecording):
+                pass
+        return outcomes
+
+    def record(self, seed=7, press=False):
+        scripted_input = ScriptedInput(TEST_GRID, press=press)
+        recorder = recording.Recorder(
+            self.path, seed, TEST_GRID, scripted_input,
+            scripted_input.get_ticks)
+        try:
+            return self.play(recorder, recorder.get_ticks, mock.MagicMock(),
+                             seed, TEST_GRID)
+        finally:
+            recorder.close()
+
+    def test_event_codes(self):
+        events = [
+            pygame.event.Event(QUIT),
+            pygame.event.Event(KEYDOWN, key=K_LEFT),
+            pygame.event.Event(MOUSEMOTION, pos=(3, 4), rel=(-1, 2),
+                               buttons=(0, 0, 1)),
+            pygame.event.Event(MOUSEBUTTONUP, pos=(5, 6), button=3),
+            pygame.event.Event(MOUSEWHEEL, x=0, y=-1)]
+        for event in events:
+            decoded = recording.decode_event(*recording.encode_event(event))
+            self.assertEqual(event.type, decoded.type)
+            for name in ('key', 'pos', 'rel', 'button', 'y'):
+                if hasattr(event, name):
+                    self.assertEqual(tuple(getattr(event, name))
+                                     if name in ('pos', 'rel')
+                                     else getattr(event, name),
+                                     getattr(decoded, name))
+        self.assertEqual(
+            None,
+            recording.encode_event(pygame.event.Event(pygame.USEREVENT)))
+        self.assertEqual(MOUSEBUTTONDOWN, recording.decode_event(
+            recording.OTHER_CODE, (MOUSEBUTTONDOWN, 0, 0, 0, 0)).type)
+
+    def test_replay_is_identical(self):
+        recorded = self.record()
+        self.assertTrue(any(outcome != 'ignored' for _, outcome in recorded))
+        replayer = recording.Replayer(self.path, real_time=False)
+        self.assertEqual(7, replayer.seed)
+        self.assertEqual(TEST_GRID, replayer.game_grid)
+        replayed = self.play(replayer, replayer.get_ticks, replayer,
+                             replayer.seed, replayer.game_grid)
+        self.assertEqual(recorded, replayed)
+        self.assertTrue(replayer.finished())
+        pygame.quit()
+
+    def test_replay_button_presses(self):
+        # The game waits on the presses, which it does not use.
+        recorded = self.record(press=True)
+        replayer = recording.Replayer(self.path, real_time=False)
+        replayed = self.play(replayer, replayer.get_ticks, replayer,
+                             replayer.seed, replayer.game_grid)
+        self.assertEqual(recorded, replayed)
+        self.assertTrue(replayer.finished())
+        pygame.quit()
+
+    def test_benchmark_mode_plays_the_same(self):
+        recorded = self.record()
+        replayer = recording.Replayer(self.path, real_time=False)
+        with mock.patch.dict(memorypuzzle.RENDER_SETTINGS, benchmark=True,
+                             frame_cap=0):
+            scripted_input = ScriptedInput(TEST_GRID)
+            played = self.play(scripted_input, scripted_input.get_ticks,
+                               mock.MagicMock(), replayer.seed, TEST_GRID)
+        self.assertEqual(recorded, played)
+        pygame.quit()
+
+    def played_effects(self, boxes, wait=0, seed=7):
+        """Effects played clicking boxes, with the outcomes of the clicks."""
+        sounds = mock.MagicMock()
+        scripted_input = ScriptedInput(TEST_GRID, boxes, wait)
+        outcomes = self.play(scripted_input, scripted_input.get_ticks,
+                             mock.MagicMock(), seed, TEST_GRID, sounds)
+        pygame.quit()
+        return ([call[0][0] for call in sounds.play.call_args_list],
+                [outcome for _, outcome in outcomes if outcome != 'ignored'])
+
+    def test_sound_effects(self):
+        played, selected = self.played_effects(None)
+        self.assertTrue('mismatch' in selected)
+        self.assertEqual(len(selected), played.count('reveal'))
+        self.assertEqual(selected.count('mismatch'), played.count('mismatch'))
+        self.assertEqual(selected.count('mismatch'), played.count('cover'))
+
+        random.seed(7)
+        board = get_randomized_board(TEST_GRID)
+        pairs = {}
+        for x_value, column in enumerate(board):
+            for y_value, icon in enumerate(column):
+                pairs.setdefault(icon, []).append((x_value, y_value))
+        # The clicks wait for the opening animation.
+        played, selected = self.played_effects(
+            [box for pair in pairs.values() for box in pair], 10000)
+        self.assertEqual('won', selected[-1])
+        self.assertEqual(len(pairs) - 1, played.count('match'))
+        self.assertEqual(['reveal', 'win'], played[-2:])
+        self.assertFalse('cover' in played)
+
+    def test_click_as_mismatch_is_covered(self):
+        random.seed(7)
+        board = get_randomized_board(TEST_GRID)
+        first = (0, 0)
+        second, third = [(x_value, y_value)
+                         for x_value, column in enumerate(board)
+                         for y_value, icon in enumerate(column)
+                         if icon != board[0][0]][:2]
+        pygame.display.init()
+        expected = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+        expected.fill(memorypuzzle.THEME_COLORS['background'])
+        for box in (first, second):
+            memorypuzzle.draw_box(SurfaceBackend(expected), board,
+                                  lambda box: False, box, TEST_GRID)
+        # The third click lands around the end of the cover animation.
+        for delay in range(-10, 40, 2):
+            scripted_input = ScriptedInput(TEST_GRID, [first, second, third],
+                                           10000)
+            second_time = scripted_input.script[1][0]
+            scripted_input.script[2] = (
+                second_time + PIECE_CLOSE_WAIT + 2 * REVEAL_DURATION + delay,
+                scripted_input.script[2][1])
+            surface = pygame.Surface((WINDOWWIDTH, WINDOWHEIGHT))
+            outcomes = self.play(scripted_input, scripted_input.get_ticks,
+                                 mock.MagicMock(), 7, TEST_GRID,
+                                 surface=surface)
+            self.assertEqual('mismatch', outcomes[1][1])
+            for box in (first, second):
+                rect = memorypuzzle.highlight_rect(box, TEST_GRID)
+                self.assertEqual(
+                    pygame.image.tostring(expected.subsurface(rect), 'RGB'),
+                    pygame.image.tostring(surface.subsurface(rect), 'RGB'),
+                    "box %s drawn %d ms after the cover" % (box, delay))
+        pygame.quit()
+
+    def test_replay_session(self):
+        self.record()
+        replayer = memorypuzzle.replay_session(self.path, real_time=False)
+        self.assertTrue(replayer.finished())
+
+    def test_compact(self):
+        self.record()
+        seed, start, game_grid, reads = recording.read_recording(self.path)
+        self.assertTrue(os.path.getsize(self.path) < 4 * len(reads))
+
+    def test_divergence(self):
+        self.record()
+        replayer = recording.Replayer(self.path, real_time=False)
+        self.assertRaises(recording.ReplayDivergence, replayer.get_pos)
+
+    def test_truncated(self):
+        self.record()
+        seed, start, game_grid, reads = recording.read_recording(self.path)
+        with open(self.path, 'rb') as recording_file:
+            data = recording_file.read()
+        with open(self.path, 'wb') as recording_file:
+            recording_file.write(data[:len(data) * 2 // 3])
+        truncated = recording.read_recording(self.path)[3]
+        self.assertTrue(len(truncated) < len(reads))
+        self.assertEqual(reads[:len(truncated)], truncated)
+        replayer = recording.Replayer(self.path, real_time=False)
+        for kind, _, _ in truncated:
+            replayer.replay(kind)
+        self.assertRaises(recording.EndOfRecording, replayer.get)
@@ -0,0 +1,144 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import mock  # noqa: E402
+import pygame  # noqa: E402
+
+import memorypuzzle  # noqa: E402
+import render_backends  # noqa: E402
+from colors import BGCOLOR, BOXCOLOR, LIGHTBGCOLOR  # noqa: E402
+from constants import WINDOWHEIGHT, WINDOWWIDTH  # noqa: E402
+from icons import ICONS  # noqa: E402
+
+
+SIZE = (WINDOWWIDTH, WINDOWHEIGHT)
+
+
+def tiled_board(game_grid):
+    game_rows, game_cols = game_grid
+    return [[ICONS[(x_value * game_rows + y_value) % len(ICONS)]
+             for y_value in range(game_rows)]
+            for x_value in range(game_cols)]
+
+
+class TestRenderBackends(unittest.TestCase):
+    def setUp(self):
+        pygame.display.init()
+        self.addCleanup(pygame.display.quit)
+        patcher = mock.patch.dict('memorypuzzle._VIEWPORTS', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_outline_rects(self):
+        for width in range(0, 6):
+            for rect in ((7, 9, 10, 11), (3, 4, 40, 40), (20, 20, 3, 4)):
+                expected = pygame.Surface((60, 60))
+                pygame.draw.rect(expected, BOXCOLOR, rect, width)
+                actual = pygame.Surface((60, 60))
+                for outline_rect in render_backends.outline_rects(rect, width):
+                    actual.fill(BOXCOLOR, outline_rect)
+                self.assertEqual(
+                    pygame.image.tostring(expected, 'RGB'),
+                    pygame.image.tostring(actual, 'RGB'),
+                    "%s %d wide differs" % (rect, width))
+
+    def draw_frame(self, backend, board, revealed, game_grid):
+        revealed = memorypuzzle.revealed_lookup(revealed)
+        backend.fill(LIGHTBGCOLOR)
+        memorypuzzle.draw_board(backend, board, revealed, game_grid)
+        memorypuzzle.draw_box_covers(
+            backend, board, [(0, 0), (1, 1)], 7, game_grid)
+        memorypuzzle.redraw_box(backend, board, revealed, (2, 1), game_grid)
+        memorypuzzle.draw_highlight_box(backend, (2, 2), game_grid)
+
+    def test_texture_backend_matches_surface(self):
+        texture_backend = render_backends.TextureBackend.open(
+            SIZE, "test", accelerated=0)
+        surface_backend = render_backends.SurfaceBackend(
+            pygame.Surface(SIZE))
+        game_grid = (4, 5)
+        board = tiled_board(game_grid)
+        revealed = [[(x_value + y_value) % 2 == 0
+                     for y_value in range(game_grid[0])]
+                    for x_value in range(game_grid[1])]
+        for backend in (surface_backend, texture_backend):
+            self.draw_frame(backend, board, revealed, game_grid)
+        texture_backend.present()
+        self.assertEqual(
+            pygame.image.tostring(surface_backend.surface, 'RGB'),
+            pygame.image.tostring(texture_backend.renderer.to_surface(),
+                                  'RGB'))
+        # Every surface drawn was uploaded once.
+        textures = len(texture_backend.textures)
+        self.draw_frame(texture_backend, board, revealed, game_grid)
+        self.assertEqual(textures, len(texture_backend.textures))
+
+    def test_texture_backend_zoomed(self):
+        # The smoothed edges of zoomed icons blend slightly differently.
+        texture_backend = render_backends.TextureBackend.open(
+            SIZE, "test", accelerated=0)
+        surface_backend = render_backends.SurfaceBackend(
+            pygame.Surface(SIZE))
+        game_grid = (4, 5)
+        board = tiled_board(game_grid)
+        revealed = [[True] * game_grid[0] for _ in range(game_grid[1])]
+        memorypuzzle.get_viewport(game_grid).zoom_at(1, (0, 0))
+        for backend in (surface_backend, texture_backend):
+            self.draw_frame(backend, board, revealed, game_grid)
+        self.assertTrue(max(
+            abs(expected - actual) for expected, actual in zip(
+                pygame.image.tostring(surface_backend.surface, 'RGB'),
+                pygame.image.tostring(texture_backend.renderer.to_surface(),
+                                      'RGB'))) <= 3)
+
+    def test_texture_backend_keeps_the_frame(self):
+        backend = render_backends.TextureBackend.open(
+            SIZE, "test", accelerated=0)
+        backend.fill(BGCOLOR)
+        backend.fill(BOXCOLOR, (10, 10, 5, 5))
+        backend.present()
+        backend.present([(0, 0, 1, 1)])
+        frame = backend.renderer.to_surface()
+        self.assertEqual(BOXCOLOR, tuple(frame.get_at((12, 12)))[:3])
+        self.assertEqual(BGCOLOR, tuple(frame.get_at((0, 0)))[:3])
+
+    def window_pixel(self, backend, position):
+        backend.renderer.target = None
+        pixel = tuple(backend.renderer.to_surface().get_at(position))[:3]
+        backend.renderer.target = backend.target
+        return pixel
+
+    def test_texture_backend_presents_dirty_rects(self):
+        backend = render_backends.TextureBackend.open(
+            SIZE, "test", accelerated=0)
+        self.assertTrue(backend.keeps_frame)
+        backend.fill(BGCOLOR)
+        backend.present([(0, 0, 1, 1)])
+        self.assertEqual(BGCOLOR, self.window_pixel(backend, (30, 30)))
+        backend.fill(BOXCOLOR, (10, 10, 5, 5))
+        backend.fill(BOXCOLOR, (30, 30, 5, 5))
+        backend.present([(8, 8, 10, 10)])
+        self.assertEqual(BOXCOLOR, self.window_pixel(backend, (12, 12)))
+        self.assertEqual(BGCOLOR, self.window_pixel(backend, (30, 30)))
+        whole = render_backends.TextureBackend(backend.renderer, SIZE)
+        whole.fill(BGCOLOR)
+        whole.fill(BOXCOLOR, (30, 30, 5, 5))
+        whole.present()
+        whole.fill(BGCOLOR, (30, 30, 5, 5))
+        whole.present([(0, 0, 1, 1)])
+        self.assertEqual(BGCOLOR, self.window_pixel(whole, (30, 30)))
+
+    def test_null_backend(self):
+        backend = render_backends.NullBackend(SIZE)
+        self.draw_frame(backend, tiled_board((4, 5)),
+                        [[True] * 4 for _ in range(5)], (4, 5))
+        backend.present()
+        self.assertEqual(1, backend.frames)
+        self.assertEqual(pygame.Rect((0, 0), SIZE), backend.get_rect())
+        self.assertEqual(None, backend.surface)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+import mock
+import numpy
+
+import surfarray_renderer
+
+
+class TestTileBank(unittest.TestCase):
+    def build(self, code):
+        return numpy.full((4, 4), code, numpy.uint32)
+
+    def test_lookup(self):
+        bank = surfarray_renderer.TileBank(4, 10)
+        build = mock.Mock(side_effect=self.build)
+        codes = numpy.array([[3, 5], [surfarray_renderer.COVER, 3]])
+        slots = bank.lookup(codes, build)
+        self.assertEqual(3, build.call_count)
+        self.assertEqual(codes.tolist(),
+                         bank.tiles[slots][:, :, 0, 0].tolist())
+        self.assertEqual(slots.tolist(), bank.lookup(codes, build).tolist())
+        self.assertEqual(3, build.call_count)
+
+    def test_capacity(self):
+        bank = surfarray_renderer.TileBank(4, 3)
+        build = mock.Mock(side_effect=self.build)
+        bank.lookup(numpy.array([1, 2, 3]), build)
+        slots = bank.lookup(numpy.array([4, 1]), build)
+        self.assertEqual(2, bank.count)
+        self.assertEqual(5, build.call_count)
+        self.assertEqual([4, 1], bank.tiles[slots][:, 0, 0].tolist())
+        self.assertEqual(-1, bank.slots[2])
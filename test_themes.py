@@ -0,0 +1,189 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import mock  # noqa: E402
+import pygame  # noqa: E402
+
+import export  # noqa: E402
+import memorypuzzle  # noqa: E402
+import themes  # noqa: E402
+from colors import BGCOLOR, BOXCOLOR  # noqa: E402
+from constants import BOXSIZE  # noqa: E402
+from icons import ALLCOLORS, ALLSHAPES  # noqa: E402
+from shapes import DONUT, OVAL, SQUARE  # noqa: E402
+
+NIGHT = {
+    'background': [20, 24, 48], 'flash': [90, 90, 140],
+    'box': [200, 200, 230], 'highlight': [255, 200, 0],
+    'palette': [[255, 90, 90], [90, 255, 90], [90, 90, 255], [255, 255, 90],
+                [255, 160, 60], [220, 90, 255], [90, 255, 255]],
+    'shapes': [OVAL, DONUT, 'polygon:6:0:filled', SQUARE, 'star:5:0:filled'],
+    'box_size': 80}
+
+
+class TestThemes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        pygame.display.init()
+        pygame.display.set_mode((1, 1))
+        self.addCleanup(pygame.display.quit)
+        self.addCleanup(memorypuzzle.set_theme)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write_pack(self, name, pack):
+        with open(self.path(name + '.json'), 'w') as pack_file:
+            json.dump(pack, pack_file)
+        return self.path(name + '.json')
+
+    def compile(self, name, pack):
+        return themes.compile_pack(self.write_pack(name, pack),
+                                   self.path(name + '.theme'))
+
+    def test_classic_pack(self):
+        theme = themes.load_theme(self.compile('classic', {}))
+        self.assertEqual('classic', theme.name)
+        self.assertEqual(memorypuzzle.CLASSIC_COLORS, theme.colors)
+        self.assertEqual(themes.ZOOM_BOX_SIZES, sorted(theme.atlases))
+        atlas, icon_rects = theme.atlases[BOXSIZE]
+        expected, expected_rects = memorypuzzle.build_icon_atlas()
+        self.assertEqual(expected_rects, icon_rects)
+        self.assertEqual(expected.get_masks(), atlas.get_masks())
+        self.assertEqual(pygame.image.tostring(expected, 'RGBA'),
+                         pygame.image.tostring(atlas, 'RGBA'))
+
+    def test_pages(self):
+        path = self.compile('classic', {})
+        with open(path, 'rb') as theme_file:
+            data = theme_file.read()
+        for index in range(len(themes.ZOOM_BOX_SIZES)):
+            box_size, offset = themes.ATLAS.unpack_from(
+                data, themes.HEADER.size + index * themes.ATLAS.size)
+            self.assertEqual(themes.ZOOM_BOX_SIZES[index], box_size)
+            self.assertEqual(0, offset % themes.PAGE_SIZE)
+
+    def test_night_pack(self):
+        theme = themes.load_theme(self.compile('night', NIGHT))
+        self.assertEqual((20, 24, 48), theme.colors['background'])
+        self.assertEqual((255, 200, 0), theme.colors['highlight'])
+        atlas, icon_rects = theme.atlases[80]
+        self.assertEqual((len(ALLSHAPES) * 80, len(ALLCOLORS) * 80),
+                         atlas.get_size())
+        # The classic icon at index 1, 0 is drawn as a donut in the first
+        # color of the palette, around a hole of the background color.
+        left, top = icon_rects[(ALLSHAPES[1], ALLCOLORS[0])].topleft
+        self.assertEqual((255, 90, 90, 255),
+                         tuple(atlas.get_at((left + 40, top + 10))))
+        self.assertEqual((20, 24, 48, 255),
+                         tuple(atlas.get_at((left + 40, top + 40))))
+        small, small_rects = theme.atlases[20]
+        self.assertEqual(pygame.Rect(20, 0, 20, 20),
+                         small_rects[(ALLSHAPES[1], ALLCOLORS[0])])
+
+    def test_read_pack_errors(self):
+        for pack in ([], {'box': [1, 2]}, {'highlight': 'red'},
+                     {'palette': [[1, 2, 3]]}, {'shapes': ['hexagon'] * 5},
+                     {'shapes': ['polygon:2:0:filled'] * 5},
+                     {'box_size': 20}, {'box_size': 40.5}):
+            self.assertRaises(ValueError, themes.read_pack,
+                              self.write_pack('bad', pack))
+
+    def test_load_errors(self):
+        with open(self.path('bad.theme'), 'wb') as theme_file:
+            theme_file.write(b'MPRC' + b'\0' * 64)
+        self.assertRaises(ValueError, themes.load_theme,
+                          self.path('bad.theme'))
+        path = self.compile('classic', {})
+        with open(path, 'rb') as theme_file:
+            data = theme_file.read()
+        with open(path, 'wb') as theme_file:
+            theme_file.write(data[:len(data) // 2])
+        self.assertRaises(ValueError, themes.load_theme, path)
+
+    def test_set_theme(self):
+        theme = themes.load_theme(self.compile('night', NIGHT))
+        memorypuzzle.get_animation_strip((ALLSHAPES[0], ALLCOLORS[0]))
+        memorypuzzle.set_theme(theme)
+        self.assertEqual(theme.colors, memorypuzzle.THEME_COLORS)
+        self.assertFalse(memorypuzzle._ANIMATION_STRIPS)
+        self.assertTrue(memorypuzzle.get_icon_atlas(BOXSIZE) is
+                        theme.atlases[BOXSIZE])
+        strip = memorypuzzle.get_animation_strip(
+            (ALLSHAPES[0], ALLCOLORS[0]))
+        self.assertEqual((20, 24, 48, 255), tuple(strip.get_at((0, 0))))
+        self.assertEqual((200, 200, 230, 255),
+                         tuple(strip.get_at((2 * BOXSIZE, 0))))
+        memorypuzzle.set_theme(None)
+        self.assertEqual(BGCOLOR, memorypuzzle.THEME_COLORS['background'])
+        self.assertEqual(BOXCOLOR, memorypuzzle.THEME_COLORS['box'])
+        self.assertFalse(memorypuzzle.get_icon_atlas(BOXSIZE) is
+                         theme.atlases[BOXSIZE])
+
+    def test_cycle_theme(self):
+        theme = themes.load_theme(self.compile('night', NIGHT))
+        with mock.patch.dict(memorypuzzle.THEME_SETTINGS,
+                             themes=(theme, None), current=0):
+            memorypuzzle.cycle_theme()
+            self.assertEqual(BGCOLOR, memorypuzzle.THEME_COLORS['background'])
+            memorypuzzle.cycle_theme()
+            self.assertEqual(0, memorypuzzle.THEME_SETTINGS['current'])
+            self.assertEqual(theme.colors, memorypuzzle.THEME_COLORS)
+
+    def test_theme_key(self):
+        theme = themes.load_theme(self.compile('night', NIGHT))
+        input_source = mock.MagicMock()
+        input_source.get.return_value = [
+            pygame.event.Event(pygame.KEYDOWN, key=memorypuzzle.THEME_KEY)]
+        viewport = memorypuzzle.get_viewport((4, 5))
+        version = viewport.version
+        with mock.patch.dict(memorypuzzle.THEME_SETTINGS,
+                             themes=(None, theme), current=0):
+            memorypuzzle.get_mouse_click(None, viewport, input_source)
+            self.assertEqual(1, memorypuzzle.THEME_SETTINGS['current'])
+        self.assertEqual(theme.colors, memorypuzzle.THEME_COLORS)
+        self.assertTrue(viewport.version > version)
+
+    @mock.patch('memorypuzzle.game_loop', mock.MagicMock())
+    @mock.patch('memorypuzzle.get_game_clock_backend',
+                mock.MagicMock(return_value=(mock.ANY, mock.ANY)))
+    @mock.patch('memorypuzzle.Audio', mock.MagicMock())
+    @mock.patch('leaderboard.Leaderboard', mock.MagicMock())
+    @mock.patch.dict(memorypuzzle.THEME_SETTINGS)
+    def test_game_main(self):
+        path = self.compile('night', NIGHT)
+        memorypuzzle.main(['--theme', path, '--theme', path])
+        self.assertEqual(3, len(memorypuzzle.THEME_SETTINGS['themes']))
+        self.assertEqual(None, memorypuzzle.THEME_SETTINGS['themes'][-1])
+        self.assertEqual((20, 24, 48), memorypuzzle.THEME_COLORS['background'])
+        with mock.patch('sys.stderr'):
+            self.assertRaises(SystemExit, memorypuzzle.main,
+                              ['--theme', self.path('missing.theme')])
+
+    def test_export(self):
+        path = self.compile('night', NIGHT)
+        export.init_worker(path)
+        self.assertEqual((20, 24, 48), memorypuzzle.THEME_COLORS['background'])
+        with mock.patch.dict('memorypuzzle._VIEWPORTS', clear=True):
+            export.export_board(self.directory, (2, 3), 1)
+        thumbnail = pygame.image.load(self.path('board-2x3-1.png'))
+        self.assertEqual((20, 24, 48, 255), tuple(thumbnail.get_at((0, 0))))
+
+    def test_main(self):
+        self.write_pack('night', NIGHT)
+        out = self.path('out')
+        os.mkdir(out)
+        with mock.patch('sys.stdout'):
+            self.assertEqual(0, themes.main([self.path('night.json'),
+                                             '--out', out]))
+        self.assertTrue(os.path.isfile(os.path.join(out, 'night.theme')))
+        self.write_pack('bad', {'box_size': 1})
+        with mock.patch('sys.stderr') as stderr:
+            self.assertEqual(1, themes.main([self.path('bad.json')]))
+        self.assertTrue(stderr.write.called)
@@ -0,0 +1,28 @@
+import unittest
+
+from constants import SIMULATION_STEP
+from timing import FixedTimestep
+
+
+class TestTiming(unittest.TestCase):
+    def test_advance(self):
+        timestep = FixedTimestep(1000)
+        self.assertEqual(0, timestep.advance(1000 + SIMULATION_STEP - 1))
+        self.assertEqual(1000, timestep.time)
+        self.assertEqual(3, timestep.advance(1000 + 3 * SIMULATION_STEP + 1))
+        self.assertEqual(1000 + 3 * SIMULATION_STEP, timestep.time)
+        self.assertEqual(0, timestep.advance(900))
+        self.assertEqual(1000 + 3 * SIMULATION_STEP, timestep.time)
+
+    def test_independent_of_frame_rate(self):
+        end = 1000 + 1234
+        times = []
+        for frame_time in (1, 7, 50, 1000 // 144, 1234):
+            timestep = FixedTimestep(1000)
+            steps = 0
+            for now in range(1000, end, frame_time):
+                steps += timestep.advance(now)
+            steps += timestep.advance(end)
+            times.append((steps, timestep.time))
+        self.assertEqual([times[0]] * len(times), times)
+        self.assertEqual(1234 // SIMULATION_STEP, times[0][0])
@@ -0,0 +1,101 @@
+import unittest
+
+from constants import (
+    BOXSIZE,
+    EASY_GAME_COLS,
+    EASY_GAME_ROWS,
+    GAPSIZE,
+    WINDOWHEIGHT,
+    WINDOWWIDTH)
+from viewport import PAN_STEP, ZOOM_LEVELS, Viewport, visible_range
+
+
+TEST_GRID = (EASY_GAME_ROWS, EASY_GAME_COLS)
+HUGE_GRID = (200, 200)
+
+
+class TestViewport(unittest.TestCase):
+    def test_centered(self):
+        viewport = Viewport(TEST_GRID)
+        self.assertEqual((195, 140), viewport.left_top((0, 0)))
+        self.assertEqual(BOXSIZE, viewport.box_size)
+        self.assertEqual(BOXSIZE + GAPSIZE, viewport.pitch)
+
+    def test_box_at(self):
+        viewport = Viewport(TEST_GRID)
+        for box in ((0, 0), (EASY_GAME_COLS - 1, EASY_GAME_ROWS - 1)):
+            left, top = viewport.left_top(box)
+            self.assertEqual((True, box), viewport.box_at((left, top)))
+            self.assertEqual(
+                (True, box),
+                viewport.box_at((left + BOXSIZE - 1, top + BOXSIZE - 1)))
+            self.assertEqual((False, (None, None)),
+                             viewport.box_at((left + BOXSIZE, top)))
+        self.assertEqual((False, (None, None)), viewport.box_at((0, 0)))
+
+    def test_visible_range(self):
+        self.assertEqual(range(0, 5), visible_range(10, 50, 40, 5, 640))
+        self.assertEqual(range(1, 3), visible_range(-50, 50, 40, 5, 100))
+        self.assertEqual(range(2, 3), visible_range(-100, 50, 40, 5, 50))
+        self.assertEqual(range(0, 0), visible_range(700, 50, 40, 5, 640))
+
+    def test_visible_ranges_cover_window(self):
+        for zoom_steps in range(-3, 3):
+            viewport = Viewport(HUGE_GRID)
+            viewport.zoom_at(zoom_steps, (0, 0))
+            x_range, y_range = viewport.visible_ranges()
+            for x_value in (x_range[0] - 1, x_range[-1] + 1):
+                left, _ = viewport.left_top((x_value, 0))
+                self.assertTrue(left + viewport.box_size <= 0 or
+                                left >= WINDOWWIDTH)
+            for x_value in (x_range[0], x_range[-1]):
+                left, _ = viewport.left_top((x_value, 0))
+                self.assertTrue(left + viewport.box_size > 0 and
+                                left < WINDOWWIDTH)
+            self.assertTrue(len(y_range) <=
+                            WINDOWHEIGHT // viewport.pitch + 2)
+
+    def test_inside_ranges(self):
+        viewport = Viewport(TEST_GRID)
+        self.assertEqual(viewport.visible_ranges(), viewport.inside_ranges())
+        for zoom_steps in range(-3, 3):
+            viewport = Viewport(HUGE_GRID)
+            viewport.zoom_at(zoom_steps, (0, 0))
+            viewport.pan(7, 7)
+            x_range, y_range = viewport.visible_ranges()
+            x_inside, y_inside = viewport.inside_ranges()
+            for x_value in x_range:
+                left, _ = viewport.left_top((x_value, 0))
+                self.assertEqual(
+                    left >= 0 and left + viewport.box_size <= WINDOWWIDTH,
+                    x_value in x_inside)
+            self.assertTrue(len(y_range) - 2 <= len(y_inside))
+
+    def test_pan(self):
+        viewport = Viewport(TEST_GRID)
+        self.assertFalse(viewport.pan(PAN_STEP, 0))
+        viewport = Viewport(HUGE_GRID)
+        version = viewport.version
+        left, top = viewport.left_top((0, 0))
+        self.assertTrue(viewport.pan(PAN_STEP, -PAN_STEP))
+        self.assertEqual((left + PAN_STEP, top - PAN_STEP),
+                         viewport.left_top((0, 0)))
+        self.assertNotEqual(version, viewport.version)
+        viewport.pan(10 ** 6, 10 ** 6)
+        self.assertEqual(viewport.pan_limits(), viewport.offset)
+        self.assertFalse(viewport.pan(1, 1))
+
+    def test_zoom_at(self):
+        viewport = Viewport(HUGE_GRID)
+        pointer = (123, 321)
+        found, box = viewport.box_at(pointer)
+        self.assertTrue(found)
+        self.assertTrue(viewport.zoom_at(1, pointer))
+        self.assertEqual(ZOOM_LEVELS[ZOOM_LEVELS.index(1.0) + 1],
+                         viewport.zoom)
+        self.assertEqual((True, box), viewport.box_at(pointer))
+        viewport.zoom_at(len(ZOOM_LEVELS), pointer)
+        self.assertFalse(viewport.zoom_at(1, pointer))
+        viewport.reset()
+        self.assertEqual(1.0, viewport.zoom)
+        self.assertEqual((0, 0), viewport.offset)
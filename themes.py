@@ -0,0 +1,232 @@
+"""Theme packs of the Memory Puzzle Game.
+
+A theme pack is a JSON file giving the colors of the game, the palette and
+the shapes the icons are drawn with and the box size they are drawn at,
+every key being optional:
+
+    {"background": [20, 24, 48], "flash": [90, 90, 140],
+     "box": [200, 200, 230], "highlight": [255, 200, 0],
+     "palette": [[255, 90, 90], [90, 255, 90], [90, 90, 255],
+                 [255, 255, 90], [255, 160, 60], [220, 90, 255],
+                 [90, 255, 255]],
+     "shapes": ["oval", "diamond", "polygon:6:0:filled", "donut",
+                "star:5:0:filled"],
+     "box_size": 80}
+
+The palette and the shapes replace the classic colors and shapes at the
+same index, so that themes only change how the icons look and boards,
+recordings and leaderboards are the same in every theme. Icons drawn at a
+box size larger than BOXSIZE stay sharp when zoomed in.
+
+Packs are compiled offline into a binary atlas file holding the colors and
+the icons already drawn at the box size of every zoom level:
+
+    python themes.py night.json
+
+writes night.theme. The game memory-maps the file and draws straight from
+the mapped pages, see load_theme, so a theme loads in milliseconds without
+drawing a single icon and processes showing the same theme share its pages.
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+import pygame
+
+from colors import BGCOLOR, BOXCOLOR, HIGHLIGHTCOLOR, LIGHTBGCOLOR
+from constants import BOXSIZE
+from icons import (
+    ALLCOLORS, ALLSHAPES, FILLED, OUTLINE, POLYGON, STAR, parse_shape)
+from viewport import ZOOM_LEVELS
+
+MAGIC = b'MPTH'
+VERSION = 1
+
+# Colors of a theme in the order they are stored, with their classic value.
+COLORS = (('background', BGCOLOR), ('flash', LIGHTBGCOLOR),
+          ('box', BOXCOLOR), ('highlight', HIGHLIGHTCOLOR))
+
+# File header: magic, version, the number of atlases and the colors.
+HEADER = struct.Struct('<4sBB%dB' % (3 * len(COLORS)))
+
+# An atlas following the header: its box size and the offset of its pixels,
+# BGRA rows of len(ALLSHAPES) by len(ALLCOLORS) icons, in the file.
+ATLAS = struct.Struct('<HQ')
+
+# Pixels of every atlas start at a multiple of the page size.
+PAGE_SIZE = mmap.ALLOCATIONGRANULARITY
+
+# Box sizes of the zoom levels, see Viewport.scale.
+ZOOM_BOX_SIZES = sorted(set(max(1, int(BOXSIZE * zoom))
+                            for zoom in ZOOM_LEVELS))
+
+# Largest box size icons are drawn at.
+MAX_BOX_SIZE = 4 * BOXSIZE
+
+
+class Theme(object):
+    """Colors and icon atlases keyed by box size of a loaded theme."""
+
+    def __init__(self, name, colors, atlases):
+        self.name = name
+        self.colors = colors
+        self.atlases = atlases
+
+
+def parse_color(value, key):
+    """An (r, g, b) color from a list of a theme pack."""
+    try:
+        color = tuple(int(component) for component in value)
+    except (TypeError, ValueError):
+        color = ()
+    if len(color) != 3 or not all(0 <= part <= 255 for part in color):
+        raise ValueError("%s is not an [r, g, b] color: %r" % (key, value))
+    return color
+
+
+def parse_pack_shape(shape):
+    """Check a shape of a theme pack, classic or procedural."""
+    try:
+        procedural = parse_shape(shape)
+    except (AttributeError, TypeError, ValueError):
+        procedural = ()
+    if procedural is None and shape in ALLSHAPES:
+        return shape
+    if procedural:
+        family, corners, _, fill = procedural
+        if (family in (POLYGON, STAR) and corners >= 3 and
+                fill in (FILLED, OUTLINE)):
+            return shape
+    raise ValueError("unknown shape %r" % (shape,))
+
+
+def read_pack(path):
+    """Read a theme pack, filling its missing keys with the classic look.
+
+    Returns a dict of the colors, the palette, the shapes and the box size.
+    """
+    with open(path) as pack_file:
+        pack = json.load(pack_file)
+    if not isinstance(pack, dict):
+        raise ValueError("%s is not a JSON object" % path)
+    theme = {}
+    for key, classic in COLORS:
+        theme[key] = parse_color(pack.get(key, classic), key)
+    theme['palette'] = tuple(parse_color(color, 'palette')
+                             for color in pack.get('palette', ALLCOLORS))
+    theme['shapes'] = tuple(parse_pack_shape(shape)
+                            for shape in pack.get('shapes', ALLSHAPES))
+    if (len(theme['palette']) != len(ALLCOLORS) or
+            len(theme['shapes']) != len(ALLSHAPES)):
+        raise ValueError("a theme needs %d colors and %d shapes"
+                         % (len(ALLCOLORS), len(ALLSHAPES)))
+    theme['box_size'] = pack.get('box_size', BOXSIZE)
+    if (not isinstance(theme['box_size'], int) or
+            not BOXSIZE <= theme['box_size'] <= MAX_BOX_SIZE):
+        raise ValueError("box_size must be from %d to %d"
+                         % (BOXSIZE, MAX_BOX_SIZE))
+    return theme
+
+
+def atlas_size(box_size):
+    """Width and height of the atlas of box_size."""
+    return len(ALLSHAPES) * box_size, len(ALLCOLORS) * box_size
+
+
+def compile_pack(path, out):
+    """Compile the theme pack at path into the atlas file out.
+
+    The icons are drawn at the box size of the pack by the drawing code of
+    the game and scaled to the box size of every zoom level.
+    """
+    from memorypuzzle import build_icon_atlas
+
+    theme = read_pack(path)
+    drawn, _ = build_icon_atlas(theme['box_size'], theme['shapes'],
+                                theme['palette'], theme['background'])
+    colors = [part for key, _ in COLORS for part in theme[key]]
+    offset = HEADER.size + len(ZOOM_BOX_SIZES) * ATLAS.size
+    entries = []
+    for box_size in ZOOM_BOX_SIZES:
+        offset = -(-offset // PAGE_SIZE) * PAGE_SIZE
+        width, height = atlas_size(box_size)
+        entries.append((box_size, offset))
+        offset += width * height * 4
+    with open(out, 'wb') as theme_file:
+        theme_file.write(HEADER.pack(MAGIC, VERSION, len(entries), *colors))
+        for entry in entries:
+            theme_file.write(ATLAS.pack(*entry))
+        for box_size, offset in entries:
+            atlas = drawn
+            if box_size != theme['box_size']:
+                atlas = pygame.transform.smoothscale(
+                    drawn, atlas_size(box_size))
+            theme_file.write(b'\0' * (offset - theme_file.tell()))
+            theme_file.write(pygame.image.tostring(atlas, 'BGRA'))
+    return out
+
+
+def load_theme(path):
+    """Load a compiled theme by memory mapping its atlas file.
+
+    The atlases are surfaces over the mapped pixels, in the pixel format of
+    a converted alpha surface, which the game draws from without copying.
+    """
+    with open(path, 'rb') as theme_file:
+        data = mmap.mmap(theme_file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(data) < HEADER.size:
+        raise ValueError("%s is not a theme of version %d" % (path, VERSION))
+    header = HEADER.unpack_from(data)
+    magic, version, count = header[:3]
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a theme of version %d" % (path, VERSION))
+    colors = dict((key, tuple(header[3 + 3 * index:6 + 3 * index]))
+                  for index, (key, _) in enumerate(COLORS))
+    pixels = memoryview(data)
+    atlases = {}
+    for index in range(count):
+        box_size, offset = ATLAS.unpack_from(
+            data, HEADER.size + index * ATLAS.size)
+        width, height = atlas_size(box_size)
+        if offset + width * height * 4 > len(data):
+            raise ValueError("%s is truncated" % path)
+        atlases[box_size] = (
+            pygame.image.frombuffer(
+                pixels[offset:offset + width * height * 4], (width, height),
+                'BGRA'),
+            dict(((shape, color), pygame.Rect(shape_index * box_size,
+                                              color_index * box_size,
+                                              box_size, box_size))
+                 for shape_index, shape in enumerate(ALLSHAPES)
+                 for color_index, color in enumerate(ALLCOLORS)))
+    name = os.path.splitext(os.path.basename(path))[0]
+    return Theme(name, colors, atlases)
+
+
+def main(argv=()):
+    """Compile theme packs into atlas files."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('packs', metavar='PACK', nargs='+',
+                        help="theme pack, a JSON file")
+    parser.add_argument('--out', metavar='DIR',
+                        help="directory the themes are written to (default "
+                             "next to their pack)")
+    args = parser.parse_args(argv)
+    for path in args.packs:
+        name = os.path.splitext(path)[0] + '.theme'
+        if args.out:
+            name = os.path.join(args.out, os.path.basename(name))
+        try:
+            compile_pack(path, name)
+        except (IOError, ValueError) as error:
+            sys.stderr.write("%s: %s\n" % (path, error))
+            return 1
+        print(name)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,33 @@
+"""Fixed timestep game time for the Memory Puzzle Game.
+
+The game logic runs on a game time that advances in fixed steps of
+SIMULATION_STEP milliseconds towards the real time, whatever the rate frames
+are drawn at. A frame capped at 20 frames per second, one synced to a 144 Hz
+display and an uncapped benchmark frame all see the game time at the same
+step boundaries, so input locks and animation timing do not depend on the
+frame rate.
+"""
+from constants import SIMULATION_STEP
+
+
+class FixedTimestep(object):
+    """Game time advancing from start in steps of step milliseconds."""
+
+    def __init__(self, start, step=SIMULATION_STEP):
+        self.time = start
+        self.step = step
+
+    def advance(self, now):
+        """Advance the game time by the steps that fit until now.
+
+        Returns the number of steps taken, 0 when less than a step passed
+        since the last step.
+        """
+        steps = max(0, (now - self.time) // self.step)
+        self.time += steps * self.step
+        return steps
+
+
+def format_duration(milliseconds):
+    """Minutes and seconds of a duration, as in 1:05."""
+    return "%d:%02d" % divmod(milliseconds // 1000, 60)
@@ -0,0 +1,166 @@
+"""Viewport onto the board of the Memory Puzzle Game.
+
+The board is drawn centered in the window, scaled by a zoom level and moved
+by a pan offset. A Viewport maps boxes to window coordinates and back and
+computes the range of boxes inside the window directly from that geometry,
+so drawing and hit testing cost depends on the window size and not on the
+size of the board.
+"""
+from constants import BOXSIZE, GAPSIZE, WINDOWHEIGHT, WINDOWWIDTH
+
+# Zoom levels a Viewport steps through, 1.0 drawing boxes of BOXSIZE.
+ZOOM_LEVELS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0)
+
+# Pixels a single pan step moves the board by.
+PAN_STEP = BOXSIZE + GAPSIZE
+
+
+def visible_range(margin, pitch, box_size, count, length):
+    """Range of the boxes along an axis overlapping the window.
+
+    A box i spans margin + i * pitch to margin + i * pitch + box_size, the
+    window spans 0 to length.
+    """
+    first = max(0, (-margin - box_size) // pitch + 1)
+    last = min(count, -((margin - length) // pitch))
+    return range(first, max(first, last))
+
+
+class Viewport(object):
+    """Geometry of the board of game_grid in a window of size."""
+
+    def __init__(self, game_grid, size=(WINDOWWIDTH, WINDOWHEIGHT)):
+        self.game_grid = game_grid
+        self.size = size
+        # Incremented whenever the geometry changes, so that the game loop
+        # knows to draw the board again.
+        self.version = 0
+        self.reset()
+
+    @property
+    def zoom(self):
+        """Current zoom level."""
+        return ZOOM_LEVELS[self.zoom_index]
+
+    def scale(self, length):
+        """A length in pixels at the current zoom level, at least 1."""
+        return max(1, int(length * self.zoom))
+
+    def reset(self):
+        """Show the board centered at the zoom level 1.0."""
+        self.zoom_index = ZOOM_LEVELS.index(1.0)
+        self.offset = (0, 0)
+        self.update()
+
+    def update(self):
+        """Recalculate the geometry after the zoom or the offset changed."""
+        self.box_size = self.scale(BOXSIZE)
+        self.gap_size = self.scale(GAPSIZE)
+        self.pitch = self.box_size + self.gap_size
+        centered_x, centered_y = self.centered_margins()
+        self.margins = (centered_x + self.offset[0],
+                        centered_y + self.offset[1])
+        self.version += 1
+
+    def centered_margins(self):
+        """x, y margins of the board centered in the window."""
+        game_rows, game_cols = self.game_grid
+        width, height = self.size
+        return (int((width - game_cols * self.pitch) / 2),
+                int((height - game_rows * self.pitch) / 2))
+
+    def left_top(self, box):
+        """Window coordinates of the top left corner of a box."""
+        x_value, y_value = box
+        return (self.margins[0] + x_value * self.pitch,
+                self.margins[1] + y_value * self.pitch)
+
+    def box_at(self, pointer):
+        """Get the box at a pixel.
+
+        Inverts the grid geometry instead of testing every box: the pointer
+        offset from the grid margin is split into a box index and a position
+        inside the box pitch, which misses when it falls into the gap.
+        """
+        game_rows, game_cols = self.game_grid
+        boxx, x_in_box = divmod(pointer[0] - self.margins[0], self.pitch)
+        boxy, y_in_box = divmod(pointer[1] - self.margins[1], self.pitch)
+        if (0 <= boxx < game_cols and 0 <= boxy < game_rows and
+                x_in_box < self.box_size and y_in_box < self.box_size):
+            return True, (boxx, boxy)
+        return False, (None, None)
+
+    def visible_ranges(self):
+        """Ranges of the x and y indexes of the boxes inside the window."""
+        game_rows, game_cols = self.game_grid
+        width, height = self.size
+        return (visible_range(self.margins[0], self.pitch, self.box_size,
+                              game_cols, width),
+                visible_range(self.margins[1], self.pitch, self.box_size,
+                              game_rows, height))
+
+    def inside_ranges(self):
+        """Ranges of the x and y indexes of the boxes entirely inside the
+        window, the visible ranges less the boxes cut by its edges."""
+        ranges = []
+        for box_range, margin, length in zip(
+                self.visible_ranges(), self.margins, self.size):
+            first, last = box_range.start, box_range.stop
+            if first < last and margin + first * self.pitch < 0:
+                first += 1
+            if first < last and (margin + (last - 1) * self.pitch +
+                                 self.box_size > length):
+                last -= 1
+            ranges.append(range(first, last))
+        return tuple(ranges)
+
+    def pan_limits(self):
+        """Largest x, y offsets still showing an edge of the board.
+
+        A board fitting the window can not be panned.
+        """
+        game_rows, game_cols = self.game_grid
+        width, height = self.size
+        return (max(0, (game_cols * self.pitch - width) // 2 + self.gap_size),
+                max(0, (game_rows * self.pitch - height) // 2 + self.gap_size))
+
+    def clamp(self):
+        """Limit the offset to the pan limits."""
+        limit_x, limit_y = self.pan_limits()
+        self.offset = (max(-limit_x, min(limit_x, self.offset[0])),
+                       max(-limit_y, min(limit_y, self.offset[1])))
+
+    def pan(self, delta_x, delta_y):
+        """Move the board by delta_x, delta_y pixels.
+
+        Returns whether the board moved.
+        """
+        offset = self.offset
+        self.offset = (offset[0] + delta_x, offset[1] + delta_y)
+        self.clamp()
+        if self.offset == offset:
+            return False
+        self.update()
+        return True
+
+    def zoom_at(self, steps, pointer):
+        """Zoom steps levels in, or out if negative, around a pixel.
+
+        The point of the board under the pointer stays where it is. Returns
+        whether the zoom level changed.
+        """
+        zoom_index = max(0, min(len(ZOOM_LEVELS) - 1,
+                                self.zoom_index + steps))
+        if zoom_index == self.zoom_index:
+            return False
+        board_x = float(pointer[0] - self.margins[0]) / self.pitch
+        board_y = float(pointer[1] - self.margins[1]) / self.pitch
+        self.zoom_index = zoom_index
+        self.update()
+        centered_x, centered_y = self.centered_margins()
+        self.offset = (
+            int(round(pointer[0] - board_x * self.pitch)) - centered_x,
+            int(round(pointer[1] - board_y * self.pitch)) - centered_y)
+        self.clamp()
+        self.update()
+        return True